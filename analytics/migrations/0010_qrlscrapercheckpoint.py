@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0009_alter_qrlblockchainemission_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrlScraperCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('block_number', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'qrl_scraper_checkpoint',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_qrlscrapercheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrlScraperBlockLease',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('range_start', models.BigIntegerField()),
+                ('range_end', models.BigIntegerField()),
+                ('checkpoint', models.BigIntegerField()),
+                ('owner', models.CharField(blank=True, max_length=255, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'qrl_scraper_block_lease',
+                'managed': True,
+                'unique_together': {('name', 'range_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+# Queue every distinct block/transaction/wallet URL already recorded as missed, due immediately
+SEED_FROM_MISSED_ITEMS = """
+INSERT INTO public."qrl_scraper_retry_queue"
+    ("url", "kind", "priority", "attempts", "next_attempt_at", "last_error", "created_at")
+SELECT DISTINCT ON (item_url)
+    item_url,
+    CASE
+        WHEN item_url ~ '/api/block/|/GetBlockByNumber/' THEN 'block'
+        WHEN item_url ~ '/api/tx/|/GetObject/' THEN 'transaction'
+        ELSE 'wallet'
+    END,
+    CASE
+        WHEN item_url ~ '/api/block/|/GetBlockByNumber/' THEN 0
+        WHEN item_url ~ '/api/tx/|/GetObject/' THEN 1
+        ELSE 2
+    END,
+    0, NOW(), error_name, NOW()
+FROM public."qrl_blockchain_missed_items"
+WHERE item_url ~ '/api/(block|tx|a)/|/(GetBlockByNumber|GetObject|GetOptimizedAddressState)/'
+ORDER BY item_url, error_timestamp DESC
+ON CONFLICT ("url") DO NOTHING
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_qrlscraperblocklease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrlScraperRetryQueue',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('url', models.TextField(unique=True)),
+                ('kind', models.CharField(max_length=20)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(db_index=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'qrl_scraper_retry_queue',
+                'managed': True,
+            },
+        ),
+        migrations.RunSQL(SEED_FROM_MISSED_ITEMS, reverse_sql=migrations.RunSQL.noop),
+    ]
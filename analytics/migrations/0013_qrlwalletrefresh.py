@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_qrlscraperretryqueue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrlWalletRefresh',
+            fields=[
+                ('wallet_address', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('last_refreshed_block_height', models.BigIntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'qrl_wallet_refresh',
+                'managed': True,
+            },
+        ),
+    ]
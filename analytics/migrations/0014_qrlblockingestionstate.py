@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_qrlwalletrefresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QrlBlockIngestionState',
+            fields=[
+                ('block_number', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('state', models.CharField(db_index=True, max_length=20)),
+                ('txs_expected', models.IntegerField()),
+                ('txs_stored', models.IntegerField(default=0)),
+                ('tx_hashes', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, null=True, size=None)),
+                ('wallets', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, null=True, size=None)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'qrl_block_ingestion_state',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+# Fold repeated (item_url, error_name) rows into the oldest one, counting them, before the unique constraint
+DEDUPLICATE_MISSED_ITEMS = """
+UPDATE public."qrl_blockchain_missed_items"
+SET "first_seen" = "error_timestamp", "last_seen" = "error_timestamp";
+
+WITH grouped AS (
+    SELECT MIN("id") AS keep_id, COUNT(*) AS occurrences,
+           MIN("error_timestamp") AS first_seen, MAX("error_timestamp") AS last_seen
+    FROM public."qrl_blockchain_missed_items"
+    WHERE "item_url" IS NOT NULL AND "error_name" IS NOT NULL
+    GROUP BY "item_url", "error_name"
+    HAVING COUNT(*) > 1
+)
+UPDATE public."qrl_blockchain_missed_items" AS missed
+SET "occurrence_count" = grouped.occurrences,
+    "first_seen" = grouped.first_seen,
+    "last_seen" = grouped.last_seen
+FROM grouped
+WHERE missed."id" = grouped.keep_id;
+
+DELETE FROM public."qrl_blockchain_missed_items" AS missed
+USING public."qrl_blockchain_missed_items" AS kept
+WHERE missed."item_url" = kept."item_url"
+  AND missed."error_name" = kept."error_name"
+  AND missed."id" > kept."id";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0014_qrlblockingestionstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrlblockchainmisseditems',
+            name='first_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='qrlblockchainmisseditems',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='qrlblockchainmisseditems',
+            name='occurrence_count',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.RunSQL(DEDUPLICATE_MISSED_ITEMS, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterUniqueTogether(
+            name='qrlblockchainmisseditems',
+            unique_together={('item_url', 'error_name')},
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
 
 ### Aggregated Block Data ###
 class QrlAggregatedBlockData(models.Model):
@@ -86,10 +87,14 @@ class QrlBlockchainMissedItems(models.Model):
     location_script_file = models.CharField(max_length=255, blank=True, null=True)
     location_script_function = models.CharField(max_length=255, blank=True, null=True)
     failed_data = models.CharField(max_length=1000, blank=True, null=True)
+    occurrence_count = models.IntegerField(default=1)  # times this error was seen for this URL
+    first_seen = models.DateTimeField(blank=True, null=True)
+    last_seen = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = True
         db_table = 'qrl_blockchain_missed_items'
+        unique_together = (('item_url', 'error_name'),)
 
 
 ### Blockchain Transactions ###
@@ -173,3 +178,73 @@ class QrlBlockchainEmission(models.Model):
 
     def __str__(self):
         return f"Emission: {self.emission} | Last Updated: {self.updated_at}"
+
+
+### Wallet Refresh Index ###
+class QrlWalletRefresh(models.Model):
+    wallet_address = models.CharField(primary_key=True, max_length=255)
+    last_refreshed_block_height = models.BigIntegerField()  # refetch only for transactions in newer blocks
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = True
+        db_table = 'qrl_wallet_refresh'
+
+
+### Scraper Checkpoints ###
+class QrlScraperCheckpoint(models.Model):
+    name = models.CharField(primary_key=True, max_length=100)  # e.g. "block-all"
+    block_number = models.BigIntegerField()  # every block up to and including this one is done
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = 'qrl_scraper_checkpoint'
+
+
+### Scraper Block Leases ###
+class QrlScraperBlockLease(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)  # one backfill run, e.g. "block-all"
+    range_start = models.BigIntegerField()
+    range_end = models.BigIntegerField()
+    checkpoint = models.BigIntegerField()  # every block up to and including this one is done
+    owner = models.CharField(max_length=255, blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = 'qrl_scraper_block_lease'
+        unique_together = (('name', 'range_start'),)
+
+
+### Scraper Retry Queue ###
+class QrlScraperRetryQueue(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    url = models.TextField(unique=True)
+    kind = models.CharField(max_length=20)  # block, transaction or wallet
+    priority = models.SmallIntegerField(default=0)  # lower is drained first
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True
+        db_table = 'qrl_scraper_retry_queue'
+
+
+### Block Ingestion State ###
+class QrlBlockIngestionState(models.Model):
+    block_number = models.BigIntegerField(primary_key=True)
+    state = models.CharField(max_length=20, db_index=True)  # header_stored, txs_stored, wallets_refreshed, complete
+    txs_expected = models.IntegerField()
+    txs_stored = models.IntegerField(default=0)
+    tx_hashes = ArrayField(models.TextField(), blank=True, null=True)  # cleared once complete
+    wallets = ArrayField(models.TextField(), blank=True, null=True)  # wallets touched by the stored transactions
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = 'qrl_block_ingestion_state'
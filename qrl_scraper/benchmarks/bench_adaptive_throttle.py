@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the adaptive rate controller (QrlnetworkDownloaderMiddleware).
+
+Crawls the same fixture blocks against a FixtureExplorer that adds a fixed
+per-request latency and answers 429 + Retry-After above --rate-limit
+requests per second, once with the old static settings (8 concurrent
+requests, 0.5s delay) and once with the adaptive controller. Item pipelines
+are disabled; the numbers cover fetching and parsing only. Each crawl runs in
+its own process (a Twisted reactor cannot be restarted).
+
+    cd qrl_scraper
+    python benchmarks/bench_adaptive_throttle.py [number_of_blocks] [--rate-limit 40] [--latency 0.05]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureExplorer, load_blocks, write_fixtures
+
+MODES = {
+    "static": {"ADAPTIVE_THROTTLE_ENABLED": False, "CONCURRENT_REQUESTS_PER_DOMAIN": 8, "DOWNLOAD_DELAY": 0.5},
+    "adaptive": {"ADAPTIVE_THROTTLE_ENABLED": True, "CONCURRENT_REQUESTS_PER_DOMAIN": 8, "DOWNLOAD_DELAY": 0.5},
+}
+
+
+def crawl(mode, blocks, http_port):
+    """Child process: crawl the fixture blocks with one throttle mode and print the stats as JSON."""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from qrlNetwork.spiders.qrl_network_spider import QRLNetworkSpider
+
+    class BenchSpider(QRLNetworkSpider):
+        name = "bench_adaptive_throttle"
+
+        def start_requests(self):
+            for block_number in blocks:
+                yield self.block_request(block_number)
+
+        def block_url(self, block_number):
+            return f"http://127.0.0.1:{http_port}/api/block/{block_number}"
+
+        def transaction_url(self, tx_hash):
+            return f"http://127.0.0.1:{http_port}/api/tx/{tx_hash}"
+
+        def wallet_url(self, wallet):
+            return f"http://127.0.0.1:{http_port}/api/a/{wallet}"
+
+        def update_emission(self):
+            return None
+
+    settings = get_project_settings()
+    settings.setdict({
+        "ITEM_PIPELINES": {},
+        "LOG_LEVEL": "ERROR",
+        "MEMUSAGE_ENABLED": False,
+        **MODES[mode],
+    }, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchSpider)
+    started = time.perf_counter()
+    process.crawl(crawler)
+    process.start()
+    elapsed = time.perf_counter() - started
+    stats = crawler.stats.get_stats()
+    slot = "adaptive_throttle/127.0.0.1"
+    print(json.dumps({
+        "mode": mode,
+        "seconds": elapsed,
+        "requests": stats.get("downloader/request_count", 0),
+        "throttled": stats.get("downloader/response_status_count/429", 0),
+        "concurrency": stats.get(f"{slot}/concurrency", MODES[mode]["CONCURRENT_REQUESTS_PER_DOMAIN"]),
+        "delay": stats.get(f"{slot}/delay", MODES[mode]["DOWNLOAD_DELAY"]),
+    }))
+
+
+def run(mode, blocks, http_port):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--crawl", mode,
+         "--blocks", ",".join(map(str, blocks)), "--http-port", str(http_port)],
+        cwd=SCRAPER_DIR, capture_output=True, text=True,
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"{mode} crawl failed:\n{output.stderr[-2000:]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=20)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--rate-limit", type=float, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--crawl")
+    parser.add_argument("--blocks")
+    parser.add_argument("--http-port", type=int)
+    args = parser.parse_args()
+
+    if args.crawl:
+        crawl(args.crawl, [int(b) for b in args.blocks.split(",")], args.http_port)
+        sys.exit(0)
+
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    blocks = sorted(load_blocks(fixtures_dir))
+    print(f"🧪 Adaptive throttle benchmark: {len(blocks)} blocks, explorer limit {args.rate_limit:g} req/s, latency {args.latency:g}s")
+
+    for mode in MODES:
+        explorer = FixtureExplorer(fixtures_dir, latency=args.latency, rate_limit=args.rate_limit).start()
+        try:
+            result = run(mode, blocks, explorer.port)
+        finally:
+            explorer.stop()
+        print(
+            f"{mode:<9} {result['requests']:>6} requests  {result['throttled']:>5} x 429  "
+            f"{result['seconds']:7.2f}s  {len(blocks) / result['seconds']:7.2f} blocks/s  "
+            f"{result['requests'] / result['seconds']:7.1f} req/s  "
+            f"(final concurrency {result['concurrency']}, delay {result['delay']}s)"
+        )
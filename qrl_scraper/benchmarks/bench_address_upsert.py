@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Database benchmark: wallet states written one by one vs coalesced batches.
+
+Generates wallet responses in which a few hot wallets (exchanges, pools) take
+60% of the refreshes, and writes them into a scratch copy of
+qrl_wallet_address (bench_qrl_wallet_address, dropped afterwards) in two
+ways: "per-wallet" upserts and commits every response on its own, like the
+address pipeline did, and "coalesced" buffers them in an AddressWriter
+(latest state per wallet) and upserts each batch with one statement. Needs
+a reachable database (DATABASE_URL / the DEV_DB_* settings).
+
+    cd qrl_scraper
+    python benchmarks/bench_address_upsert.py [responses] [--wallets 3000] [--batch-size 500]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timezone
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from qrlNetwork.utils import db_cursor
+from qrlNetwork.writers import AddressWriter
+
+MODES = ("per-wallet", "coalesced")
+SCRATCH_TABLE = "bench_qrl_wallet_address"
+
+
+class BenchAddressWriter(AddressWriter):
+    table = f'public."{SCRATCH_TABLE}"'
+
+
+def wallet_rows(count, wallets, seed=1):
+    rng = random.Random(seed)
+    hot = max(1, wallets // 50)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for index in range(count):
+        wallet = rng.randrange(hot) if rng.random() < 0.6 else rng.randrange(wallets)
+        rows.append(
+            (f"Q{wallet:078x}", rng.randint(0, 10 ** 15), index, 0, index, index)
+            + (0,) * 6 + ("",) * 4 + ("bench_address_upsert", "0", now)
+        )
+    return rows
+
+
+def reset_scratch_table():
+    with db_cursor() as (conn, cur):
+        cur.execute(f'DROP TABLE IF EXISTS public."{SCRATCH_TABLE}"')
+        cur.execute(f'CREATE TABLE public."{SCRATCH_TABLE}" (LIKE public."qrl_wallet_address" INCLUDING ALL)')
+        conn.commit()
+
+
+def drop_scratch_table():
+    with db_cursor() as (conn, cur):
+        cur.execute(f'DROP TABLE IF EXISTS public."{SCRATCH_TABLE}"')
+        conn.commit()
+
+
+def on_error(item, error):
+    raise error
+
+
+def run(mode, rows, batch_size):
+    """Seconds to write all rows, and the number of upserted rows."""
+    writer = BenchAddressWriter(batch_size=batch_size, flush_interval=3600)
+    written = 0
+    started = time.perf_counter()
+    if mode == "per-wallet":
+        for row in rows:
+            with db_cursor() as (conn, cur):
+                writer.write_one(cur, row)
+                conn.commit()
+            written += 1
+    else:
+        for row in rows:
+            if writer.add(None, row):
+                pending = writer.take()
+                writer.write_pending(pending, on_error)
+                written += len(pending)
+        pending = writer.take()
+        writer.write_pending(pending, on_error)
+        written += len(pending)
+    return time.perf_counter() - started, written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=20000)
+    parser.add_argument("--wallets", type=int, default=3000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rows = wallet_rows(args.count, args.wallets)
+    print(
+        f"🧪 Address upsert benchmark: {len(rows)} wallet responses for {len({row[0] for row in rows})} wallets, "
+        f"batches of {args.batch_size}"
+    )
+    try:
+        for mode in MODES:
+            reset_scratch_table()
+            seconds, written = run(mode, rows, args.batch_size)
+            print(
+                f"{mode:<11} {len(rows) / seconds:9.0f} wallets/s  {seconds:7.2f}s  "
+                f"{written:>6} rows upserted"
+            )
+    finally:
+        drop_scratch_table()
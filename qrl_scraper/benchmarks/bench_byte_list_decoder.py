@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+CPU micro-benchmark: Buffer int lists decoded by json.loads vs in bulk.
+
+Runs QRLNetworkSpider.parse_block over every fixture block and
+parse_transaction over the matching /api/tx bodies, in-process and without
+a reactor, once with plain json.loads (every byte of every hash, key and
+signature becomes a Python int) and once with utils.load_explorer_json
+(Buffer lists are parsed with NumPy into bytes before json.loads sees them).
+Wallet lookups are skipped, so only decoding and item building are
+measured; both modes must produce the same items. The spider still opens
+its DB connection, so DATABASE_URL / the DEV_DB_* settings must be valid.
+
+    cd qrl_scraper
+    python benchmarks/bench_byte_list_decoder.py [number_of_blocks] [--rounds 5] [--fixtures DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureExplorer, load_blocks, write_fixtures
+
+MODES = ("json.loads", "load_explorer_json")
+
+
+def responses(bodies, url):
+    from scrapy.http import Request, TextResponse
+
+    return [
+        TextResponse(url=url(key), body=body, encoding="utf-8", request=Request(url(key)))
+        for key, body in bodies.items()
+    ]
+
+
+def items_of(results):
+    return [dict(result) for result in results if not hasattr(result, "url")]
+
+
+def measure(callback, all_responses, rounds):
+    """Best-of-rounds CPU seconds for one pass over the responses, and the items of the last pass."""
+    best = None
+    for _ in range(rounds):
+        started = time.process_time()
+        items = [items_of(callback(response)) for response in all_responses]
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--fixtures")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    from qrlNetwork import utils
+    from qrlNetwork.spiders import qrl_network_spider
+    from qrlNetwork.spiders.qrl_network_spider import QRLNetworkSpider
+
+    class BenchSpider(QRLNetworkSpider):
+        name = "bench_byte_list_decoder"
+
+        def update_emission(self):
+            return None
+
+        def refresh_wallets(self, wallets, block_height):
+            pass  # keep the DB out of the measurement
+
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    explorer = FixtureExplorer(fixtures_dir)
+    explorer.server.server_close()
+    blocks = responses(load_blocks(fixtures_dir), lambda number: f"http://127.0.0.1/api/block/{number}")
+    transactions = responses(explorer.transactions, lambda tx_hash: f"http://127.0.0.1/api/tx/{tx_hash}")
+    megabytes = sum(len(response.body) for response in blocks + transactions) / 1e6
+    print(
+        f"🧪 Byte-list decoder benchmark: {len(blocks)} blocks, {len(transactions)} transactions, "
+        f"{megabytes:.1f} MB of JSON, best of {args.rounds} rounds"
+    )
+
+    spider = BenchSpider()
+    results = {}
+    for mode in MODES:
+        qrl_network_spider.load_explorer_json = json.loads if mode == "json.loads" else utils.load_explorer_json
+        block_seconds, block_items = measure(spider.parse_block, blocks, args.rounds)
+        tx_seconds, tx_items = measure(spider.parse_transaction, transactions, args.rounds)
+        results[mode] = (block_items, tx_items)
+        print(
+            f"{mode:<19} parse_block {block_seconds * 1000 / len(blocks):7.3f} ms/block  "
+            f"parse_transaction {tx_seconds * 1000 / len(transactions):7.3f} ms/tx  "
+            f"total CPU {block_seconds + tx_seconds:6.3f}s"
+        )
+
+    if results["json.loads"] != results["load_explorer_json"]:
+        raise SystemExit("❌ The two decoders produced different items")
+    print("✅ Both decoders produced identical items")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark: explorer HTTP path vs the gRPC engine.
+
+Both engines crawl the same fixture blocks: the HTTP path against a local
+FixtureExplorer, the gRPC path against qrlNetwork.grpc_stub_server. Item
+pipelines are disabled so the numbers cover fetching and parsing only.
+Each crawl runs in its own process (a Twisted reactor cannot be restarted).
+
+    cd qrl_scraper
+    python benchmarks/bench_ingest_engines.py [number_of_blocks] [--fixtures DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureExplorer, load_blocks, write_fixtures
+
+
+def crawl(engine, blocks, http_port, grpc_port, concurrency):
+    """Child process: crawl the fixture blocks with one engine and print the stats as JSON."""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from qrlNetwork.spiders.qrl_network_spider import QRLNetworkSpider
+
+    class BenchSpider(QRLNetworkSpider):
+        name = "bench_ingest_engines"
+
+        def start_requests(self):
+            for block_number in blocks:
+                yield self.block_request(block_number)
+
+        def block_request(self, block_number):
+            import scrapy
+            return scrapy.Request(self.block_url(block_number), callback=self.parse_block, errback=self.errback_conn)
+
+        def block_url(self, block_number):
+            if self.engine == "grpc":
+                return f"grpc://127.0.0.1:{grpc_port}/GetBlockByNumber/{block_number}"
+            return f"http://127.0.0.1:{http_port}/api/block/{block_number}"
+
+        def transaction_url(self, tx_hash):
+            if self.engine == "grpc":
+                return f"grpc://127.0.0.1:{grpc_port}/GetObject/{tx_hash}"
+            return f"http://127.0.0.1:{http_port}/api/tx/{tx_hash}"
+
+        def wallet_url(self, wallet):
+            if self.engine == "grpc":
+                return f"grpc://127.0.0.1:{grpc_port}/GetOptimizedAddressState/{wallet}"
+            return f"http://127.0.0.1:{http_port}/api/a/{wallet}"
+
+        def update_emission(self):
+            return None
+
+    settings = get_project_settings()
+    settings.setdict({
+        "ITEM_PIPELINES": {},
+        "LOG_LEVEL": "ERROR",
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS": concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+        "MEMUSAGE_ENABLED": False,
+    }, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchSpider)
+    started = time.perf_counter()
+    process.crawl(crawler, engine=engine)
+    process.start()
+    elapsed = time.perf_counter() - started
+    stats = crawler.stats.get_stats()
+    print(json.dumps({
+        "engine": engine,
+        "seconds": elapsed,
+        "requests": stats.get("downloader/request_count", 0),
+        "items": stats.get("item_scraped_count", 0),
+    }))
+
+
+def run(engine, blocks, http_port, grpc_port, concurrency):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--crawl", engine,
+         "--blocks", ",".join(map(str, blocks)),
+         "--http-port", str(http_port), "--grpc-port", str(grpc_port),
+         "--concurrency", str(concurrency)],
+        cwd=SCRAPER_DIR, capture_output=True, text=True,
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"{engine} crawl failed:\n{output.stderr[-2000:]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=300)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--crawl")
+    parser.add_argument("--blocks")
+    parser.add_argument("--http-port", type=int)
+    parser.add_argument("--grpc-port", type=int, default=19019)
+    args = parser.parse_args()
+
+    if args.crawl:
+        crawl(args.crawl, [int(b) for b in args.blocks.split(",")], args.http_port, args.grpc_port, args.concurrency)
+        sys.exit(0)
+
+    from qrlNetwork.grpc_stub_server import serve
+
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    blocks = sorted(load_blocks(fixtures_dir))
+    print(f"🧪 Ingestion engine benchmark: {len(blocks)} blocks, concurrency {args.concurrency}")
+
+    explorer = FixtureExplorer(fixtures_dir).start()
+    node = serve(fixtures_dir, port=args.grpc_port)
+    try:
+        for engine in ("http", "grpc"):
+            result = run(engine, blocks, explorer.port, args.grpc_port, args.concurrency)
+            print(
+                f"{engine:<5} {result['requests']:>7} requests  {result['items']:>7} items  "
+                f"{result['seconds']:7.2f}s  {len(blocks) / result['seconds']:8.1f} blocks/s  "
+                f"{result['items'] / result['seconds']:9.1f} items/s"
+            )
+    finally:
+        node.stop(None)
+        explorer.stop()
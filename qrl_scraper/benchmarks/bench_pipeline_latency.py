@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark: download throughput while the database is slow.
+
+Crawls fixture blocks from a local FixtureExplorer with all item pipelines
+enabled, but with the pipelines' db_cursor() replaced by a fake connection
+that sleeps --db-latency seconds per statement (nothing is written). It runs
+twice: "blocking" executes the pipeline DB work inline on the reactor, like
+the pipelines did before the DB thread pool; "threaded" uses
+utils.run_in_db_thread. Each crawl runs in its own process (a Twisted
+reactor cannot be restarted). The backpressure columns show how deep the
+item/DB queue got and how often block requests were held back
+(--watermark sets BACKPRESSURE_HIGH_WATERMARK, the low watermark is a quarter).
+
+    cd qrl_scraper
+    python benchmarks/bench_pipeline_latency.py [number_of_blocks] [--db-latency 0.02] [--watermark 1000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureExplorer, load_blocks, write_fixtures
+
+MODES = ("blocking", "threaded")
+
+
+class SlowCursor:
+    """Stands in for a psycopg2 cursor on a database `latency` seconds away."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connection = SlowConnection(latency)
+        self.query = ""
+        self.rowcount = 0
+
+    def mogrify(self, query, params=None):
+        return repr(params).encode()
+
+    def execute(self, query, params=None):
+        time.sleep(self.latency)
+        self.query = query if isinstance(query, str) else query.decode()
+        self.rowcount = 1
+
+    def copy_expert(self, sql, data):
+        time.sleep(self.latency)
+
+    def fetchone(self):
+        return (0,) if "COUNT(" in self.query else None
+
+    def fetchall(self):
+        return []
+
+
+class SlowConnection:
+    encoding = "UTF8"
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def commit(self):
+        time.sleep(self.latency)
+
+    def rollback(self):
+        pass
+
+
+def slow_db_cursor(latency):
+    @contextmanager
+    def db_cursor():
+        cursor = SlowCursor(latency)
+        yield cursor.connection, cursor
+    return db_cursor
+
+
+def crawl(mode, blocks, http_port, db_latency, watermark):
+    """Child process: crawl the fixture blocks with one pipeline mode and print the stats as JSON."""
+    from twisted.internet import defer
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from qrlNetwork import pipelines, writers
+    from qrlNetwork.spiders.qrl_network_spider import QRLNetworkSpider
+
+    pipelines.db_cursor = writers.db_cursor = slow_db_cursor(db_latency)
+    if mode == "blocking":
+        pipelines.run_in_db_thread = lambda function, *args: defer.maybeDeferred(function, *args)
+
+    class BenchSpider(QRLNetworkSpider):
+        name = "bench_pipeline_latency"
+
+        def start_requests(self):
+            for block_number in blocks:
+                yield self.block_request(block_number)
+
+        def block_url(self, block_number):
+            return f"http://127.0.0.1:{http_port}/api/block/{block_number}"
+
+        def transaction_url(self, tx_hash):
+            return f"http://127.0.0.1:{http_port}/api/tx/{tx_hash}"
+
+        def wallet_url(self, wallet):
+            return f"http://127.0.0.1:{http_port}/api/a/{wallet}"
+
+        def update_emission(self):
+            return None
+
+    settings = get_project_settings()
+    settings.setdict({
+        "LOG_LEVEL": "ERROR",
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16,
+        "ADAPTIVE_THROTTLE_ENABLED": False,
+        "FINALIZED_CACHE_ENABLED": False,
+        "MEMUSAGE_ENABLED": False,
+        "BACKPRESSURE_HIGH_WATERMARK": watermark,
+        "BACKPRESSURE_LOW_WATERMARK": watermark // 4,
+    }, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchSpider)
+    started = time.perf_counter()
+    process.crawl(crawler)
+    process.start()
+    elapsed = time.perf_counter() - started
+    stats = crawler.stats.get_stats()
+    print(json.dumps({
+        "mode": mode,
+        "seconds": elapsed,
+        "responses": stats.get("response_received_count", 0),
+        "items": stats.get("item_scraped_count", 0),
+        "max_depth": stats.get("backpressure/max_queue_depth", 0),
+        "pauses": stats.get("backpressure/pauses", 0),
+    }))
+
+
+def run(mode, blocks, http_port, db_latency, watermark):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--crawl", mode,
+         "--blocks", ",".join(map(str, blocks)), "--http-port", str(http_port),
+         "--db-latency", str(db_latency), "--watermark", str(watermark)],
+        cwd=SCRAPER_DIR, capture_output=True, text=True,
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"{mode} crawl failed:\n{output.stderr[-2000:]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=50)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--watermark", type=int, default=1000)
+    parser.add_argument("--crawl")
+    parser.add_argument("--blocks")
+    parser.add_argument("--http-port", type=int)
+    args = parser.parse_args()
+
+    if args.crawl:
+        crawl(args.crawl, [int(b) for b in args.blocks.split(",")], args.http_port, args.db_latency, args.watermark)
+        sys.exit(0)
+
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    blocks = sorted(load_blocks(fixtures_dir))
+    print(f"🧪 Pipeline latency benchmark: {len(blocks)} blocks, {args.db_latency * 1000:g} ms per DB statement")
+
+    explorer = FixtureExplorer(fixtures_dir).start()
+    try:
+        for mode in MODES:
+            result = run(mode, blocks, explorer.port, args.db_latency, args.watermark)
+            print(
+                f"{mode:<9} {result['responses']:>6} responses  {result['items']:>6} items  "
+                f"{result['seconds']:7.2f}s  {result['responses'] / result['seconds']:7.1f} responses/s  "
+                f"max depth {result['max_depth']:>5}  {result['pauses']} pauses"
+            )
+    finally:
+        explorer.stop()
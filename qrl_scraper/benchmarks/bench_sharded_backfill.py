@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline scaling benchmark for leased backfills (-a block=all -a shard=lease).
+
+Starts 1, 2, 4, ... worker processes against a local FixtureExplorer. The
+workers share one lease name in qrl_scraper_block_lease (so DATABASE_URL /
+the DEV_DB_* settings must point at a migrated database) and together crawl
+every fixture block. Item pipelines are disabled, so the numbers cover
+fetching, JSON decoding and lease coordination; throughput only scales while
+there are cores left for the extra processes.
+
+    cd qrl_scraper
+    python benchmarks/bench_sharded_backfill.py [number_of_blocks] [--workers 1,2,4] [--fixtures DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import subprocess
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureExplorer, load_blocks, write_fixtures
+
+
+def crawl(lease_name, last_block, http_port, lease_size):
+    """Child process: one lease-mode worker; prints its stats as JSON."""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from qrlNetwork.spiders.qrl_network_spider import QRLNetworkSpider
+
+    class BenchSpider(QRLNetworkSpider):
+        name = "bench_sharded_backfill"
+
+        def get_highest_block_number(self):
+            return last_block
+
+        def block_url(self, block_number):
+            return f"http://127.0.0.1:{http_port}/api/block/{block_number}"
+
+        def transaction_url(self, tx_hash):
+            return f"http://127.0.0.1:{http_port}/api/tx/{tx_hash}"
+
+        def wallet_url(self, wallet):
+            return f"http://127.0.0.1:{http_port}/api/a/{wallet}"
+
+        def update_emission(self):
+            return None
+
+    settings = get_project_settings()
+    settings.setdict({
+        "ITEM_PIPELINES": {},
+        "LOG_LEVEL": "ERROR",
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS": 8,
+        "MEMUSAGE_ENABLED": False,
+        "BACKFILL_LEASE_NAME": lease_name,
+        "BACKFILL_LEASE_SIZE": lease_size,
+    }, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchSpider)
+    process.crawl(crawler, block="all", shard="lease")
+    process.start()
+    stats = crawler.stats.get_stats()
+    print(json.dumps({
+        "leases": stats.get("backfill/leases_claimed", 0),
+        "requests": stats.get("downloader/request_count", 0),
+    }))
+
+
+def run(workers, last_block, http_port, lease_size):
+    lease_name = f"bench-{uuid.uuid4().hex[:8]}"
+    started = time.perf_counter()
+    children = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--crawl", lease_name,
+             "--last-block", str(last_block), "--http-port", str(http_port), "--lease-size", str(lease_size)],
+            cwd=SCRAPER_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    results = []
+    for child in children:
+        stdout, stderr = child.communicate()
+        lines = [line for line in stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            raise RuntimeError(f"worker failed:\n{stderr[-2000:]}")
+        results.append(json.loads(lines[-1]))
+    elapsed = time.perf_counter() - started
+    drop_leases(lease_name)
+    return elapsed, results
+
+
+def drop_leases(lease_name):
+    from qrlNetwork.utils import db_cursor
+
+    with db_cursor() as (conn, cur):
+        cur.execute('DELETE FROM public."qrl_scraper_block_lease" WHERE "name" = %s', (lease_name,))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=400)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--lease-size", type=int, default=50)
+    parser.add_argument("--fixtures")
+    parser.add_argument("--crawl")
+    parser.add_argument("--last-block", type=int)
+    parser.add_argument("--http-port", type=int)
+    args = parser.parse_args()
+
+    if args.crawl:
+        crawl(args.crawl, args.last_block, args.http_port, args.lease_size)
+        sys.exit(0)
+
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    blocks = sorted(load_blocks(fixtures_dir))
+    print(f"🧪 Leased backfill benchmark: {len(blocks)} blocks, {args.lease_size} blocks per lease, {os.cpu_count()} CPUs")
+
+    explorer = FixtureExplorer(fixtures_dir).start()
+    try:
+        baseline = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            elapsed, results = run(workers, blocks[-1], explorer.port, args.lease_size)
+            rate = len(blocks) / elapsed
+            baseline = baseline or rate
+            print(
+                f"{workers:>2} workers  {sum(r['leases'] for r in results):>4} leases  "
+                f"{sum(r['requests'] for r in results):>7} requests  {elapsed:7.2f}s  "
+                f"{rate:7.1f} blocks/s  x{rate / baseline:.2f}"
+            )
+    finally:
+        explorer.stop()
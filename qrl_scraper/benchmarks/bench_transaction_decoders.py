@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+CPU micro-benchmark: decode rate of every registered transaction type.
+
+Builds --per-type explorer transactions of each type in
+decoders.TRANSACTION_DECODERS (fixtures.TRANSACTION_BODIES), shapes them
+like /api/tx responses and times decode_transaction over them, best of
+--rounds. Reports transactions and rows per second per type, and fails if a
+transaction yields no rows (it would never count as stored).
+
+    cd qrl_scraper
+    python benchmarks/bench_transaction_decoders.py [--per-type 2000] [--rounds 5]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import TRANSACTION_BODIES, make_transaction
+from qrlNetwork.utils import load_explorer_json
+from qrlNetwork.decoders import TRANSACTION_DECODERS, decode_transaction
+
+logger = logging.getLogger("bench_transaction_decoders")
+
+
+def payloads(transaction_type, count):
+    """/api/tx-shaped payloads, byte fields decoded the way parse_transaction decodes them."""
+    rng = random.Random(transaction_type)
+    result = []
+    for index in range(count):
+        transaction = make_transaction(1000000 + index, index, rng, transaction_type)
+        body = {
+            "result": "Success",
+            "found": True,
+            "transaction": {
+                "header": {"block_number": str(1000000 + index), "timestamp_seconds": "1530004179"},
+                "tx": transaction["tx"],
+                "addr_from": transaction["addr_from"],
+            },
+        }
+        result.append(load_explorer_json(json.dumps(body).encode()))
+    return result
+
+
+def measure(transactions, rounds):
+    best = None
+    for _ in range(rounds):
+        started = time.process_time()
+        rows = [list(decode_transaction(payload, "bench", "bench", "0", logger)) for payload in transactions]
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-type", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f"🧪 Transaction decoder benchmark: {args.per_type} transactions per type, best of {args.rounds} rounds")
+
+    for transaction_type in TRANSACTION_DECODERS:
+        if transaction_type not in TRANSACTION_BODIES:
+            print(f"{transaction_type:<17} (no fixture)")
+            continue
+        seconds, rows = measure(payloads(transaction_type, args.per_type), args.rounds)
+        if not all(rows):
+            raise SystemExit(f"❌ {transaction_type}: a transaction produced no rows")
+        row_count = sum(map(len, rows))
+        print(
+            f"{transaction_type:<17} {args.per_type / seconds:9.0f} tx/s  {row_count / seconds:9.0f} rows/s  "
+            f"{row_count / args.per_type:5.2f} rows/tx"
+        )
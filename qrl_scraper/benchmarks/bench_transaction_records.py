@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: transaction rows as full scrapy.Items vs slotted records.
+
+Decodes the transactions of fixture blocks (5% of the fixture transfers have
+50 recipients) and keeps every output row alive, like Scrapy's queues do
+while the pipelines are behind. "items" rebuilds each row as a full
+QRLNetworkTransactionItem, which is what decode_transaction yielded before
+(an Item per output carrying every transaction field); "records" keeps the
+QRLNetworkTransactionRecords that share one TransactionHeader per
+transaction. Memory is measured with tracemalloc and reported per 10k
+decoded transactions.
+
+    cd qrl_scraper
+    python benchmarks/bench_transaction_records.py [number_of_blocks] [--fixtures DIR]
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import load_blocks, write_fixtures
+from itemadapter import ItemAdapter
+from qrlNetwork.items import QRLNetworkTransactionItem
+from qrlNetwork.utils import load_explorer_json
+from qrlNetwork.decoders import decode_transaction, embedded_transaction_response
+
+MODES = ("items", "records")
+logger = logging.getLogger("bench_transaction_records")
+
+
+def payloads(fixtures_dir):
+    for raw in load_blocks(fixtures_dir).values():
+        block = load_explorer_json(raw)
+        header = block["block_extended"]["header"]
+        for transaction in block["block_extended"]["extended_transactions"]:
+            yield embedded_transaction_response(block, header, transaction)
+
+
+def decode(mode, transactions):
+    rows = []
+    for payload in transactions:
+        for record, wallets in decode_transaction(payload, "bench", "bench", "0", logger, fee_in_shor=True):
+            record["transaction_wallets"] = wallets
+            rows.append(record if mode == "records" else QRLNetworkTransactionItem(ItemAdapter(record).asdict()))
+    return rows
+
+
+def measure(mode, transactions):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    rows = decode(mode, transactions)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    held = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return held, len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("count", nargs="?", type=int, default=300)
+    parser.add_argument("--fixtures")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    fixtures_dir = args.fixtures or write_fixtures(tempfile.mkdtemp(prefix="qrl-fixtures-"), args.count)
+    transactions = list(payloads(fixtures_dir))
+    print(f"🧪 Transaction record benchmark: {len(transactions)} transactions from {args.count} blocks")
+
+    for mode in MODES:
+        held, rows = measure(mode, transactions)
+        per_10k = held * 10000 / len(transactions)
+        print(
+            f"{mode:<8} {rows:>7} rows  {held / 1e6:8.2f} MB held  "
+            f"{per_10k / 1e6:8.2f} MB per 10k transactions  {held / rows:7.0f} B/row"
+        )
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: per-row transaction inserts vs the batched COPY writer.
+
+Writes synthetic transactions (hash prefix "bench-") into the configured
+database and removes them again afterwards.
+
+    cd qrl_scraper
+    python benchmarks/bench_transaction_writer.py [number_of_transactions] [batch_size]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qrlNetwork.utils import db_cursor
+from qrlNetwork.writers import TransactionWriter, TRANSACTION_COLUMNS, quoted_columns
+
+BENCH_PREFIX = "bench-"
+
+
+def make_rows(count, run):
+    now = datetime.now(timezone.utc)
+    found = datetime.fromtimestamp(1700000000)
+    rows = []
+    for i in range(count):
+        rows.append((
+            f"{BENCH_PREFIX}{run}-{i:064x}",
+            "Q" + "01" * 39,
+            "Q" + f"{i:078x}",
+            1000000000 + i,
+            "transfer",
+            4000000 + i // 10,
+            True,
+            "Success",
+            "bench",
+            "0",
+            "Buffer",
+            "",
+            1000,
+            "Buffer",
+            "ab" * 2592,
+            "Buffer",
+            i,
+            "Buffer",
+            found,
+            now,
+        ))
+    return rows
+
+
+def per_row(rows):
+    """The previous pipeline path: SELECT for duplicates, INSERT, commit - per row."""
+    for row in rows:
+        with db_cursor() as (conn, cur):
+            cur.execute(
+                'SELECT "transaction_hash" FROM public."qrl_blockchain_transactions" '
+                'WHERE "transaction_hash" = %s AND "transaction_receiving_wallet_address" = %s',
+                (row[0], row[2])
+            )
+            if cur.fetchone() is None:
+                cur.execute(
+                    f'INSERT INTO public."qrl_blockchain_transactions" ({quoted_columns(TRANSACTION_COLUMNS)}) '
+                    f'VALUES ({", ".join(["%s"] * len(TRANSACTION_COLUMNS))})',
+                    row,
+                )
+                conn.commit()
+
+
+def batched(rows, batch_size):
+    writer = TransactionWriter(batch_size=batch_size, flush_interval=3600)
+    for row in rows:
+        if writer.add(None, row):
+            writer.flush(on_error=lambda item, error: print(f"❌ {error}"))
+    writer.flush(on_error=lambda item, error: print(f"❌ {error}"))
+
+
+def cleanup():
+    with db_cursor() as (conn, cur):
+        cur.execute(
+            'DELETE FROM public."qrl_blockchain_transactions" WHERE "transaction_hash" LIKE %s',
+            (BENCH_PREFIX + "%",)
+        )
+        conn.commit()
+
+
+def report(label, count, seconds):
+    print(f"{label:<28} {count:>8} rows  {seconds:8.2f}s  {count / seconds:10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    print(f"🧪 Transaction writer benchmark ({count} transactions, batch size {batch_size})")
+    cleanup()
+    try:
+        rows = make_rows(count, "row")
+        started = time.perf_counter()
+        per_row(rows)
+        report("per-row SELECT+INSERT", count, time.perf_counter() - started)
+
+        rows = make_rows(count, "copy")
+        started = time.perf_counter()
+        batched(rows, batch_size)
+        report("batched COPY + ON CONFLICT", count, time.perf_counter() - started)
+
+        # Replaying the same rows exercises the duplicate path of both writers.
+        started = time.perf_counter()
+        batched(rows, batch_size)
+        report("batched, all duplicates", count, time.perf_counter() - started)
+    finally:
+        cleanup()
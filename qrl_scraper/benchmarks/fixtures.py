@@ -0,0 +1,258 @@
+"""
+Explorer-shaped fixtures for the benchmarks.
+
+write_fixtures() generates deterministic blocks in the JSON layout of
+/api/block/{number} (byte fields as {"type": "Buffer", "data": [...]},
+XMSS-sized public keys and signatures). A directory of real dumps saved from
+the explorer (block_{number}.json) can be used instead wherever a benchmark
+takes --fixtures.
+
+FixtureExplorer replays such a directory over HTTP like the explorer does
+(/api/block, /api/tx, /api/a and GetNodeState), optionally with a per-request
+latency and a rate limit that answers 429 + Retry-After like a throttling
+explorer.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PUBLIC_KEY_SIZE = 67  # XMSS extended public key
+SIGNATURE_SIZE = 2287  # XMSS signature, tree height 10
+BLOCK_FIXTURE = re.compile(r"^block_(\d+)\.json$")
+
+
+def buffer(data):
+    return {"type": "Buffer", "data": list(data)}
+
+
+def digest(*parts):
+    return hashlib.sha256("|".join(map(str, parts)).encode()).digest()
+
+
+def address(seed):
+    body = b"\x01\x06\x00" + digest("address", seed)
+    return body + hashlib.sha256(body).digest()[-4:]
+
+
+def make_transaction(block_number, index, rng, transaction_type=None):
+    """One explorer transaction; the type is drawn from the usual mix unless transaction_type is given."""
+    tx = {
+        "master_addr": buffer(b""),
+        "fee": str(rng.randint(1, 10) * 100000),
+        "public_key": buffer(rng.randbytes(PUBLIC_KEY_SIZE)),
+        "signature": buffer(rng.randbytes(SIGNATURE_SIZE)),
+        "nonce": str(rng.randint(1, 5000)),
+        "transaction_hash": buffer(digest("tx", block_number, index)),
+    }
+    sender = address(rng.randint(0, 5000))
+    kind = rng.random()
+    if transaction_type is None:
+        transaction_type = (
+            "coinbase" if index == 0 else "transfer" if kind < 0.80 else "slave" if kind < 0.93 else "token"
+        )
+    if transaction_type == "coinbase":
+        tx["fee"] = "0"
+        sender = bytes(39)
+    tx["transactionType"] = transaction_type
+    tx[transaction_type] = TRANSACTION_BODIES[transaction_type](rng, sender)
+    return {"header": None, "tx": tx, "addr_from": buffer(sender), "size": 2500, "timestamp_seconds": "0"}
+
+
+def recipients(rng):
+    outputs = 50 if rng.random() < 0.05 else rng.randint(1, 3)
+    return {
+        "addrs_to": [buffer(address(rng.randint(0, 5000))) for _ in range(outputs)],
+        "amounts": [str(rng.randint(1, 10 ** 12)) for _ in range(outputs)],
+    }
+
+
+def multi_sig_address(seed):
+    body = b"\x11\x00\x00" + digest("multi_sig", seed)
+    return body + hashlib.sha256(body).digest()[-4:]
+
+
+TRANSACTION_BODIES = {
+    "coinbase": lambda rng, sender: {"addr_to": buffer(address(rng.randint(0, 50))), "amount": "6656349414"},
+    "transfer": lambda rng, sender: {**recipients(rng), "message_data": buffer(b"")},
+    "slave": lambda rng, sender: {
+        "slave_pks": [buffer(rng.randbytes(PUBLIC_KEY_SIZE)) for _ in range(rng.randint(1, 4))],
+        "access_types": [0],
+    },
+    "token": lambda rng, sender: {
+        "symbol": buffer(b"BENCH"),
+        "name": buffer(b"Benchmark Token"),
+        "owner": buffer(sender),
+        "decimals": "4",
+        "initial_balances": [
+            {"address": buffer(address(rng.randint(0, 5000))), "amount": str(rng.randint(1, 10 ** 9))}
+            for _ in range(rng.randint(1, 3))
+        ],
+    },
+    "transfer_token": lambda rng, sender: {"token_txhash": buffer(digest("token", rng.randint(0, 50))), **recipients(rng)},
+    "message": lambda rng, sender: {
+        "message_hash": buffer(rng.randbytes(rng.randint(1, 80))),
+        **({"addr_to": buffer(address(rng.randint(0, 5000)))} if rng.random() < 0.5 else {}),
+    },
+    "latticePK": lambda rng, sender: {
+        "pk1": buffer(rng.randbytes(1184)), "pk2": buffer(rng.randbytes(1472)), "pk3": buffer(rng.randbytes(32)),
+    },
+    "multi_sig_create": lambda rng, sender: {
+        "signatories": [buffer(address(rng.randint(0, 5000))) for _ in range(rng.randint(2, 5))],
+        "weights": [1] * 5,
+        "threshold": 2,
+    },
+    "multi_sig_spend": lambda rng, sender: {
+        "multi_sig_address": buffer(multi_sig_address(rng.randint(0, 50))),
+        **recipients(rng),
+        "expiry_block_number": str(rng.randint(10 ** 6, 2 * 10 ** 6)),
+    },
+    "multi_sig_vote": lambda rng, sender: {
+        "shared_key": buffer(digest("shared", rng.randint(0, 500))),
+        "unvote": rng.random() < 0.1,
+        "prev_tx_hash": buffer(b""),
+    },
+}
+
+
+def make_block(block_number, transactions_per_block=8):
+    rng = random.Random(block_number)
+    header = {
+        "hash_header": buffer(digest("block", block_number)),
+        "block_number": str(block_number),
+        "timestamp_seconds": str(1530004179 + block_number * 60),
+        "hash_header_prev": buffer(digest("block", block_number - 1)),
+        "reward_block": "6656349414",
+        "reward_fee": 0,
+        "merkle_root": buffer(digest("merkle", block_number)),
+        "mining_nonce": rng.randint(0, 2 ** 32 - 1),
+        "extra_nonce": str(rng.randint(0, 2 ** 63)),
+    }
+    transactions = [
+        make_transaction(block_number, index, rng)
+        for index in range(1 + rng.randint(0, 2 * transactions_per_block))
+    ]
+    return {
+        "block_extended": {
+            "header": header,
+            "extended_transactions": transactions,
+            "genesis_balance": [],
+            "size": 1000 + 2500 * len(transactions),
+        },
+        "found": True,
+        "result": "Success",
+    }
+
+
+def write_fixtures(directory, count, first=0, transactions_per_block=8):
+    os.makedirs(directory, exist_ok=True)
+    for block_number in range(first, first + count):
+        with open(os.path.join(directory, f"block_{block_number}.json"), "w") as fixture:
+            json.dump(make_block(block_number, transactions_per_block), fixture)
+    return directory
+
+
+def load_blocks(directory):
+    """{block_number: raw JSON bytes} for every block fixture in the directory."""
+    blocks = {}
+    for file_name in os.listdir(directory):
+        match = BLOCK_FIXTURE.match(file_name)
+        if match:
+            with open(os.path.join(directory, file_name), "rb") as fixture:
+                blocks[int(match.group(1))] = fixture.read()
+    return blocks
+
+
+class FixtureExplorer:
+    """Threaded HTTP server answering explorer API paths from a fixture directory."""
+
+    def __init__(self, directory, port=0, latency=0.0, rate_limit=None):
+        self.latency = latency
+        self.rate_limit = rate_limit  # requests per second, token bucket of one second
+        self.tokens = rate_limit or 0
+        self.refilled = time.monotonic()
+        self.lock = threading.Lock()
+        self.throttled = 0
+        self.blocks = load_blocks(directory)
+        self.transactions = {}
+        for block_number, raw in self.blocks.items():
+            block_extended = json.loads(raw)["block_extended"]
+            header = block_extended["header"]
+            for extended in block_extended["extended_transactions"]:
+                tx = dict(extended["tx"])
+                tx["fee"] = str(int(tx["fee"]) / 1_000_000_000)  # /api/tx reports fees in Quanta
+                self.transactions[bytes(tx["transaction_hash"]["data"]).hex()] = json.dumps({
+                    "found": True,
+                    "result": "Success",
+                    "transaction": {
+                        "header": {"block_number": header["block_number"], "timestamp_seconds": header["timestamp_seconds"]},
+                        "tx": tx,
+                        "addr_from": extended["addr_from"],
+                    },
+                }).encode()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.port = self.server.server_address[1]
+
+    def take_token(self):
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled) * self.rate_limit)
+            self.refilled = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+    def _handler(self):
+        explorer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if explorer.latency:
+                    time.sleep(explorer.latency)
+                if not explorer.take_token():
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                path = self.path.rstrip("/")
+                argument = path.rsplit("/", 1)[-1]
+                body = None
+                if path.endswith("GetNodeState"):
+                    body = json.dumps({"info": {"block_height": str(max(explorer.blocks, default=0))}}).encode()
+                elif path.startswith("/api/block/") and argument.isdigit():
+                    body = explorer.blocks.get(int(argument))
+                elif path.startswith("/api/tx/"):
+                    body = explorer.transactions.get(argument)
+                elif path.startswith("/api/a/"):
+                    body = json.dumps({"found": True, "state": {"balance": "0", "nonce": "0"}}).encode()
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
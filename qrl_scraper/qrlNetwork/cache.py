@@ -0,0 +1,86 @@
+import os
+import gzip
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class FinalizedCache:
+    """
+    On-disk store of compressed explorer responses for finalized blocks and
+    transactions, keyed by what identifies their content: the block number or
+    the transaction hash.
+
+    Entries live under `directory` as {namespace}/{kind}/{shard}/{key}.json.gz,
+    written atomically. Total size is capped at `max_bytes`; the least
+    recently used entries are evicted first. Recency is the file mtime, which
+    get() refreshes, so the LRU order survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # path -> size, least recently used first
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                if file_name.endswith(".tmp"):
+                    os.remove(path)  # interrupted write
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self.entries[path] = size
+            self.total_bytes += size
+        logger.info(f"📦 Finalized cache: {len(self.entries)} entries, {self.total_bytes / 1e6:.1f} MB in {self.directory}")
+
+    def path(self, namespace, kind, key):
+        shard = str(key // 10000) if kind == "block" else key[:2]
+        return os.path.join(self.directory, namespace, kind, shard, f"{key}.json.gz")
+
+    def get(self, namespace, kind, key):
+        """Decompressed body, or None on a miss."""
+        path = self.path(namespace, kind, key)
+        if path not in self.entries:
+            return None
+        try:
+            with open(path, "rb") as cached:
+                body = gzip.decompress(cached.read())
+            os.utime(path)
+        except (OSError, EOFError) as e:
+            logger.warning(f"⚠️ Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        self.entries.move_to_end(path)
+        return body
+
+    def put(self, namespace, kind, key, body):
+        """Store a body; returns the number of entries evicted to stay under the size cap."""
+        path = self.path(namespace, kind, key)
+        data = gzip.compress(body, compresslevel=6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as cached:
+            cached.write(data)
+        os.replace(path + ".tmp", path)
+
+        self.total_bytes += len(data) - self.entries.pop(path, 0)
+        self.entries[path] = len(data)
+        evicted = 0
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self._remove(next(iter(self.entries)))
+            evicted += 1
+        return evicted
+
+    def _remove(self, path):
+        self.total_bytes -= self.entries.pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
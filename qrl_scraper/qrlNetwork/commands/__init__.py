@@ -0,0 +1 @@
+# Project scrapy commands (COMMANDS_MODULE); the module name is the command name.
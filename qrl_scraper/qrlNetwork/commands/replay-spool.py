@@ -0,0 +1,86 @@
+import os
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.project import data_path
+
+from ..spool import OPEN_SUFFIX, is_connection_error, quarantine_segment, read_frames, replay_segment, spool_segments
+
+
+class Command(ScrapyCommand):
+    """
+    scrapy replay-spool [--check] [--include-open]
+
+    Loads the segments of the write-ahead spool (see spool.WriteAheadSpool)
+    into the database, oldest first. Every frame is COPY'd into a temporary
+    staging table and moved into its table with the INSERT ... ON CONFLICT
+    its writer spooled (BatchWriter.replay_conflict), so replaying a batch
+    that did reach the database is harmless, and stale wallet states do not
+    overwrite newer ones. A frame the database rejects is retried row by
+    row; rows it still rejects are recorded in the missed items table. A
+    segment is loaded in one DB transaction and deleted once that commits.
+    A connection error stops the replay and keeps the segment; a segment
+    that fails otherwise (e.g. corrupt) is renamed to {n}.failed and the
+    replay goes on. A running crawl replays sealed segments by itself when the
+    database is back (SPOOL_REPLAY_INTERVAL); this command is for segments
+    left behind by crawls that ended before that.
+    """
+
+    requires_project = True
+    default_settings = {"LOG_LEVEL": "INFO"}
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Load batches spooled while the database was unreachable"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument(
+            "--check", action="store_true", help="verify the segment checksums and count the rows without loading them"
+        )
+        parser.add_argument(
+            "--include-open", action="store_true",
+            help="also load segments still open (left by a crash; do not use while a crawl is spooling)",
+        )
+
+    def run(self, args, opts):
+        if args:
+            raise UsageError()
+        directory = data_path(self.settings.get("SPOOL_DIR", "spool"))
+        segments = [
+            path for path in spool_segments(directory) if opts.include_open or not path.endswith(OPEN_SUFFIX)
+        ]
+        if not segments:
+            print(f"✅ Nothing to replay in {directory}")
+            return
+
+        frames = rows = 0
+        for path in segments:
+            try:
+                segment_frames, segment_rows = self.check(path) if opts.check else replay_segment(path)
+            except Exception as error:
+                self.exitcode = 1
+                if opts.check:
+                    print(f"❌ {os.path.basename(path)}: {error}")
+                    continue
+                if is_connection_error(error):
+                    print(f"❌ Replay of {os.path.basename(path)} failed, segment kept: {error}")
+                    return
+                quarantine_segment(path, error)  # logs where it went
+                continue
+            frames += segment_frames
+            rows += segment_rows
+            verb = "🔎 CHECKED" if opts.check else "✅ REPLAYED"
+            print(f"{verb} {os.path.basename(path)}: {segment_rows} rows in {segment_frames} batches")
+        verb = "🔎 Checked" if opts.check else "✅ Replayed"
+        print(f"{verb} {rows} rows in {frames} batches from {len(segments)} segments")
+
+    @staticmethod
+    def check(path):
+        frames = rows = 0
+        for header, _ in read_frames(path):
+            frames += 1
+            rows += header["rows"]
+        return frames, rows
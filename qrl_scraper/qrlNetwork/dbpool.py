@@ -0,0 +1,231 @@
+import time
+import random
+import logging
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection could be checked out within the acquire timeout."""
+
+
+class HealingConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool that replaces broken connections
+    instead of handing them out.
+
+    `connect` is called for every new connection. On checkout a connection
+    is dropped and replaced when it is closed, older than `max_lifetime`
+    seconds, or, when it sat idle for longer than `validate_idle_after`
+    seconds, fails a `SELECT 1`. A failed validation also drops the other
+    idle connections, which usually share the fate (server restart, revoked
+    credentials). When no connection can be opened, getconn() retries with
+    exponential backoff (with jitter) from `backoff_initial` up to
+    `backoff_max` seconds, and raises PoolTimeout (an OperationalError)
+    after `acquire_timeout` seconds; it also waits up to that long for a
+    free slot when all `maxconn` connections are in use.
+    getconn(blocking=False) makes a single attempt instead.
+
+    stats() reports checkouts, wait time, in-use and idle counts, opened
+    connections and reconnects.
+    """
+
+    def __init__(
+        self, connect, maxconn=10, max_lifetime=1800, validate_idle_after=5,
+        acquire_timeout=10, backoff_initial=0.1, backoff_max=5,
+    ):
+        self.connect = connect
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.validate_idle_after = validate_idle_after
+        self.acquire_timeout = acquire_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.condition = threading.Condition()
+        self.idle = []  # list of (connection, opened_at, released_at), most recently released last
+        self.opened_at = {}  # id(connection) -> monotonic time it was opened, for connections in use
+        self.opening = 0  # connections being opened outside the lock
+        self.counters = dict.fromkeys(
+            ("checkouts", "opened", "reconnects", "expired", "failed_connects", "timeouts"), 0
+        )
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.opened_at) + self.opening
+
+    def getconn(self, blocking=True):
+        """
+        Check out a healthy connection; blocks (with backoff) until one is
+        available. blocking=False makes a single attempt, without waiting for
+        a free slot or sleeping between connection attempts, and raises
+        PoolTimeout right away when it fails: for callers on the Twisted
+        reactor thread, which must not stall.
+        """
+        started = time.monotonic()
+        deadline = started + (self.acquire_timeout if blocking else 0)
+        delay = self.backoff_initial
+        while True:
+            connection = self._checkout_idle(deadline)
+            if connection is None:
+                connection, error = self._open_reserved()
+                if connection is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out(started)
+                        within = f" within {self.acquire_timeout:g}s" if blocking else ""
+                        raise PoolTimeout(f"Could not connect to the database{within}: {error}")
+                    logger.warning(f"⚠️ Database connection failed, retrying in {delay:.2f}s: {error}")
+                    time.sleep(min(delay * random.uniform(0.5, 1.0), remaining))
+                    delay = min(delay * 2, self.backoff_max)
+                    continue
+            waited = time.monotonic() - started
+            with self.condition:
+                self.counters["checkouts"] += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return connection
+
+    def _checkout_idle(self, deadline):
+        """
+        A validated idle connection, or None once a slot for a new connection
+        is reserved (self.opening; see _open_reserved).
+        """
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise PoolTimeout(f"All {self.maxconn} database connections are in use")
+                    self.condition.wait(remaining)
+                if not self.idle:
+                    self.opening += 1
+                    return None
+                connection, opened_at, released_at = self.idle.pop()
+                self.opened_at[id(connection)] = opened_at
+
+            if self._healthy(connection, opened_at, released_at):
+                return connection
+            self._discard(connection)
+
+    def _open_reserved(self):
+        """
+        Open a connection in the slot reserved by _checkout_idle. Returns
+        (connection, None), or (None, error) when connect() fails with a
+        psycopg2.Error; any other exception (e.g. missing settings) is raised.
+        The reservation is released either way.
+        """
+        connection = failure = None
+        try:
+            connection = self.connect()
+        except psycopg2.Error as error:
+            failure = error
+        finally:
+            with self.condition:
+                self.opening -= 1
+                if connection is None:
+                    self.counters["failed_connects"] += 1
+                    self.condition.notify()
+                else:
+                    self.counters["opened"] += 1
+                    self.opened_at[id(connection)] = time.monotonic()
+        return connection, failure
+
+    def _healthy(self, connection, opened_at, released_at):
+        now = time.monotonic()
+        if connection.closed:
+            self._count("reconnects")
+            return False
+        if now - opened_at >= self.max_lifetime:
+            self._count("expired")
+            return False
+        if now - released_at < self.validate_idle_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error as error:
+            logger.warning(f"⚠️ Dropping a broken database connection and the idle ones opened with it: {error}")
+            self._count("reconnects")
+            with self.condition:
+                stale, self.idle = self.idle, []
+            for stale_connection, _, _ in stale:
+                self._close(stale_connection)
+                self._count("reconnects")
+            with self.condition:
+                self.condition.notify_all()
+            return False
+
+    def putconn(self, connection, close=False):
+        """Return a connection; broken, expired or failed-transaction connections are closed instead of kept."""
+        with self.condition:
+            opened_at = self.opened_at.get(id(connection))
+        if opened_at is None:
+            logger.error("❌ Tried to release a connection that is not checked out from the pool.")
+            return
+        if not close and not connection.closed:
+            status = connection.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    close = True
+        if close or connection.closed or time.monotonic() - opened_at >= self.max_lifetime:
+            self._discard(connection)
+            return
+        with self.condition:
+            del self.opened_at[id(connection)]
+            self.idle.append((connection, opened_at, time.monotonic()))
+            self.condition.notify()
+
+    def closeall(self):
+        with self.condition:
+            connections = [connection for connection, _, _ in self.idle]
+            self.idle = []
+        for connection in connections:
+            self._close(connection)
+
+    def stats(self):
+        with self.condition:
+            checkouts = self.counters["checkouts"]
+            return {
+                **self.counters,
+                "in_use": len(self.opened_at),
+                "idle": len(self.idle),
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "avg_wait_ms": round(self.wait_seconds * 1000 / checkouts, 3) if checkouts else 0.0,
+            }
+
+    def _discard(self, connection):
+        with self.condition:
+            self.opened_at.pop(id(connection), None)
+            self.condition.notify()
+        self._close(connection)
+
+    def _timed_out(self, started):
+        with self.condition:
+            self.counters["timeouts"] += 1
+            waited = time.monotonic() - started
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _count(self, counter):
+        with self.condition:
+            self.counters[counter] += 1
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
@@ -0,0 +1,459 @@
+"""
+Decoding of explorer transaction payloads into transaction rows: one
+QRLNetworkTransactionRecord per output, all sharing the TransactionHeader of
+their transaction.
+
+Shared by QRLNetworkSpider.parse_transaction (/api/tx/{hash} responses) and
+parse_block (transactions embedded in /api/block/{number} responses). The
+type-specific part is decoded by the TransactionDecoder registered for the
+transaction's transactionType in TRANSACTION_DECODERS.
+"""
+
+from .items import TransactionHeader, QRLNetworkTransactionRecord
+from .utils import BYTE_LIST_TYPES, list_integer_to_hex, list_integer_to_string
+
+
+def is_complete_embedded_transaction(transaction):
+    """
+    True when an entry of block_extended["extended_transactions"] carries
+    everything decode_transaction needs, so no /api/tx request is required.
+    """
+    if not isinstance(transaction, dict):
+        return False
+    transaction_tx = transaction.get("tx")
+    if not isinstance(transaction_tx, dict):
+        return False
+    transaction_type = transaction_tx.get("transactionType")
+    if not isinstance(transaction_type, str) or not isinstance(transaction_tx.get(transaction_type), dict):
+        return False
+    transaction_hash = transaction_tx.get("transaction_hash")
+    if not isinstance(transaction_hash, dict) or not isinstance(transaction_hash.get("data"), BYTE_LIST_TYPES):
+        return False
+    addr_from = transaction.get("addr_from")
+    return isinstance(addr_from, dict) and isinstance(addr_from.get("data"), BYTE_LIST_TYPES)
+
+
+def embedded_transaction_response(block_response, block_header, transaction):
+    """Shape an embedded block transaction like the JSON of an /api/tx/{hash} response."""
+    return {
+        "result": block_response.get("result", "Unknown"),
+        "found": block_response.get("found", False),
+        "transaction": {
+            "header": {
+                "block_number": block_header["block_number"],
+                "timestamp_seconds": block_header["timestamp_seconds"],
+            },
+            "tx": transaction["tx"],
+            "addr_from": transaction["addr_from"],
+        },
+    }
+
+
+def decode_transaction(json_response, item_url, spider_name, spider_version, logger, fee_in_shor=False):
+    """
+    Yield (QRLNetworkTransactionRecord, wallets) for every row of a transaction payload.
+
+    `wallets` are the addresses whose state should be refreshed after the row.
+    The /api/tx endpoint reports string fees in Quanta; block payloads carry the
+    raw protobuf value in Shor, which is what fee_in_shor=True selects.
+    """
+    item_transaction = TransactionHeader()
+    item_transaction["item_url"] = item_url
+
+    # Validate transaction field
+    transaction = json_response.get("transaction", {})
+    if not isinstance(transaction, dict):
+        logger.error(f"Unexpected format for transaction: {type(transaction)} - {transaction}")
+        return
+
+    item_transaction["spider_name"] = spider_name
+    item_transaction["spider_version"] = spider_version
+
+    item_transaction["transaction_result"] = json_response.get("result", "Unknown")
+    item_transaction["transaction_found"] = json_response.get("found", False)
+
+    # Validate transaction_header
+    transaction_header = transaction.get("header", {})
+    if not isinstance(transaction_header, dict):
+        logger.error(f"Unexpected format for transaction_header: {type(transaction_header)} - {transaction_header}")
+        return
+
+    try:
+        block_number = int(transaction_header.get("block_number", 0))
+        block_found_datetime = int(transaction_header.get("timestamp_seconds", 0))
+    except (TypeError, ValueError) as e:
+        logger.error(f"Invalid data in transaction_header: {e}")
+        return
+
+    item_transaction["transaction_block_number"] = block_number
+    item_transaction["block_found_datetime"] = block_found_datetime
+    item_transaction["block_found_timestamp_seconds"] = block_found_datetime
+
+    # Validate transaction_tx
+    transaction_tx = transaction.get("tx", {})
+    if not isinstance(transaction_tx, dict):
+        logger.error(f"Unexpected format for transaction_tx: {type(transaction_tx)} - {transaction_tx}")
+        return
+
+    item_transaction["transaction_type"] = transaction_tx.get("transactionType", "Unknown")
+    item_transaction["transaction_nonce"] = int(transaction_tx.get("nonce", 0))
+
+    # Validate master_addr
+    master_addr = transaction_tx.get("master_addr", {})
+    if not isinstance(master_addr, dict):
+        logger.error(f"Unexpected format for master_addr: {type(master_addr)} - {master_addr}")
+        master_addr = {}
+
+    item_transaction["master_addr_type"] = master_addr.get("type", "Unknown")
+    master_addr_data = master_addr.get("data", [])
+    if isinstance(master_addr_data, BYTE_LIST_TYPES):
+        item_transaction["master_addr_data"] = list_integer_to_hex(master_addr_data)
+    else:
+        logger.error(f"Invalid data format for master_addr['data']: {type(master_addr_data)}")
+        item_transaction["master_addr_data"] = None
+
+    # Extract master_addr_fee from the transaction
+    # For coinbase transactions, fee is typically 0
+    # For other transactions, fee might be in the transaction data
+    if item_transaction["transaction_type"] == "coinbase":
+        item_transaction["master_addr_fee"] = 0
+    else:
+        # Try to get fee from transaction data, default to 0 if not found
+        fee_value = transaction_tx.get("fee", 0)
+
+        if fee_in_shor:
+            # Block payloads keep the protobuf uint64 (Shor), serialized as a number or a digit string
+            try:
+                item_transaction["master_addr_fee"] = int(fee_value)
+            except (ValueError, TypeError):
+                logger.warning(f"Could not convert fee '{fee_value}' to numeric value, using 0")
+                item_transaction["master_addr_fee"] = 0
+        elif isinstance(fee_value, str):
+            try:
+                # Convert string fee to float, then to integer (assuming fee is in QRL units)
+                # Example: "0.0005" -> 0.0005 -> 500 (if fee is in QRL units)
+                fee_float = float(fee_value)
+                # Convert to smallest unit (assuming 1 QRL = 1,000,000,000 units)
+                item_transaction["master_addr_fee"] = int(fee_float * 1000000000)
+            except (ValueError, TypeError):
+                logger.warning(f"Could not convert fee '{fee_value}' to numeric value, using 0")
+                item_transaction["master_addr_fee"] = 0
+        else:
+            # If fee is already numeric, use it directly
+            item_transaction["master_addr_fee"] = fee_value
+
+    # Validate transaction hash
+    transaction_hash = transaction_tx.get("transaction_hash", {})
+    if isinstance(transaction_hash, str):
+        item_transaction["transaction_hash"] = transaction_hash
+    elif isinstance(transaction_hash, dict) and "data" in transaction_hash:
+        item_transaction["transaction_hash"] = list_integer_to_hex(transaction_hash["data"])
+    else:
+        logger.error(f"Unexpected format for transaction_hash: {type(transaction_hash)} - {transaction_hash}")
+        item_transaction["transaction_hash"] = None
+
+    # Validate public_key
+    public_key = transaction_tx.get("public_key", {})
+    if isinstance(public_key, str):
+        item_transaction["public_key_data"] = public_key
+        item_transaction["public_key_type"] = "String"
+    elif isinstance(public_key, dict):
+        item_transaction["public_key_type"] = public_key.get("type", "Unknown")
+        if isinstance(public_key.get("data"), BYTE_LIST_TYPES):
+            item_transaction["public_key_data"] = list_integer_to_hex(public_key["data"])
+        else:
+            logger.error(f"Invalid public_key['data']: {type(public_key.get('data'))}")
+            item_transaction["public_key_data"] = None
+    else:
+        logger.error(f"Unexpected format for public_key: {type(public_key)} - {public_key}")
+        item_transaction["public_key_data"] = None
+
+    # Validate signature
+    signature = transaction_tx.get("signature", {})
+    if isinstance(signature, str):
+        item_transaction["signature_type"] = "String"
+        item_transaction["signature_data"] = signature
+    elif isinstance(signature, dict):
+        item_transaction["signature_type"] = signature.get("type", "Unknown")
+    else:
+        logger.error(f"Unexpected format for signature: {type(signature)} - {signature}")
+        item_transaction["signature_type"] = None
+
+    # ---------------------------
+    # Handle Different Transaction Types
+    # ---------------------------
+    transaction_type = item_transaction["transaction_type"]
+    decoder = TRANSACTION_DECODERS.get(transaction_type)
+    if decoder is None:
+        logger.warning(f"⚠️ No decoder for transaction type {transaction_type!r}, storing the sender only")
+        decoder = UNKNOWN_TRANSACTION_DECODER
+
+    transaction_body = transaction_tx.get(transaction_type, {})
+    if not isinstance(transaction_body, dict):
+        logger.error(f"Unexpected format for {transaction_type}: {type(transaction_body)} - {transaction_body}")
+        transaction_body = {}
+
+    yield from decoder.outputs(item_transaction, transaction, transaction_body, logger)
+
+
+def address_of(field):
+    """
+    "Q" + hex of an address given as a Buffer ({"data": [...]}) or its data;
+    addresses already given as strings are returned as they are. "" when
+    the field holds no address.
+    """
+    if isinstance(field, dict):
+        field = field.get("data", [])
+    if isinstance(field, str):
+        return field
+    if isinstance(field, BYTE_LIST_TYPES) and len(field):
+        return "Q" + list_integer_to_hex(field)
+    return ""
+
+
+# ---------------------------
+# Transaction Type Decoders
+# ---------------------------
+TRANSACTION_DECODERS = {}
+
+
+def register_decoder(decoder_class):
+    """Class decorator: dispatch transactions of decoder_class.transaction_type to an instance of it."""
+    TRANSACTION_DECODERS[decoder_class.transaction_type] = decoder_class()
+    return decoder_class
+
+
+class TransactionDecoder:
+    """
+    Decodes the type-specific part of one transaction type (transaction_tx[type]).
+
+    outputs() yields (QRLNetworkTransactionRecord, wallets) for every row the
+    transaction stores, all sharing the already decoded TransactionHeader;
+    by default a single row from the sender, for types that move no funds.
+    Every transaction must yield at least one row, or its hash never reaches
+    qrl_blockchain_transactions and the block is rescraped as incomplete.
+    """
+
+    transaction_type = None
+
+    def outputs(self, header, transaction, body, logger):
+        yield self.single_output(header, self.sender(transaction, body))
+
+    def signer(self, transaction):
+        """The address that signed the transaction (addr_from)."""
+        return "Q" + list_integer_to_hex(transaction.get("addr_from", {}).get("data", []))
+
+    def sender(self, transaction, body):
+        """The address the rows are sent from; the signer unless the type says otherwise."""
+        return self.signer(transaction)
+
+    def single_output(self, header, sender, receiver="", amount=0, addrs_to_type=""):
+        """The one row of a transaction that moves no funds to a list of recipients."""
+        local_item = QRLNetworkTransactionRecord(header)
+        local_item["transaction_sending_wallet_address"] = sender
+        local_item["transaction_receiving_wallet_address"] = receiver
+        local_item["transaction_amount_send"] = amount
+        local_item["transaction_addrs_to_type"] = addrs_to_type
+        return local_item, [receiver, sender]
+
+
+class RecipientsDecoder(TransactionDecoder):
+    """One row per entry of body["addrs_to"], paired with body["amounts"]."""
+
+    def outputs(self, header, transaction, body, logger):
+        sender = self.sender(transaction, body)
+        amounts_list = body.get("amounts", [])
+        transfer_list = []
+        transfer_type_list = []
+
+        for single_transfer in body.get("addrs_to", []):
+            if isinstance(single_transfer, dict) and "data" in single_transfer:
+                transfer_list.append(list_integer_to_hex(single_transfer["data"]))
+                transfer_type_list.append(single_transfer.get("type", "Unknown"))
+
+        # One transaction item per recipient, followed by the wallets it touches.
+        for receiver, amount, addrs_to_type in zip(transfer_list, amounts_list, transfer_type_list):
+            local_item = QRLNetworkTransactionRecord(header)
+            local_item["transaction_sending_wallet_address"] = sender
+            local_item["transaction_receiving_wallet_address"] = "Q" + receiver
+            local_item["transaction_amount_send"] = amount
+            local_item["transaction_addrs_to_type"] = addrs_to_type
+
+            logger.info(f"🔄 Yielding transaction item: {local_item['transaction_hash'][:20]}... | Type: {local_item['transaction_type']} | Amount: {local_item['transaction_amount_send']}")
+            yield local_item, self.wallets(local_item, transaction)
+
+    def wallets(self, local_item, transaction):
+        return [
+            local_item["transaction_receiving_wallet_address"],
+            local_item["transaction_sending_wallet_address"],
+        ]
+
+
+@register_decoder
+class TransferDecoder(RecipientsDecoder):
+    transaction_type = "transfer"
+
+
+@register_decoder
+class TransferTokenDecoder(RecipientsDecoder):
+    """Token transfers: the amounts are in units of the token created by body["token_txhash"]."""
+
+    transaction_type = "transfer_token"
+
+
+@register_decoder
+class MultiSigSpendDecoder(RecipientsDecoder):
+    """Spends from a multi-sig address, proposed by the signatory in addr_from."""
+
+    transaction_type = "multi_sig_spend"
+
+    def sender(self, transaction, body):
+        return address_of(body.get("multi_sig_address"))
+
+    def wallets(self, local_item, transaction):
+        return super().wallets(local_item, transaction) + [self.signer(transaction)]
+
+
+@register_decoder
+class CoinbaseDecoder(TransactionDecoder):
+    transaction_type = "coinbase"
+
+    def outputs(self, header, transaction, body, logger):
+        coinbase_transfer = body.get("addr_to", {})
+        yield self.single_output(
+            header,
+            self.sender(transaction, body),
+            "Q" + list_integer_to_hex(coinbase_transfer.get("data", [])),
+            body.get("amount", "0"),
+            coinbase_transfer.get("type", "Unknown"),
+        )
+
+
+@register_decoder
+class SlaveDecoder(TransactionDecoder):
+    transaction_type = "slave"
+
+    def outputs(self, header, transaction, body, logger):
+        master_data = transaction.get("addr_from", {}).get("data", [])
+        if isinstance(master_data, BYTE_LIST_TYPES) and len(master_data) == 32:
+            master_address = "Q" + list_integer_to_hex(master_data)
+        else:
+            master_address = ""
+        for slave_pk in body.get("slave_pks", []):
+            if isinstance(slave_pk, dict):
+                slave_data = slave_pk.get("data", [])
+            elif isinstance(slave_pk, BYTE_LIST_TYPES):
+                slave_data = slave_pk
+            elif isinstance(slave_pk, str):
+                local_item, _ = self.single_output(header, master_address, slave_pk)
+                yield local_item, []
+                continue
+            else:
+                slave_data = []
+            if isinstance(slave_data, BYTE_LIST_TYPES) and len(slave_data) == 32:
+                slave_address = "Q" + list_integer_to_hex(slave_data)
+            else:
+                slave_address = ""
+            local_item, _ = self.single_output(header, master_address, slave_address)
+            yield local_item, [master_address, slave_address]
+
+
+@register_decoder
+class TokenDecoder(TransactionDecoder):
+    transaction_type = "token"
+
+    def outputs(self, header, transaction, body, logger):
+        initial_balances = body.get("initialBalances") or body.get("initial_balances", [])
+        receiving_addresses = []
+        for balance_entry in initial_balances:
+            if isinstance(balance_entry, dict):
+                address_field = balance_entry.get("address")
+                if isinstance(address_field, dict):
+                    data = address_field.get("data", [])
+                    if data:
+                        receiving_addresses.append("Q" + list_integer_to_hex(data))
+                elif isinstance(address_field, str):
+                    receiving_addresses.append(address_field)
+        local_item = QRLNetworkTransactionRecord(header)
+        local_item["transaction_receiving_wallet_address"] = (
+            ", ".join(receiving_addresses) if receiving_addresses else "UNKNOWN"
+        )
+        local_item["initial_balance_address"] = (receiving_addresses[0] if receiving_addresses else "UNKNOWN")
+        local_item["initial_balance"] = (initial_balances[0].get("amount", "0")
+                                        if initial_balances and isinstance(initial_balances[0], dict)
+                                        else "0")
+        token_symbol = body.get("symbol")
+        if isinstance(token_symbol, dict):
+            token_symbol = list_integer_to_string(token_symbol.get("data", []))
+        local_item["token_symbol"] = token_symbol or "UNKNOWN"
+        token_name = body.get("name")
+        if isinstance(token_name, dict):
+            token_name = list_integer_to_string(token_name.get("data", []))
+        local_item["token_name"] = token_name or "UNKNOWN"
+        token_owner = body.get("owner", {})
+        if isinstance(token_owner, dict):
+            owner_data = token_owner.get("data", [])
+            local_item["token_owner"] = "Q" + list_integer_to_hex(owner_data) if owner_data else "UNKNOWN"
+        elif isinstance(token_owner, str):
+            local_item["token_owner"] = token_owner
+        else:
+            local_item["token_owner"] = "UNKNOWN"
+        try:
+            local_item["token_decimals"] = int(body.get("decimals", 0))
+        except (TypeError, ValueError):
+            local_item["token_decimals"] = 0
+
+        yield local_item, [
+            local_item.get("transaction_receiving_wallet_address"),
+            local_item.get("transaction_sending_wallet_address"),
+        ]
+
+
+@register_decoder
+class MessageDecoder(TransactionDecoder):
+    """On-chain messages; addr_to is only set for messages sent to an address."""
+
+    transaction_type = "message"
+
+    def outputs(self, header, transaction, body, logger):
+        yield self.single_output(header, self.sender(transaction, body), address_of(body.get("addr_to")))
+
+
+@register_decoder
+class LatticePKDecoder(TransactionDecoder):
+    transaction_type = "latticePK"
+
+
+@register_decoder
+class MultiSigCreateDecoder(TransactionDecoder):
+    """One row per signatory of the new multi-sig address; the weights are not stored."""
+
+    transaction_type = "multi_sig_create"
+
+    def outputs(self, header, transaction, body, logger):
+        sender = self.sender(transaction, body)
+        signatories = [
+            (address_of(signatory), signatory.get("type", "Unknown") if isinstance(signatory, dict) else "")
+            for signatory in body.get("signatories", [])
+        ]
+        signatories = [(signatory, addrs_to_type) for signatory, addrs_to_type in signatories if signatory]
+        if not signatories:
+            logger.warning(f"⚠️ multi_sig_create {header['transaction_hash']} without signatories")
+            yield self.single_output(header, sender)
+            return
+        for signatory, addrs_to_type in signatories:
+            yield self.single_output(header, sender, signatory, addrs_to_type=addrs_to_type)
+
+
+@register_decoder
+class MultiSigVoteDecoder(TransactionDecoder):
+    """A signatory's (un)vote on the multi_sig_spend body["shared_key"]."""
+
+    transaction_type = "multi_sig_vote"
+
+
+class UnknownTransactionDecoder(TransactionDecoder):
+    """Fallback for types without a decoder: the sender only, so the transaction still counts as stored."""
+
+
+UNKNOWN_TRANSACTION_DECODER = UnknownTransactionDecoder()
@@ -0,0 +1,42 @@
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from .utils import db_pool_stats
+
+
+class DBPoolStats:
+    """
+    Copies the DB connection pool metrics (utils.db_pool_stats) into the
+    crawl stats as db_pool/* every DB_POOL_STATS_INTERVAL seconds and when
+    the spider closes: checkouts, wait time, in-use and idle connections,
+    opened connections, reconnects, expired connections and timeouts.
+    """
+
+    def __init__(self, stats, interval):
+        self.stats = stats
+        self.interval = interval
+        self.update_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        interval = crawler.settings.getfloat("DB_POOL_STATS_INTERVAL", 30)
+        if interval <= 0:
+            raise NotConfigured
+        extension = cls(crawler.stats, interval)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self.update_loop = task.LoopingCall(self.update)
+        self.update_loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.update_loop and self.update_loop.running:
+            self.update_loop.stop()
+        self.update()
+
+    def update(self):
+        for name, value in db_pool_stats().items():
+            self.stats.set_value(f"db_pool/{name}", value)
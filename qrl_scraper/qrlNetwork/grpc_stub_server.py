@@ -0,0 +1,119 @@
+"""
+Local stand-in for a QRL node's gRPC PublicAPI that replays fixtures, so the
+gRPC engine can be run and benchmarked offline.
+
+Fixtures are explorer responses saved as JSON files in one directory:
+    block_{number}.json      body of /api/block/{number}
+    address_{Q-address}.json body of /api/a/{address} (optional)
+
+    cd qrl_scraper
+    python -m qrlNetwork.grpc_stub_server --fixtures benchmarks/fixtures --port 19009
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from concurrent import futures
+
+import grpc
+
+from .grpc_ingest import qrl_pb2, qrl_pb2_grpc, json_to_message
+
+BLOCK_FIXTURE = re.compile(r"^block_(\d+)\.json$")
+ADDRESS_FIXTURE = re.compile(r"^address_(Q[0-9a-fA-F]+)\.json$")
+
+
+class FixtureReplayServicer(qrl_pb2_grpc.PublicAPIServicer):
+    """Answers PublicAPI calls from explorer fixtures, converted to protobuf once at startup."""
+
+    def __init__(self, fixtures_dir):
+        self.blocks = {}
+        self.transactions = {}
+        self.addresses = {}
+        for file_name in sorted(os.listdir(fixtures_dir)):
+            path = os.path.join(fixtures_dir, file_name)
+            if BLOCK_FIXTURE.match(file_name):
+                with open(path) as fixture:
+                    self._load_block(json.load(fixture))
+            elif ADDRESS_FIXTURE.match(file_name):
+                with open(path) as fixture:
+                    state = json.load(fixture).get("state", {})
+                self.addresses[ADDRESS_FIXTURE.match(file_name).group(1)] = json_to_message(
+                    state, qrl_pb2.OptimizedAddressState()
+                )
+        logging.info(f"Loaded {len(self.blocks)} blocks and {len(self.transactions)} transactions from {fixtures_dir}")
+
+    def _load_block(self, block_json):
+        block_extended = block_json["block_extended"]
+        header = json_to_message(block_extended["header"], qrl_pb2.BlockHeader())
+        block = qrl_pb2.Block(header=header)
+        for extended in block_extended.get("extended_transactions", []):
+            transaction = json_to_message(extended["tx"], qrl_pb2.Transaction())
+            if not transaction.master_addr and extended.get("addr_from"):
+                # Fixture senders may not derive from the (fake) public key; keep them via master_addr.
+                transaction.master_addr = bytes(extended["addr_from"]["data"])
+            block.transactions.append(transaction)
+            self.transactions[transaction.transaction_hash] = qrl_pb2.TransactionExtended(
+                header=header,
+                tx=transaction,
+                addr_from=transaction.master_addr,
+                size=transaction.ByteSize(),
+                timestamp_seconds=header.timestamp_seconds,
+            )
+        self.blocks[header.block_number] = block
+
+    def GetNodeState(self, request, context):
+        return qrl_pb2.GetNodeStateResp(info=qrl_pb2.NodeInfo(
+            version="fixture-replay",
+            state=qrl_pb2.NodeInfo.SYNCED,
+            block_height=max(self.blocks, default=0),
+            network_id="fixtures",
+        ))
+
+    def GetBlockByNumber(self, request, context):
+        block = self.blocks.get(request.block_number)
+        if block is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Block {request.block_number} not in fixtures")
+        return qrl_pb2.GetBlockByNumberResp(block=block)
+
+    def GetObject(self, request, context):
+        transaction = self.transactions.get(request.query)
+        if transaction is None:
+            return qrl_pb2.GetObjectResp(found=False)
+        return qrl_pb2.GetObjectResp(found=True, transaction=transaction)
+
+    def GetOptimizedAddressState(self, request, context):
+        address = "Q" + request.address.hex()
+        state = self.addresses.get(address)
+        if state is None:
+            state = qrl_pb2.OptimizedAddressState(address=request.address, balance=0, nonce=0)
+        return qrl_pb2.GetOptimizedAddressStateResp(state=state)
+
+
+def serve(fixtures_dir, port=19009, max_workers=16):
+    """Start the replay server in the background and return it (call .stop(None) to shut down)."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    qrl_pb2_grpc.add_PublicAPIServicer_to_server(FixtureReplayServicer(fixtures_dir), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay explorer fixtures over the QRL PublicAPI.")
+    parser.add_argument("--fixtures", required=True)
+    parser.add_argument("--port", type=int, default=19009)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = serve(args.fixtures, args.port, args.workers)
+    print(f"🛰️  Stub QRL node listening on 127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop(None)
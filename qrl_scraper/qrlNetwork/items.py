@@ -1,4 +1,6 @@
 import scrapy
+from itemadapter import ItemAdapter
+from itemadapter.adapter import AdapterInterface
 
 
 class QRLNetworkBlockItem(scrapy.Item):
@@ -23,6 +25,7 @@ class QRLNetworkBlockItem(scrapy.Item):
     block_hash_header_data_prev =scrapy.Field()  
     block_merkle_root_type =scrapy.Field()  
     block_merkle_root_data =scrapy.Field()    
+    block_transaction_hashes =scrapy.Field()  # hashes the ingestion state waits for
     
     item_url =scrapy.Field() 
     pass
@@ -59,6 +62,7 @@ class QRLNetworkTransactionItem(scrapy.Item):
     token_name = scrapy.Field()
     token_owner = scrapy.Field()
     token_decimals = scrapy.Field()
+    transaction_wallets = scrapy.Field()  # wallets whose refresh completes the block's ingestion
 
 
     item_url =scrapy.Field()           
@@ -86,6 +90,7 @@ class QRLNetworkAddressItem(scrapy.Item):
     address_proposal_vote_stats =  scrapy.Field()
     
     address_last_updated =  scrapy.Field()
+    refresh_block_height = scrapy.Field()  # block height the wallet was fetched for, recorded in qrl_wallet_refresh
     item_url =scrapy.Field()     
     pass
 
@@ -125,3 +130,148 @@ class QRLNetworkMissedItem(scrapy.Item):
 class QRLNetworkEmissionItem(scrapy.Item):
     emission = scrapy.Field()
     updated_at = scrapy.Field()
+
+
+# Fields that differ between the output rows of one transaction (e.g. each recipient of a transfer);
+# everything else in QRLNetworkTransactionItem is the same for all of them.
+TRANSACTION_OUTPUT_FIELDS = (
+    "transaction_sending_wallet_address",
+    "transaction_receiving_wallet_address",
+    "transaction_amount_send",
+    "transaction_addrs_to_type",
+    "transaction_wallets",
+)
+TRANSACTION_HEADER_FIELDS = tuple(
+    field for field in QRLNetworkTransactionItem.fields if field not in TRANSACTION_OUTPUT_FIELDS
+)
+
+
+class TransactionHeader:
+    """
+    The fields of one transaction shared by all of its output rows. Every
+    QRLNetworkTransactionRecord of the transaction points to the same header,
+    so the large hex fields (public key, signature) exist once per
+    transaction instead of once per output.
+    """
+
+    __slots__ = TRANSACTION_HEADER_FIELDS
+    field_set = frozenset(TRANSACTION_HEADER_FIELDS)
+
+    def __getitem__(self, field):
+        if field not in self.field_set:
+            raise KeyError(field)
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __setitem__(self, field, value):
+        if field not in self.field_set:
+            raise KeyError(f"TransactionHeader does not support field: {field}")
+        setattr(self, field, value)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+
+class QRLNetworkTransactionRecord:
+    """
+    Compact stand-in for QRLNetworkTransactionItem: one output row, holding
+    only the per-output fields plus a reference to the shared TransactionHeader.
+
+    Supports the same dict-style access as a scrapy.Item (unset fields are
+    missing) and is registered with ItemAdapter, so Scrapy and the pipelines
+    treat it as an item. Setting a header field changes it for every output
+    of the transaction.
+    """
+
+    __slots__ = ("header",) + TRANSACTION_OUTPUT_FIELDS
+    fields = QRLNetworkTransactionItem.fields
+    output_field_set = frozenset(TRANSACTION_OUTPUT_FIELDS)
+
+    def __init__(self, header, **outputs):
+        self.header = header
+        for field, value in outputs.items():
+            self[field] = value
+
+    def __getitem__(self, field):
+        if field not in self.output_field_set:
+            return self.header[field]
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __setitem__(self, field, value):
+        if field in self.output_field_set:
+            setattr(self, field, value)
+        else:
+            self.header[field] = value
+
+    def __delitem__(self, field):
+        owner = self if field in self.output_field_set else self.header
+        try:
+            delattr(owner, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __contains__(self, field):
+        return self.get(field, self) is not self
+
+    def __iter__(self):
+        return (field for field in self.fields if field in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def copy(self):
+        """A new output row sharing the same header."""
+        return QRLNetworkTransactionRecord(self.header, **{field: self[field] for field in self.output_field_set if field in self})
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)!r})"
+
+
+class TransactionRecordAdapter(AdapterInterface):
+    """ItemAdapter support for QRLNetworkTransactionRecord."""
+
+    @classmethod
+    def is_item_class(cls, item_class):
+        return issubclass(item_class, QRLNetworkTransactionRecord)
+
+    @classmethod
+    def get_field_names_from_class(cls, item_class):
+        return list(item_class.fields)
+
+    def __getitem__(self, field_name):
+        return self.item[field_name]
+
+    def __setitem__(self, field_name, value):
+        self.item[field_name] = value
+
+    def __delitem__(self, field_name):
+        del self.item[field_name]
+
+    def __iter__(self):
+        return iter(self.item)
+
+    def __len__(self):
+        return len(self.item)
+
+
+ItemAdapter.ADAPTER_CLASSES.appendleft(TransactionRecordAdapter)
+
+# Transaction rows as the pipelines receive them
+TRANSACTION_ITEM_TYPES = (QRLNetworkTransactionItem, QRLNetworkTransactionRecord)
@@ -5,7 +5,28 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import json
+import math
+import time
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import psycopg2
+from twisted.internet import defer, reactor, task
 from scrapy import signals
+from scrapy.exceptions import NotConfigured, StopDownload
+from scrapy.http import Request, Response, TextResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.project import data_path
+
+from .cache import FinalizedCache
+from .scheduling import url_kind
+from .utils import db_cursor, pending_db_jobs, scrap_url
+
+logger = logging.getLogger(__name__)
 
 
 class QrlnetworkSpiderMiddleware:
@@ -56,50 +77,580 @@ class QrlnetworkSpiderMiddleware:
         spider.logger.info('Spider opened: %s' % spider.name)
 
 
+class BlockBackpressureMiddleware:
+    """
+    Holds back new block requests while the item pipelines are behind.
+
+    The queue depth is the number of items in the pipelines plus the DB
+    jobs waiting in the DB thread pool. Once it reaches
+    BACKPRESSURE_HIGH_WATERMARK, block requests coming out of the spider
+    (start requests and callbacks alike) wait here until it drops to
+    BACKPRESSURE_LOW_WATERMARK. Transaction and wallet requests keep
+    flowing, so the work already started can drain. The depth, the
+    watermarks and the pauses are published as backpressure/* crawl stats.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.high_watermark = settings.getint("BACKPRESSURE_HIGH_WATERMARK", 1000)
+        self.low_watermark = settings.getint("BACKPRESSURE_LOW_WATERMARK", 250)
+        self.check_interval = settings.getfloat("BACKPRESSURE_CHECK_INTERVAL", 0.5)
+        self.paused_since = None
+        self.waiters = []
+        self.check_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("BACKPRESSURE_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        self.stats.set_value("backpressure/high_watermark", self.high_watermark)
+        self.stats.set_value("backpressure/low_watermark", self.low_watermark)
+        self.check_loop = task.LoopingCall(self.check)
+        self.check_loop.start(self.check_interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.check_loop and self.check_loop.running:
+            self.check_loop.stop()
+        self._resume()
+
+    def queue_depth(self):
+        slot = self.crawler.engine.scraper.slot
+        return (slot.itemproc_size if slot else 0) + pending_db_jobs()
+
+    def check(self):
+        depth = self.queue_depth()
+        self.stats.set_value("backpressure/queue_depth", depth)
+        self.stats.max_value("backpressure/max_queue_depth", depth)
+        if self.paused_since is None and depth >= self.high_watermark:
+            self.paused_since = time.monotonic()
+            self.stats.inc_value("backpressure/pauses")
+            self.stats.set_value("backpressure/paused", 1)
+            logger.info(f"⏸️ Pausing block requests: {depth} items/DB jobs pending (watermark {self.high_watermark})")
+        elif self.paused_since is not None and depth <= self.low_watermark:
+            logger.info(f"▶️ Resuming block requests: {depth} items/DB jobs pending")
+            self._resume()
+
+    def _resume(self):
+        if self.paused_since is not None:
+            self.stats.inc_value("backpressure/paused_seconds", round(time.monotonic() - self.paused_since, 3))
+            self.stats.set_value("backpressure/paused", 0)
+            self.paused_since = None
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            waiter.callback(None)
+
+    async def _hold(self, request_or_item):
+        if self.paused_since is None or not isinstance(request_or_item, Request):
+            return
+        if url_kind(request_or_item.url) != "block":
+            return
+        waiter = defer.Deferred()
+        self.waiters.append(waiter)
+        self.stats.inc_value("backpressure/held_requests")
+        await maybe_deferred_to_future(waiter)
+
+    async def process_start(self, start):
+        async for request_or_item in start:
+            await self._hold(request_or_item)
+            yield request_or_item
+
+    async def process_spider_output(self, response, result, spider):
+        async for request_or_item in result:
+            await self._hold(request_or_item)
+            yield request_or_item
+
+
+class SlotThrottle:
+    """AIMD state for one downloader slot (one explorer host or node)."""
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.successes = 0  # healthy responses since the last concurrency step
+        self.last_backoff = 0.0
+        self.hold_until = 0.0  # Retry-After pause
+        self.latency = {}  # endpoint -> EWMA latency in seconds
+
+    def rate(self):
+        """Requests per second this slot is allowed to sustain with the current settings."""
+        latencies = [latency for latency in self.latency.values() if latency > 0]
+        rate = self.concurrency / (sum(latencies) / len(latencies)) if latencies else float(self.concurrency)
+        if self.delay > 0:
+            rate = min(rate, 1 / self.delay)
+        return rate
+
+
 class QrlnetworkDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    """
+    Adaptive rate controller for the explorer and node endpoints.
+
+    Per downloader slot it keeps an EWMA of the download latency for every
+    endpoint (block, transaction, wallet, node state) and adjusts the slot's
+    concurrency and delay AIMD-style:
+      - healthy, fast responses first shrink the delay by
+        ADAPTIVE_THROTTLE_DELAY_STEP and, once the delay is at its minimum,
+        add one concurrent request per window of `concurrency` successes;
+      - 429/403/5xx responses, download errors and latency above twice
+        ADAPTIVE_THROTTLE_TARGET_LATENCY halve the concurrency and double the
+        delay, at most once per cooldown;
+      - a Retry-After header pauses the slot for that long.
+    The chosen concurrency, delay and rate are published as
+    adaptive_throttle/* crawl stats.
+    """
+
+    backoff_statuses = {403, 429}
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start_concurrency = settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN", 8)
+        self.start_delay = settings.getfloat("DOWNLOAD_DELAY", 0)
+        self.min_concurrency = settings.getint("ADAPTIVE_THROTTLE_MIN_CONCURRENCY", 1)
+        self.max_concurrency = settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY", 32)
+        self.min_delay = settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY", 0)
+        self.max_delay = settings.getfloat("ADAPTIVE_THROTTLE_MAX_DELAY", 30)
+        self.delay_step = settings.getfloat("ADAPTIVE_THROTTLE_DELAY_STEP", 0.05)
+        self.target_latency = settings.getfloat("ADAPTIVE_THROTTLE_TARGET_LATENCY", 2.0)
+        self.max_retry_after = settings.getfloat("ADAPTIVE_THROTTLE_MAX_RETRY_AFTER", 600)
+        self.slots = {}
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        if not crawler.settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
         return s
 
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        request.meta.setdefault("adaptive_throttle_start", time.monotonic())
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        key, slot = self._get_slot(request)
+        if slot is None:
+            return response
+
+        throttle = self._throttle(key)
+        latency = self._latency(request)
+        endpoint = url_kind(request.url) or "other"
+        previous = throttle.latency.get(endpoint)
+        throttle.latency[endpoint] = latency if previous is None else 0.8 * previous + 0.2 * latency
+        self.stats.inc_value(f"adaptive_throttle/{key}/responses/{response.status}")
+        self.stats.set_value(f"adaptive_throttle/{key}/latency_ms/{endpoint}", int(throttle.latency[endpoint] * 1000))
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        if response.status in self.backoff_statuses or response.status >= 500:
+            self._backoff(throttle, self._retry_after(response))
+        elif latency > 2 * self.target_latency:
+            self._backoff(throttle)
+        elif latency <= self.target_latency:
+            self._increase(throttle)
+
+        self._apply(key, slot, throttle)
         return response
 
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        key, slot = self._get_slot(request)
+        if slot is None or request.meta.get("hedge_cancelled"):
+            return None
+        throttle = self._throttle(key)
+        self.stats.inc_value(f"adaptive_throttle/{key}/exceptions")
+        self._backoff(throttle)
+        self._apply(key, slot, throttle)
+        return None
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def _get_slot(self, request):
+        key = request.meta.get("download_slot")
+        if key is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def _throttle(self, key):
+        if key not in self.slots:
+            self.slots[key] = SlotThrottle(self.start_concurrency, self.start_delay)
+        return self.slots[key]
+
+    def _latency(self, request):
+        if "download_latency" in request.meta:
+            return request.meta["download_latency"]
+        return time.monotonic() - request.meta.get("adaptive_throttle_start", time.monotonic())
+
+    def _retry_after(self, response):
+        """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+        value = response.headers.get(b"Retry-After")
+        if not value:
+            return None
+        value = value.decode("latin-1").strip()
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0), self.max_retry_after)
+
+    def _increase(self, throttle):
+        if time.monotonic() < throttle.hold_until:
+            return
+        if throttle.delay > self.min_delay:
+            throttle.delay = max(self.min_delay, throttle.delay - self.delay_step)
+            return
+        throttle.successes += 1
+        if throttle.successes >= throttle.concurrency:
+            throttle.successes = 0
+            throttle.concurrency = min(self.max_concurrency, throttle.concurrency + 1)
+
+    def _backoff(self, throttle, retry_after=None):
+        now = time.monotonic()
+        if retry_after:
+            throttle.hold_until = max(throttle.hold_until, now + retry_after)
+        # One multiplicative decrease per cooldown, so a burst of failures from the same window counts once
+        cooldown = max([1.0, throttle.delay, *throttle.latency.values()])
+        if now - throttle.last_backoff < cooldown:
+            return
+        throttle.last_backoff = now
+        throttle.successes = 0
+        throttle.concurrency = max(self.min_concurrency, throttle.concurrency // 2)
+        throttle.delay = min(self.max_delay, max(throttle.delay * 2, self.delay_step))
+
+    def _apply(self, key, slot, throttle):
+        hold = throttle.hold_until - time.monotonic()
+        slot.concurrency = throttle.concurrency
+        slot.delay = max(throttle.delay, hold)
+        self.stats.set_value(f"adaptive_throttle/{key}/concurrency", throttle.concurrency)
+        self.stats.set_value(f"adaptive_throttle/{key}/delay", round(slot.delay, 3))
+        self.stats.set_value(f"adaptive_throttle/{key}/rate", round(throttle.rate(), 2))
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
-        
-        
+
+
+class FetchSource:
+    """Health of one explorer source: recent latencies, consecutive strikes and degradation."""
+
+    def __init__(self, base_url, sample_size):
+        self.base_url = base_url.rstrip("/")
+        self.name = urlparse(self.base_url).netloc or self.base_url
+        self.latencies = deque(maxlen=sample_size)
+        self.strikes = 0  # consecutive failures or races lost as primary
+        self.degraded_until = 0.0
+
+    def percentile(self, percentile):
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(len(ordered) * percentile / 100) - 1)]
+
+    def healthy(self, now):
+        return now >= self.degraded_until
+
+
+class HedgedFetchMiddleware:
+    """
+    Fetches block, transaction and wallet URLs from several equivalent
+    explorer sources (scrap_url plus FETCH_SOURCES).
+
+    Each request goes to the next healthy source in rotation. If it has not
+    answered after the HEDGE_PERCENTILE latency of that source, a duplicate
+    goes to the fastest other healthy source; the first usable response wins
+    and the other download is cancelled. A source that fails, or loses the
+    race as primary, SOURCE_FAILURE_THRESHOLD times in a row is taken out of
+    rotation for SOURCE_DEGRADED_COOLDOWN seconds. Cancelling a losing
+    attempt takes it out of its download slot's queue if it has not started
+    yet, and otherwise aborts its transfer (StopDownload) as soon as its
+    headers or body arrive, so a slow source does not keep serving it. Responses keep the
+    canonical scrap_url URL, so items and the retry queue do not depend on
+    which source answered.
+    """
+
+    hedged_kinds = {"block", "transaction", "wallet"}
+    failure_statuses = {403, 429}
+
+    def __init__(self, crawler, sources):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        sample_size = settings.getint("HEDGE_SAMPLE_SIZE", 200)
+        self.sources = [FetchSource(url, sample_size) for url in sources]
+        self.percentile = settings.getfloat("HEDGE_PERCENTILE", 95)
+        self.min_delay = settings.getfloat("HEDGE_MIN_DELAY", 0.2)
+        self.default_delay = settings.getfloat("HEDGE_DEFAULT_DELAY", 1.0)
+        self.min_samples = settings.getint("HEDGE_MIN_SAMPLES", 20)
+        self.failure_threshold = settings.getint("SOURCE_FAILURE_THRESHOLD", 3)
+        self.degraded_cooldown = settings.getfloat("SOURCE_DEGRADED_COOLDOWN", 60)
+        self.turn = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        sources = list(dict.fromkeys(url.rstrip("/") for url in [scrap_url, *crawler.settings.getlist("FETCH_SOURCES")]))
+        if not crawler.settings.getbool("HEDGE_ENABLED") or len(sources) < 2:
+            raise NotConfigured
+        middleware = cls(crawler, sources)
+        crawler.signals.connect(middleware.stop_cancelled_download, signal=signals.headers_received)
+        crawler.signals.connect(middleware.stop_cancelled_download, signal=signals.bytes_received)
+        return middleware
+
+    def stop_cancelled_download(self, request, **kwargs):
+        """headers_received/bytes_received: abort the transfer of an attempt that lost the race."""
+        if request.meta.get("hedge_cancelled"):
+            self.stats.inc_value("hedge/aborted")
+            raise StopDownload(fail=True)
+
+    def process_request(self, request, spider):
+        if "hedge_source" in request.meta or url_kind(request.url) not in self.hedged_kinds:
+            return None
+        path = self._path(request.url)
+        if path is None:
+            return None
+        primary, hedge = self._pick()
+        self.stats.inc_value("hedge/requests")
+        return self._fetch(request, path, primary, hedge)
+
+    def _path(self, url):
+        for source in self.sources:
+            if url.startswith(source.base_url + "/"):
+                return url[len(source.base_url):]
+        return None
+
+    def _pick(self):
+        """Primary source by rotation over the healthy ones, plus the fastest other healthy source to hedge to."""
+        now = time.monotonic()
+        healthy = [source for source in self.sources if source.healthy(now)]
+        if not healthy:
+            # Everything is degraded: probe the source that recovers first, without a hedge
+            return min(self.sources, key=lambda source: source.degraded_until), None
+        primary = healthy[self.turn % len(healthy)]
+        self.turn += 1
+        others = [source for source in healthy if source is not primary]
+        hedge = min(others, key=self._hedge_delay) if others else None
+        return primary, hedge
+
+    def _hedge_delay(self, source):
+        if len(source.latencies) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, source.percentile(self.percentile))
+
+    def _fetch(self, request, path, primary, hedge):
+        attempts = {}  # source -> (attempt request, deferred, start time)
+
+        def cancel_attempts(_=None):
+            if hedge_call.active():
+                hedge_call.cancel()
+            for source, (attempt, dfd, started) in list(attempts.items()):
+                attempt.meta["hedge_cancelled"] = True
+                source.latencies.append(time.monotonic() - started)  # at least this slow
+                self.stats.inc_value("hedge/cancelled")
+                # dfd.cancel() only detaches the engine from the attempt; the download itself is
+                # dropped from the slot queue here or aborted by stop_cancelled_download()
+                self._unqueue(attempt)
+                dfd.cancel()
+
+        result = defer.Deferred(canceller=cancel_attempts)
+
+        def launch(source, is_hedge):
+            meta = {key: value for key, value in request.meta.items() if key not in ("download_slot", "download_latency")}
+            meta.update(hedge_source=source.base_url, dont_retry=True)
+            attempt = request.replace(url=source.base_url + path, meta=meta, dont_filter=True)
+            dfd = self.crawler.engine.download(attempt)
+            attempts[source] = (attempt, dfd, time.monotonic())
+            dfd.addBoth(finished, source, is_hedge)
+            if is_hedge:
+                self.stats.inc_value("hedge/sent")
+
+        def launch_hedge():
+            if hedge is not None and not result.called and hedge not in attempts:
+                launch(hedge, True)
+
+        def finished(outcome, source, is_hedge):
+            attempt, _, started = attempts.pop(source)
+            if attempt.meta.get("hedge_cancelled"):
+                return None
+            usable = isinstance(outcome, Response) and outcome.status < 500 and outcome.status not in self.failure_statuses
+            if usable:
+                source.latencies.append(time.monotonic() - started)
+                self._mark(source, healthy=True)
+            else:
+                self._mark(source, healthy=False)
+            if result.called:
+                return None
+
+            if usable or (not attempts and (hedge is None or is_hedge or hedge_call.called)):
+                if usable:
+                    self.stats.inc_value(f"hedge/{source.name}/wins")
+                    if is_hedge and primary in attempts:
+                        self._mark(primary, healthy=False)  # lost the race to a later duplicate
+                cancel_attempts()
+                if isinstance(outcome, Response):
+                    request.meta["fetched_from"] = source.base_url
+                    result.callback(outcome.replace(url=request.url, request=request))
+                else:
+                    result.errback(outcome)
+            elif not is_hedge:
+                # The primary failed outright: go to the hedge source now instead of waiting
+                if hedge_call.active():
+                    hedge_call.cancel()
+                launch_hedge()
+            return None
+
+        hedge_call = reactor.callLater(self._hedge_delay(primary), launch_hedge)
+        if hedge is None:
+            hedge_call.cancel()
+        launch(primary, False)
+        return result
+
+    def _unqueue(self, attempt):
+        """Take an attempt that is still waiting for its download slot (download delay) out of the queue."""
+        slot = self.crawler.engine.downloader.slots.get(attempt.meta.get("download_slot"))
+        if slot is None:
+            return
+        for queued in slot.queue:
+            if queued[0] is attempt:
+                slot.queue.remove(queued)
+                self.stats.inc_value("hedge/unqueued")
+                queued[1].errback(defer.CancelledError())  # releases the slot's active entry
+                return
+
+    def _mark(self, source, healthy):
+        now = time.monotonic()
+        if healthy:
+            if source.strikes >= self.failure_threshold:
+                logger.info(f"✅ Source {source.name} is healthy again")
+            source.strikes = 0
+        else:
+            source.strikes += 1
+            self.stats.inc_value(f"hedge/{source.name}/failures")
+            if source.strikes == self.failure_threshold or (source.strikes > self.failure_threshold and source.healthy(now)):
+                source.degraded_until = now + self.degraded_cooldown
+                self.stats.inc_value(f"hedge/{source.name}/degraded")
+                logger.warning(
+                    f"⚠️ Source {source.name} degraded after {source.strikes} failures, "
+                    f"out of rotation for {self.degraded_cooldown:g}s"
+                )
+        self.stats.set_value(f"hedge/{source.name}/healthy", int(source.healthy(now)))
+        if source.latencies:
+            self.stats.set_value(f"hedge/{source.name}/latency_p{self.percentile:g}_ms", int(source.percentile(self.percentile) * 1000))
+
+
+class FinalizedCacheMiddleware:
+    """
+    Replays finalized block and transaction responses from a local
+    FinalizedCache instead of downloading them again.
+
+    A 200 response is stored once its block is at least
+    FINALIZED_CACHE_CONFIRMATIONS blocks below the chain tip. The tip is
+    estimated from the highest block in the database, node state responses
+    and the newest block fetched, so it never runs ahead of the real tip.
+    Wallet and node state responses change over time and are never cached.
+    Requests with meta dont_cache bypass the cache; requests with meta
+    cache_refresh skip the lookup but store the fresh response (used when
+    re-ingesting blocks replaced by a reorg).
+    """
+
+    cached_kinds = {"block", "transaction"}
+
+    def __init__(self, crawler, cache):
+        self.stats = crawler.stats
+        self.cache = cache
+        self.confirmations = crawler.settings.getint("FINALIZED_CACHE_CONFIRMATIONS", 100)
+        self.tip = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("FINALIZED_CACHE_ENABLED"):
+            raise NotConfigured
+        cache = FinalizedCache(
+            data_path(settings.get("FINALIZED_CACHE_DIR", "finalized_cache"), createdir=True),
+            settings.getint("FINALIZED_CACHE_MAX_MB", 1024) * 1024 * 1024,
+        )
+        s = cls(crawler, cache)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        return s
+
+    def spider_opened(self, spider):
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                cur.execute('SELECT MAX("block_number") FROM public."qrl_blockchain_blocks"')
+                self._see_height(cur.fetchone()[0])
+        except psycopg2.Error as e:
+            logger.warning(f"⚠️ Could not read the highest stored block for the finalized cache: {e}")
+
+    def _see_height(self, height):
+        if height is not None and (self.tip is None or int(height) > self.tip):
+            self.tip = int(height)
+
+    def _key(self, request):
+        kind = url_kind(request.url)
+        if kind not in self.cached_kinds or request.meta.get("dont_cache") or "hedge_source" in request.meta:
+            return None
+        argument = request.url.rstrip("/").rsplit("/", 1)[-1]
+        if kind == "block":
+            if not argument.isdigit():
+                return None
+            key = int(argument)
+        else:
+            key = argument.lower()
+        namespace = "grpc" if request.url.startswith("grpc://") else "explorer"
+        return namespace, kind, key
+
+    def process_request(self, request, spider):
+        key = self._key(request)
+        if key is None or request.meta.get("cache_refresh"):
+            return None
+        body = self.cache.get(*key)
+        if body is None:
+            self.stats.inc_value("finalized_cache/misses")
+            return None
+        self.stats.inc_value("finalized_cache/hits")
+        return TextResponse(url=request.url, status=200, body=body, encoding="utf-8", request=request, flags=["cached"])
+
+    def process_response(self, request, response, spider):
+        if response.status != 200 or "cached" in response.flags:
+            return response
+        kind = url_kind(request.url)
+        if kind == "node_state":
+            try:
+                self._see_height(json.loads(response.body)["info"]["block_height"])
+            except (ValueError, KeyError, TypeError):
+                pass
+            return response
+
+        key = self._key(request)
+        if key is None:
+            return response
+        namespace, kind, item_key = key
+        if kind == "block":
+            if b'"block_extended"' not in response.body:
+                return response  # block not found
+            height = item_key
+            self._see_height(height)
+        else:
+            try:
+                payload = json.loads(response.body)
+                height = int(payload["transaction"]["header"]["block_number"]) if payload.get("found") else None
+            except (ValueError, KeyError, TypeError):
+                height = None
+            if height is None:
+                return response
+
+        if self.tip is None or self.tip - height < self.confirmations:
+            self.stats.inc_value("finalized_cache/too_recent")
+            return response
+        try:
+            evicted = self.cache.put(namespace, kind, item_key, response.body)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write {request.url} to the finalized cache: {e}")
+            return response
+        self.stats.inc_value("finalized_cache/stored")
+        if evicted:
+            self.stats.inc_value("finalized_cache/evicted", evicted)
+        self.stats.set_value("finalized_cache/bytes", self.cache.total_bytes)
+        return response
@@ -5,28 +5,90 @@ import traceback
 import os
 import sys
 import json
+import time
+import weakref
 
 from datetime import datetime, timezone
+from itemadapter import ItemAdapter
+from scrapy import signals
 from scrapy.exceptions import DropItem
+from twisted.internet import defer, task
 
 from .items import (
     QRLNetworkBlockItem,
-    QRLNetworkTransactionItem,
+    TRANSACTION_ITEM_TYPES,
     QRLNetworkAddressItem,
     QRLNetworkMissedItem,
     QRLNetworkEmissionItem,
 )
 # Zorg dat je zowel get_db_connection als db_cursor importeert.
-from .utils import get_db_connection, db_cursor, list_integer_to_hex
+from .utils import get_db_connection, db_cursor, list_integer_to_hex, run_in_db_thread
+from .writers import TransactionWriter, BlockWriter, AddressWriter, MissedItemWriter
+from .scheduling import RetryQueue, BlockIngestionState, WalletRefreshIndex, blocks_stored
+from .spool import WriteAheadSpool, is_connection_error
 
 
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DOCUMENT_DIR = os.path.join(PROJECT_ROOT, 'Documenten')
 
 
-def handle_spider_error(spider, error, item, item_url="N/A"):
-    """Handles all database errors and logs them into the missed items table."""
-    trace_back = traceback.format_exc() if error else None
+# Errors waiting to be written to qrl_blockchain_missed_items, aggregated by (url, error).
+# Filled by handle_spider_error and QRLNetworkMissedItems; flushed by QrlnetworkPipeline_missed_items.
+missed_items = MissedItemWriter()
+
+
+spools = weakref.WeakKeyDictionary()  # crawler -> WriteAheadSpool
+
+
+def spool_for_crawler(crawler):
+    """
+    The write-ahead spool shared by the writers of `crawler` (None with
+    SPOOL_ENABLED off). It is closed, sealing its last segment, once the
+    spider has closed and the pipelines have made their final flushes.
+    Sealed segments are replayed in the DB thread pool when the spider
+    opens, every SPOOL_REPLAY_INTERVAL seconds and after the spool is
+    closed, whenever the database is reachable.
+    """
+    if not crawler.settings.getbool("SPOOL_ENABLED", True):
+        return None
+    spool = spools.get(crawler)
+    if spool is None:
+        spool = spools[crawler] = WriteAheadSpool.from_settings(crawler.settings)
+        replay_interval = crawler.settings.getfloat("SPOOL_REPLAY_INTERVAL", 60)
+        replay_loop = task.LoopingCall(replay_spool, spool)
+
+        def spider_opened(spider):
+            if replay_interval > 0:
+                replay_loop.start(replay_interval, now=True)
+
+        def spider_closed(spider):
+            if replay_loop.running:
+                replay_loop.stop()
+            spool.close()
+            return defer.maybeDeferred(replay_spool, spool).addBoth(lambda _: spool.warn_unreplayed())
+
+        crawler.signals.connect(spider_opened, signal=signals.spider_opened, weak=False)
+        crawler.signals.connect(spider_closed, signal=signals.spider_closed, weak=False)
+    return spool
+
+
+def replay_spool(spool):
+    """Replay the sealed segments of `spool` in the DB thread pool, if there are any and the database is not down."""
+    if not spool.replay_due():
+        return None
+    return run_in_db_thread(spool.replay).addErrback(
+        lambda failure: logging.error(f"❌ Spool replay failed: {failure.getErrorMessage()}")
+    )
+
+
+def handle_spider_error(spider, error, item, item_url="N/A", trace_back=None):
+    """
+    Handles all pipeline errors: logs them and counts them in `missed_items`,
+    which QrlnetworkPipeline_missed_items upserts into the missed items table
+    (scheduling the URL for another attempt). Does no DB work itself; pass
+    `trace_back` when calling it outside the except block that caught `error`.
+    """
+    trace_back = trace_back or (traceback.format_exc() if error else None)
     error_type = str(type(error))
     error_message = str(error) if error else "Unknown Error"
     spider_name = spider.name
@@ -38,53 +100,118 @@ def handle_spider_error(spider, error, item, item_url="N/A"):
     spider.logger.error(f"   URL: {item_url}")
     spider.logger.error(f"   Item type: {type(item).__name__ if item else 'None'}")
 
-    try:
-        with db_cursor() as (conn, cur):
-            # Check if this error is already logged to avoid duplicates
-            cur.execute(
-                'SELECT COUNT(*) FROM public.qrl_blockchain_missed_items WHERE item_url = %s AND error_name = %s',
-                (item_url, error_message[:255])
-            )
-            existing_count = cur.fetchone()[0]
-            
-            if existing_count == 0:
-                cur.execute(
-                    'INSERT INTO public.qrl_blockchain_missed_items ('
-                    '"spider_name", "spider_version", "location_script_file", '
-                    '"location_script_function", "trace_back", "error_type", '
-                    '"error_name", "item_url", "error_timestamp", "failed_data") '
-                    'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
-                    (
-                        spider_name,
-                        spider_version,
-                        str(__name__)[:255],
-                        spider_class[:255],
-                        json.dumps(trace_back) if trace_back else None,
-                        error_type[:255],
-                        error_message[:255],
-                        item_url,
-                        datetime.now(timezone.utc),
-                        json.dumps(dict(item))[:1000] if item else None,
-                    )
-                )
-                conn.commit()
-                spider.logger.info(f"✅ Error logged to missed_items table: {error_message[:50]}...")
-            else:
-                spider.logger.info(f"⚠️ Error already logged, skipping duplicate: {error_message[:50]}...")
-                
-    except Exception as e:
-        # If there's an error logging to the missed items table, log it to console
-        spider.logger.error(f"❌ Critical error logging to missed items table: {e}")
-        spider.logger.error(f"   Original error: {error_message}")
-        spider.logger.error(f"   Item URL: {item_url}")
-
-
-class QrlnetworkPipeline_Emission:
+    missed_items.add(
+        (item_url, error_message),
+        (
+            spider_name,
+            spider_version,
+            str(__name__)[:255],
+            spider_class[:255],
+            json.dumps(trace_back) if trace_back else None,
+            error_type[:255],
+            error_message[:255],
+            item_url or "N/A",
+            datetime.now(timezone.utc),
+            json.dumps(ItemAdapter(item).asdict())[:1000] if item else None,
+        ),
+    )
+
+
+class DBThreadPipeline:
+    """
+    Base for pipelines that keep psycopg2 off the Twisted reactor.
+
+    defer() runs the blocking DB work in the DB thread pool
+    (utils.run_in_db_thread) and returns its Deferred; Scrapy waits for it
+    before the item moves on to the next pipeline. Work submitted under the
+    same key runs one at a time in submission order, so e.g. two items for
+    the same wallet never race each other's SELECT and INSERT.
+    """
+
+    def __init__(self):
+        self.locks = {}  # key -> DeferredLock, only while work for the key is queued
+
+    def defer(self, key, function, *args):
+        if key is None:
+            return run_in_db_thread(function, *args)
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = defer.DeferredLock()
+
+        def forget_idle_lock(result):
+            if not lock.locked and not lock.waiting and self.locks.get(key) is lock:
+                del self.locks[key]
+            return result
+
+        return lock.run(run_in_db_thread, function, *args).addBoth(forget_idle_lock)
+
+    def report_error(self, spider, error, item):
+        """Record an error caught on the reactor for the missed items table; returns the item."""
+        handle_spider_error(spider, error, item, item.get("item_url", "N/A"), traceback.format_exc())
+        return item
+
+
+class BatchWriterPipeline(DBThreadPipeline):
+    """
+    Base for pipelines that buffer rows in a writers.BatchWriter (self.writer)
+    and write them in bulk from the DB thread pool: when an item fills the
+    batch, every flush interval, and when the spider closes. after_write, if
+    set, runs inside each batch's DB transaction, and after_spool when the
+    batch is spooled instead (see BatchWriter.write_pending).
+    """
+
+    after_write = None
+    after_spool = None
+    flush_loop = None
+
+    def open_spider(self, spider):
+        # Flush on a timer as well, so a quiet tail of the crawl does not sit in the buffer.
+        self.flush_loop = task.LoopingCall(self.flush_if_due, spider)
+        self.flush_loop.start(self.writer.flush_interval, now=False)
+
+    def close_spider(self, spider):
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+        return self.flush(spider)
+
+    def flush_if_due(self, spider):
+        if self.writer.is_due():
+            return self.flush(spider)
+
+    def flush(self, spider):
+        """Hand the buffered rows to the DB thread pool; batches are written one at a time, in order."""
+        pending = self.writer.take()
+        if not pending:
+            return defer.succeed(0)
+        return self.defer(
+            "flush",
+            self.writer.write_pending,
+            pending,
+            lambda item, error: self.write_error(spider, item, error),
+            self.after_write,
+            self.after_spool,
+        )
+
+    def write_error(self, spider, item, error):
+        """A row rejected by the database. Runs in the DB thread pool."""
+        handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
+
+    def buffer(self, item, row, spider):
+        if self.writer.add(item, row):
+            # The item that fills the batch waits for the write, which holds back a producer outrunning the DB
+            return self.flush(spider).addCallback(lambda _: item)
+        return item
+
+
+class QrlnetworkPipeline_Emission(DBThreadPipeline):
     def process_item(self, item, spider):
         """Processes and stores emission data in the database."""
         if not isinstance(item, QRLNetworkEmissionItem):
             return item
+        return self.defer("emission", self.store, item, spider)
 
+    def store(self, item, spider):
+        """Runs in the DB thread pool."""
         try:
             datetimeNow = datetime.now(timezone.utc)
             with db_cursor() as (conn, cur):
@@ -108,7 +235,240 @@ class QrlnetworkPipeline_Emission:
         return item
 
 
-class QrlnetworkPipeline_block:
+class IngestionBatch:
+    """
+    Block and transaction rows buffered together by the block and transaction
+    pipelines of one crawl (see for_crawler()) and written in one DB
+    transaction, so a block lands together with the transactions scraped
+    with it, and its ingestion state with both.
+
+    A flush is started when a block arrives and the batch is due (before the
+    block is buffered, so a block is not split from its embedded
+    transactions), when transactions alone reach twice the batch size, every
+    flush interval and when the spider closes. Flushes run one at a time, in
+    order, in the DB thread pool. While the database is unreachable, batches
+    go to the write-ahead `spool` (see spool.WriteAheadSpool) instead.
+    """
+
+    instances = weakref.WeakKeyDictionary()  # crawler -> IngestionBatch
+
+    def __init__(self, batch_size=500, flush_interval=5.0, update_blocks=False, spool=None):
+        self.blocks = BlockWriter(batch_size, flush_interval, update_existing=update_blocks)
+        self.transactions = TransactionWriter(batch_size, flush_interval)
+        self.spool = self.blocks.spool = self.transactions.spool = spool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ingestion_state = BlockIngestionState()
+        self.lock = defer.DeferredLock()
+        self.flush_loop = None
+        self.open_pipelines = 0
+        self.signals = None  # crawler.signals, to send blocks_stored after each committed flush
+
+    @classmethod
+    def for_crawler(cls, crawler):
+        """The batch shared by the block and transaction pipelines of `crawler`."""
+        batch = cls.instances.get(crawler)
+        if batch is None:
+            batch = cls.instances[crawler] = cls(
+                batch_size=crawler.settings.getint("TRANSACTION_BATCH_SIZE", 500),
+                flush_interval=crawler.settings.getfloat("TRANSACTION_FLUSH_INTERVAL", 5.0),
+                update_blocks=crawler.settings.getbool("BLOCK_UPDATE_EXISTING", False),
+                spool=spool_for_crawler(crawler),
+            )
+            batch.signals = crawler.signals
+        return batch
+
+    def __len__(self):
+        return len(self.blocks) + len(self.transactions)
+
+    def is_due(self):
+        if not len(self):
+            return False
+        if len(self) >= self.batch_size:
+            return True
+        return self.blocks.is_due() or self.transactions.is_due()
+
+    def open(self, spider):
+        self.open_pipelines += 1
+        if self.flush_loop is None:
+            # Flush on a timer as well, so a quiet tail of the crawl does not sit in the buffer.
+            self.flush_loop = task.LoopingCall(self.flush_if_due, spider)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+    def close(self, spider):
+        self.open_pipelines -= 1
+        if self.open_pipelines <= 0 and self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+        return self.flush(spider)
+
+    def flush_if_due(self, spider):
+        if self.is_due():
+            return self.flush(spider)
+
+    def add_block(self, item, row, spider):
+        flushed = self.flush(spider) if self.is_due() else None
+        self.blocks.add(item, row)
+        # The item that starts a new batch waits for the write, which holds back a producer outrunning the DB
+        return flushed.addCallback(lambda _: item) if flushed is not None else item
+
+    def add_transaction(self, item, row, spider):
+        self.transactions.add(item, row)
+        if len(self.transactions) >= 2 * self.batch_size:
+            return self.flush(spider).addCallback(lambda _: item)
+        return item
+
+    def flush(self, spider):
+        """Hand the buffered rows to the DB thread pool."""
+        blocks, transactions = self.blocks.take(), self.transactions.take()
+        if not blocks and not transactions:
+            return defer.succeed(0)
+        on_error = lambda item, error: handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
+        stored = []
+        flushed = self.lock.run(run_in_db_thread, self.write_pending, blocks, transactions, on_error, stored)
+        return flushed.addCallback(self.report_stored, stored)
+
+    def report_stored(self, result, stored):
+        """Send blocks_stored (on the reactor) for the blocks a flush committed, e.g. for the backfill checkpoint."""
+        if stored and self.signals is not None:
+            self.signals.send_catch_log(blocks_stored, block_numbers=stored)
+        return result
+
+    def write_pending(self, blocks, transactions, on_error, stored=None):
+        """
+        Write (item, row) pairs of blocks and transactions in one DB transaction.
+        If it is rejected, blocks are retried one per transaction and the
+        transactions row by row, so only bad rows reach on_error(item, error).
+        The numbers of the blocks that were committed or reported are added
+        to `stored`; spooled blocks are not. Runs in the DB thread pool.
+        """
+        if stored is None:
+            stored = []
+        if self.spool is not None and not self.spool.db_available():
+            return self.spool_pending(blocks, transactions, on_error)
+
+        started = time.monotonic()
+        try:
+            with db_cursor() as (conn, cur):
+                new_blocks = self.store_blocks(cur, blocks) if blocks else 0
+                new_transactions = self.transactions.write(cur, [row for _, row in transactions]) if transactions else 0
+                if transactions:
+                    self.record_transactions(cur, [item for item, _ in transactions])
+                conn.commit()
+        except Exception as error:
+            if self.spool is not None and is_connection_error(error):
+                self.spool.db_failed(error)
+                return self.spool_pending(blocks, transactions, on_error)
+            logging.warning(
+                f"⚠️ Batch write of {len(blocks)} blocks and {len(transactions)} transactions failed, "
+                f"retrying one by one: {error}"
+            )
+            for pair in blocks:
+                try:
+                    with db_cursor() as (conn, cur):
+                        self.store_blocks(cur, [pair])
+                        conn.commit()
+                except Exception as error:
+                    if self.spool is not None and is_connection_error(error):
+                        self.spool_pending([pair], [], on_error)
+                        continue
+                    on_error(pair[0], error)
+                stored.append(pair[1][0])
+            return self.transactions._flush_row_by_row(transactions, on_error, self.record_transactions)
+
+        stored.extend(row[0] for _, row in blocks)
+        seconds = time.monotonic() - started
+        if blocks:
+            self.blocks.log_saved(new_blocks, len(blocks), seconds)
+        if transactions:
+            self.transactions.log_saved(new_transactions, len(transactions), seconds)
+        return new_blocks + new_transactions
+
+    def spool_pending(self, blocks, transactions, on_error):
+        """
+        Spool the rows as plain inserts. Reorg replacement and ingestion
+        state are not spooled: spooled blocks stay out of the ingestion state
+        until the completeness checks pick them up again after the replay.
+        """
+        if blocks:
+            self.blocks.spool_pending(blocks, on_error)
+        if transactions:
+            self.transactions.spool_pending(transactions, on_error, self.record_transactions)
+        return 0
+
+    def store_blocks(self, cur, blocks):
+        """Replace orphaned blocks, write the block rows and open their ingestion state. Returns the new blocks."""
+        cur.execute(
+            'SELECT "block_number", "block_hash_header_data" FROM public."qrl_blockchain_blocks" '
+            'WHERE "block_number" = ANY(%s)',
+            ([row[0] for _, row in blocks],),
+        )
+        stored_hashes = dict(cur.fetchall())
+        for item, row in blocks:
+            stored_hash = stored_hashes.get(row[0])
+            if stored_hash is not None and item["block_hash_header_data"] not in (stored_hash, "MISSING"):
+                # The chain was reorganised at this height: the stored block was orphaned
+                self.replace_block(cur, item, stored_hash)
+
+        inserted = self.blocks.write(cur, [row for _, row in blocks])
+        # Blocks stored before the ingestion state existed get their state row on a rescrape
+        for item, _ in blocks:
+            self.record_block(cur, item)
+        self.ingestion_state.advance(cur, [row[0] for _, row in blocks])
+        return inserted
+
+    def replace_block(self, cur, item, stored_hash):
+        """
+        Remove an orphaned block so the new block at its height can be stored
+        in the same DB transaction. Transactions that are not part of the new
+        block are deleted; ones it still contains are kept.
+        """
+        block_number = int(item['block_number'])
+        cur.execute(
+            'DELETE FROM public."qrl_blockchain_transactions" '
+            'WHERE "transaction_block_number" = %s AND NOT ("transaction_hash" = ANY(%s))',
+            (block_number, list(item.get("block_transaction_hashes") or [])),
+        )
+        removed_transactions = cur.rowcount
+        cur.execute('DELETE FROM public."qrl_blockchain_blocks" WHERE "block_number" = %s', (block_number,))
+        cur.execute(f'DELETE FROM {self.ingestion_state.table} WHERE "block_number" = %s', (block_number,))
+        logging.warning(
+            f'♻️ REPLACED block {block_number}: {(stored_hash or "")[:16]}… -> {item["block_hash_header_data"][:16]}…, '
+            f'removed {removed_transactions} transactions of the orphaned block'
+        )
+
+    def record_block(self, cur, item):
+        """Open the block's ingestion state in the transaction that stores the block."""
+        tx_hashes = item.get("block_transaction_hashes")
+        if tx_hashes is not None:
+            self.ingestion_state.header_stored(cur, int(item["block_number"]), tx_hashes)
+
+    def record_transactions(self, cur, items):
+        """Runs in the DB thread pool, inside the transaction that wrote `items`."""
+        wallets_by_block = {}
+        for item in map(ItemAdapter, items):
+            wallets = wallets_by_block.setdefault(int(item["transaction_block_number"]), set())
+            wallets.update(item.get("transaction_wallets") or [])
+        self.ingestion_state.transactions_stored(cur, wallets_by_block)
+        self.ingestion_state.advance(cur, list(wallets_by_block))
+
+
+class QrlnetworkPipeline_block(DBThreadPipeline):
+    """Buffers block rows in the crawl's IngestionBatch."""
+
+    def __init__(self, batch=None):
+        super().__init__()
+        self.batch = batch if batch is not None else IngestionBatch()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(IngestionBatch.for_crawler(crawler))
+
+    def open_spider(self, spider):
+        self.batch.open(spider)
+
+    def close_spider(self, spider):
+        return self.batch.close(spider)
+
     def process_item(self, item, spider):
         if not isinstance(item, QRLNetworkBlockItem):
             return item
@@ -134,63 +494,39 @@ class QrlnetworkPipeline_block:
                     item[field] = "MISSING"
 
         try:
-            datetimeNow = datetime.now(timezone.utc)
-            with db_cursor() as (conn, cur):
-                cur.execute(
-                    'SELECT "block_number" FROM public."qrl_blockchain_blocks" WHERE "block_number" = %s',
-                    (int(item['block_number']),)
-                )
-                result = cur.fetchone()
-                if result is None:
-                    convert_timestamp_to_datetime = datetime.fromtimestamp(
-                        int(item["block_found_datetime"])
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    cur.execute(
-                        'INSERT INTO public."qrl_blockchain_blocks" ('
-                        '"block_number", "block_found", "block_result", '
-                        '"block_found_datetime", "block_found_timestamp_seconds", "block_reward_block", "block_reward_fee", '
-                        '"block_mining_nonce", "block_number_of_transactions", "spider_name", '
-                        '"spider_version", "block_size", "block_hash_header_type", "block_hash_header_data", '
-                        '"block_hash_header_type_prev", "block_hash_header_data_prev", "block_merkle_root_type", '
-                        '"block_merkle_root_data", "block_added_timestamp"'
-                        ') VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
-                        (
-                            int(item['block_number']),
-                            item['block_found'],
-                            item['block_result'],
-                            convert_timestamp_to_datetime,
-                            item['block_found_timestamp_seconds'],
-                            int(item["block_reward_block"]),
-                            int(item["block_reward_fee"]),
-                            int(item["block_mining_nonce"]),
-                            int(item["block_number_of_transactions"]),
-                            item["spider_name"],
-                            item["spider_version"],
-                            int(item["block_size"]),
-                            item["block_hash_header_type"],
-                            item["block_hash_header_data"],
-                            item["block_hash_header_type_prev"],
-                            item["block_hash_header_data_prev"],
-                            item["block_merkle_root_type"],
-                            item["block_merkle_root_data"],
-                            datetimeNow,
-                        )
-                    )
-                    conn.commit()
-                    logging.info('✅ SAVED new block: %s' % item['block_number'])
-                else:
-                    logging.info('⚠️ SKIPPED duplicate block: %s' % item['block_number'])
-                    raise DropItem("Already Got Blocknumber: %s" % item['block_number'])
-        except DropItem as duplicate:
-            # Duplicate block, no action needed
-            pass
+            row = self._block_row(item, datetime.now(timezone.utc))
         except (Exception, psycopg2.Error) as error:
             spider.logger.error(f"❌ Error processing block item: {error}")
-            handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
-        return item
+            return self.report_error(spider, error, item)
+        return self.batch.add_block(item, row, spider)
+
+    def _block_row(self, item, added_datetime):
+        return (
+            int(item['block_number']),
+            item['block_found'],
+            item['block_result'],
+            datetime.fromtimestamp(int(item["block_found_datetime"]), timezone.utc),
+            item['block_found_timestamp_seconds'],
+            int(item["block_reward_block"]),
+            int(item["block_reward_fee"]),
+            int(item["block_mining_nonce"]),
+            int(item["block_number_of_transactions"]),
+            item["spider_name"],
+            item["spider_version"],
+            int(item["block_size"]),
+            item["block_hash_header_type"],
+            item["block_hash_header_data"],
+            item["block_hash_header_type_prev"],
+            item["block_hash_header_data_prev"],
+            item["block_merkle_root_type"],
+            item["block_merkle_root_data"],
+            added_datetime,
+        )
 
 
-class QrlnetworkPipeline_transaction:
+class QrlnetworkPipeline_transaction(DBThreadPipeline):
+    """Buffers transaction rows in the crawl's IngestionBatch, next to their blocks."""
+
     def _safe_convert_fee_to_microqrl(self, fee_value):
         """
         Safely convert fee value to microQRL (smallest unit).
@@ -226,75 +562,88 @@ class QrlnetworkPipeline_transaction:
             spider.logger.warning(f"Failed to convert fee value '{fee_value}' to microQRL: {e}")
             return 0
     
+    def __init__(self, batch=None):
+        super().__init__()
+        self.batch = batch if batch is not None else IngestionBatch()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(IngestionBatch.for_crawler(crawler))
+
+    def open_spider(self, spider):
+        self.batch.open(spider)
+
+    def close_spider(self, spider):
+        return self.batch.close(spider)
+
+    def _transaction_row(self, item, added_datetime):
+        return (
+            str(item.get('transaction_hash', 'UNKNOWN')),
+            str(item.get('transaction_sending_wallet_address', 'UNKNOWN')),
+            str(item.get('transaction_receiving_wallet_address', 'UNKNOWN')),
+            int(item.get("transaction_amount_send", 0)),
+            str(item.get("transaction_type", "UNKNOWN")),
+            int(item.get("transaction_block_number", 0)),
+            item.get("transaction_found", "UNKNOWN"),
+            item.get("transaction_result", "UNKNOWN"),
+            item.get("spider_name", "UNKNOWN"),
+            item.get("spider_version", "UNKNOWN"),
+            item.get("master_addr_type", "UNKNOWN"),
+            str(item.get("master_addr_data", "UNKNOWN")),
+            self._safe_convert_fee_to_microqrl(item.get("master_addr_fee", 0)),
+            item.get("public_key_type", "UNKNOWN"),
+            item.get("public_key_data", "UNKNOWN"),
+            item.get("signature_type", "UNKNOWN"),
+            item.get("transaction_nonce", "UNKNOWN"),
+            item.get("transaction_addrs_to_type", "UNKNOWN"),
+            datetime.fromtimestamp(int(item.get("block_found_datetime", 0)), timezone.utc),
+            added_datetime,
+        )
+
     def process_item(self, item, spider):
-        if not isinstance(item, QRLNetworkTransactionItem):
+        if not isinstance(item, TRANSACTION_ITEM_TYPES):
             return item
 
-        missing_fields = [field for field in item.keys() if item.get(field) in [None, ""]]
+        adapter = ItemAdapter(item)
+        missing_fields = [field for field in adapter.keys() if adapter.get(field) in [None, ""]]
         for field in missing_fields:
-            item[field] = "MISSING"
+            adapter[field] = "MISSING"
 
         try:
-            datetimeNow = datetime.now(timezone.utc)
-            with db_cursor() as (conn, cur):
-                # Check for duplicate transactions (same hash and recipient combination)
-                cur.execute(
-                    'SELECT "transaction_hash" FROM public."qrl_blockchain_transactions" '
-                    'WHERE "transaction_hash" = %s AND "transaction_receiving_wallet_address" = %s',
-                    (item.get('transaction_hash'), item.get('transaction_receiving_wallet_address'))
-                )
-                result = cur.fetchone()
-                if result is None:
-                    convert_timestamp_to_datetime = datetime.fromtimestamp(
-                        int(item.get("block_found_datetime", 0))
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    cur.execute(
-                        'INSERT INTO public."qrl_blockchain_transactions" ('
-                        '"transaction_hash", "transaction_sending_wallet_address", "transaction_receiving_wallet_address", '
-                        '"transaction_amount_send", "transaction_type", "transaction_block_number", '
-                        '"transaction_found", "transaction_result", "spider_name", '
-                        '"spider_version", "master_addr_type", "master_addr_data", '
-                        '"master_addr_fee", "public_key_type", "public_key_data", '
-                        '"signature_type", "transaction_nonce", "transaction_addrs_to_type", '
-                        '"block_found_datetime", "transaction_added_datetime"'
-                        ') VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
-                        (
-                            str(item.get('transaction_hash', 'UNKNOWN')),
-                            str(item.get('transaction_sending_wallet_address', 'UNKNOWN')),
-                            str(item.get('transaction_receiving_wallet_address', 'UNKNOWN')),
-                            int(item.get("transaction_amount_send", 0)),
-                            str(item.get("transaction_type", "UNKNOWN")),
-                            int(item.get("transaction_block_number", 0)),
-                            item.get("transaction_found", "UNKNOWN"),
-                            item.get("transaction_result", "UNKNOWN"),
-                            item.get("spider_name", "UNKNOWN"),
-                            item.get("spider_version", "UNKNOWN"),
-                            item.get("master_addr_type", "UNKNOWN"),
-                            str(item.get("master_addr_data", "UNKNOWN")),
-                            self._safe_convert_fee_to_microqrl(item.get("master_addr_fee", 0)),
-                            item.get("public_key_type", "UNKNOWN"),
-                            item.get("public_key_data", "UNKNOWN"),
-                            item.get("signature_type", "UNKNOWN"),
-                            item.get("transaction_nonce", "UNKNOWN"),
-                            item.get("transaction_addrs_to_type", "UNKNOWN"),
-                            convert_timestamp_to_datetime,
-                            datetimeNow,
-                        )
-                    )
-                    conn.commit()
-                    logging.info('✅ SAVED transaction to database: %s | Type: %s | Amount: %s' % (item['transaction_hash'], item.get('transaction_type'), item.get('transaction_amount_send')))
-                else:
-                    logging.info('⚠️ SKIPPED duplicate transaction: %s | Type: %s' % (item['transaction_hash'], item.get('transaction_type')))
-                    raise DropItem(f"Already got transaction: {item['transaction_hash']}")
-        except DropItem as duplicate:
-            pass
+            row = self._transaction_row(adapter, datetime.now(timezone.utc))
         except (Exception, psycopg2.Error) as error:
             spider.logger.error(f"❌ Error processing transaction item: {error}")
-            handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
-        return item
+            return self.report_error(spider, error, item)
+        return self.batch.add_transaction(item, row, spider)
+
 
+class QrlnetworkPipeline_address(BatchWriterPipeline):
+    """
+    Buffers wallet states in an AddressWriter, which keeps the latest state
+    per wallet and upserts the batch with one statement. The block height
+    each wallet was fetched for is recorded in qrl_wallet_refresh in the same
+    DB transaction, so a wallet only counts as refreshed once it is stored.
+    Spooled wallets are queued for another fetch, as their replay does not
+    overwrite a stored state.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=5.0, retry_queue=None):
+        super().__init__()
+        self.writer = AddressWriter(batch_size=batch_size, flush_interval=flush_interval)
+        self.wallet_refresh = WalletRefreshIndex()
+        self.ingestion_state = BlockIngestionState()
+        self.retry_queue = retry_queue or RetryQueue()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            batch_size=crawler.settings.getint("ADDRESS_BATCH_SIZE", 500),
+            flush_interval=crawler.settings.getfloat("ADDRESS_FLUSH_INTERVAL", 5.0),
+            retry_queue=RetryQueue.from_settings(crawler.settings),
+        )
+        pipeline.writer.spool = spool_for_crawler(crawler)
+        return pipeline
 
-class QrlnetworkPipeline_address:
     def process_item(self, item, spider):
         if not isinstance(item, QRLNetworkAddressItem):
             return item
@@ -317,125 +666,115 @@ class QrlnetworkPipeline_address:
                                                 'address_unvotes', 'address_proposal_vote_stats'] else ""
 
         try:
-            datetimeNow = datetime.now(timezone.utc)
-            with db_cursor() as (conn, cur):
-                cur.execute(
-                    'SELECT "wallet_address" FROM public."qrl_wallet_address" WHERE "wallet_address" = %s',
-                    (item['wallet_address'],)
-                )
-                result = cur.fetchone()
-                if result is None:
-                    cur.execute(
-                        'INSERT INTO public."qrl_wallet_address" ('
-                        '"wallet_address", "address_balance", "address_nonce", '
-                        '"address_ots_bitfield_used_page", "address_used_ots_key_count", "address_transaction_hash_count", '
-                        '"address_tokens_count", "address_slaves_count", "address_lattice_pk_count", '
-                        '"address_multi_sig_address_count", "address_multi_sig_spend_count", "address_inbox_message_count", '
-                        '"address_foundation_multi_sig_spend_txn_hash", "address_foundation_multi_sig_vote_txn_hash", "address_unvotes", '
-                        '"address_proposal_vote_stats", "spider_name", "spider_version", "address_added_datetime"'
-                        ') VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
-                        (
-                            item['wallet_address'],
-                            int(item['address_balance']),
-                            int(item['address_nonce']),
-                            int(item["address_ots_bitfield_used_page"]),
-                            int(item["address_used_ots_key_count"]),
-                            int(item["address_transaction_hash_count"]),
-                            int(item["address_tokens_count"]),
-                            int(item["address_slaves_count"]),
-                            int(item["address_lattice_pk_count"]),
-                            int(item["address_multi_sig_address_count"]),
-                            int(item["address_multi_sig_spend_count"]),
-                            int(item["address_inbox_message_count"]),
-                            list_integer_to_hex(item["address_foundation_multi_sig_spend_txn_hash"]) if item["address_foundation_multi_sig_spend_txn_hash"] else "",
-                            list_integer_to_hex(item["address_foundation_multi_sig_vote_txn_hash"]) if item["address_foundation_multi_sig_vote_txn_hash"] else "",
-                            list_integer_to_hex(item["address_unvotes"]) if item["address_unvotes"] else "",
-                            list_integer_to_hex(item["address_proposal_vote_stats"]) if item["address_proposal_vote_stats"] else "",
-                            item["spider_name"],
-                            item["spider_version"],
-                            datetimeNow,
-                        )
-                    )
-                    conn.commit()
-                    logging.info('✅ SAVED new wallet address: %s' % item['wallet_address'])
-                else:
-                    cur.execute(
-                        'UPDATE public."qrl_wallet_address" SET '
-                        '"address_balance" = %s, "address_nonce" = %s, '
-                        '"address_ots_bitfield_used_page" = %s, "address_used_ots_key_count" = %s, '
-                        '"address_transaction_hash_count" = %s, "address_tokens_count" = %s, '
-                        '"address_slaves_count" = %s, "address_lattice_pk_count" = %s, '
-                        '"address_multi_sig_address_count" = %s, "address_multi_sig_spend_count" = %s, '
-                        '"address_inbox_message_count" = %s, '
-                        '"address_foundation_multi_sig_spend_txn_hash" = %s, "address_foundation_multi_sig_vote_txn_hash" = %s, '
-                        '"address_unvotes" = %s, "address_proposal_vote_stats" = %s, '
-                        '"spider_name" = %s, "spider_version" = %s '
-                        'WHERE "wallet_address" = %s',
-                        (
-                            int(item['address_balance']),
-                            int(item["address_nonce"]),
-                            int(item["address_ots_bitfield_used_page"]),
-                            int(item["address_used_ots_key_count"]),
-                            int(item["address_transaction_hash_count"]),
-                            int(item["address_tokens_count"]),
-                            int(item["address_slaves_count"]),
-                            int(item["address_lattice_pk_count"]),
-                            int(item["address_multi_sig_address_count"]),
-                            int(item["address_multi_sig_spend_count"]),
-                            int(item["address_inbox_message_count"]),
-                            list_integer_to_hex(item["address_foundation_multi_sig_spend_txn_hash"]) if item["address_foundation_multi_sig_spend_txn_hash"] else "",
-                            list_integer_to_hex(item["address_foundation_multi_sig_vote_txn_hash"]) if item["address_foundation_multi_sig_vote_txn_hash"] else "",
-                            list_integer_to_hex(item["address_unvotes"]) if item["address_unvotes"] else "",
-                            list_integer_to_hex(item["address_proposal_vote_stats"]) if item["address_proposal_vote_stats"] else "",
-                            item["spider_name"],
-                            item["spider_version"],
-                            item["wallet_address"],
-                        )
-                    )
-                    conn.commit()
-                    logging.info('🔄 UPDATED wallet address: %s' % item['wallet_address'])
-        except DropItem as duplicate:
-            pass
+            row = self._address_row(item, datetime.now(timezone.utc))
         except (Exception, psycopg2.Error) as error:
             spider.logger.error(f"❌ Error processing address item: {error}")
-            handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
-        return item
+            return self.report_error(spider, error, item)
+
+        # The newer state replaces a buffered one of the same wallet, and covers the block it was fetched for too
+        replaced = self.writer.pending.get(row[0])
+        if replaced is not None and replaced[0].get("refresh_block_height") is not None:
+            item["refresh_block_height"] = max(
+                replaced[0]["refresh_block_height"], item.get("refresh_block_height") or 0
+            )
+        return self.buffer(item, row, spider)
+
+    def after_write(self, cur, items):
+        """Record the heights the written wallets were fetched for and advance the blocks waiting on them."""
+        heights = {
+            item["wallet_address"]: item["refresh_block_height"]
+            for item in items
+            if item.get("refresh_block_height") is not None
+        }
+        if self.wallet_refresh.record(cur, heights):
+            self.ingestion_state.advance(cur)
 
+    def after_spool(self, spool, items):
+        """The database is unreachable: queue the spooled wallets for a fetch after the replay."""
+        self.retry_queue.spool(spool, [
+            (item["item_url"], "Wallet state spooled while the database was unreachable")
+            for item in items
+            if item.get("item_url")
+        ])
 
+    def _address_row(self, item, added_datetime):
+        return (
+            item['wallet_address'],
+            int(item['address_balance']),
+            int(item['address_nonce']),
+            int(item["address_ots_bitfield_used_page"]),
+            int(item["address_used_ots_key_count"]),
+            int(item["address_transaction_hash_count"]),
+            int(item["address_tokens_count"]),
+            int(item["address_slaves_count"]),
+            int(item["address_lattice_pk_count"]),
+            int(item["address_multi_sig_address_count"]),
+            int(item["address_multi_sig_spend_count"]),
+            int(item["address_inbox_message_count"]),
+            list_integer_to_hex(item["address_foundation_multi_sig_spend_txn_hash"]) if item["address_foundation_multi_sig_spend_txn_hash"] else "",
+            list_integer_to_hex(item["address_foundation_multi_sig_vote_txn_hash"]) if item["address_foundation_multi_sig_vote_txn_hash"] else "",
+            list_integer_to_hex(item["address_unvotes"]) if item["address_unvotes"] else "",
+            list_integer_to_hex(item["address_proposal_vote_stats"]) if item["address_proposal_vote_stats"] else "",
+            item["spider_name"],
+            item["spider_version"],
+            added_datetime,
+        )
 
 
+class QrlnetworkPipeline_missed_items(BatchWriterPipeline):
+    """
+    Writes the errors aggregated in `missed_items` (by handle_spider_error
+    and from the spider's QRLNetworkMissedItems) in batches, and queues their
+    URLs for another attempt in the same DB transaction.
+    """
+
+    def __init__(self, retry_queue=None, writer=None):
+        super().__init__()
+        self.retry_queue = retry_queue or RetryQueue()
+        self.writer = writer if writer is not None else missed_items
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        missed_items.batch_size = crawler.settings.getint("MISSED_ITEMS_BATCH_SIZE", 500)
+        missed_items.flush_interval = crawler.settings.getfloat("MISSED_ITEMS_FLUSH_INTERVAL", 5.0)
+        missed_items.spool = spool_for_crawler(crawler)
+        return cls(RetryQueue.from_settings(crawler.settings), missed_items)
 
-class QrlnetworkPipeline_missed_items:
     def process_item(self, item, spider):
         # Only process items that are QRLNetworkMissedItem
         if not isinstance(item, QRLNetworkMissedItem):
             return item
 
-        try:
-            current_time = datetime.now(timezone.utc)
-            with db_cursor() as (conn, cur):
-                cur.execute(
-                    'INSERT INTO public."qrl_blockchain_missed_items" ('
-                    '"spider_name", "spider_version", "location_script_file", '
-                    '"location_script_function", "trace_back", "error_type", '
-                    '"error_name", "item_url", "error_timestamp", "failed_data"'
-                    ') VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
-                    (
-                        item.get("spider_name", "UNKNOWN"),
-                        item.get("spider_version", "UNKNOWN"),
-                        item.get("location_script_file", "UNKNOWN"),
-                        item.get("location_script_function", "UNKNOWN"),
-                        item.get("trace_back", "")[:255],
-                        item.get("error_type", "")[:255],
-                        item.get("error_name", "")[:255],
-                        item.get("item_url", "")[:255],
-                        current_time,
-                        item.get("failed_data", "")[:1000],
-                    )
-                )
-                conn.commit()
-        except Exception as error:
-            # If there's an error writing the missed item, log it.
-            logging.error(f"Error processing missed item: {error}")
-            handle_spider_error(spider, error, item, item.get("item_url", "N/A"))
+        # The last traceback line is the most telling error for the retry queue
+        trace_back_lines = (item.get("trace_back") or "").strip().splitlines()
+        retry_error = trace_back_lines[-1] if trace_back_lines else item.get("error_name")
+        item_url = (item.get("item_url") or "N/A")[:255]
+        row = (
+            item.get("spider_name", "UNKNOWN"),
+            item.get("spider_version", "UNKNOWN"),
+            item.get("location_script_file", "UNKNOWN"),
+            item.get("location_script_function", "UNKNOWN"),
+            item.get("trace_back", "")[:255],
+            item.get("error_type", "")[:255],
+            item.get("error_name", "")[:255],
+            item_url,
+            datetime.now(timezone.utc),
+            item.get("failed_data", "")[:1000],
+        )
+        if self.writer.add((item_url, retry_error), row):
+            return self.flush(spider).addCallback(lambda _: item)
         return item
+
+    def after_write(self, cur, errors):
+        """Schedule the URLs of written errors for another attempt (or back off existing retries)."""
+        for item_url, retry_error in errors:
+            self.retry_queue.enqueue(cur, item_url, retry_error)
+
+    def after_spool(self, spool, errors):
+        """The database is unreachable: spool the retry queue entries with the errors."""
+        self.retry_queue.spool(spool, errors)
+
+    def write_error(self, spider, error_key, error):
+        # Not handed back to handle_spider_error: the row would be buffered and rejected again
+        item_url, retry_error = error_key
+        logging.error(f"❌ Could not record error for {item_url} ({str(retry_error)[:80]}): {error}")
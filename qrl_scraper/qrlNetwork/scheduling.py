@@ -0,0 +1,558 @@
+import re
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import psycopg2.extras
+
+CHECKPOINT_TABLE = 'public."qrl_scraper_checkpoint"'
+
+logger = logging.getLogger(__name__)
+
+
+# Sent by the ingestion pipelines with the numbers of the blocks whose rows were committed
+# (or rejected and reported as errors); never for blocks that were only spooled
+blocks_stored = object()
+
+
+class BlockWindow:
+    """
+    Sliding window over the block range [first, last] for long backfills.
+
+    At most `size` blocks are handed out at a time; take() refills the window
+    as complete() reports blocks as parsed (or given up on). `checkpoint` is
+    the highest block below which every block has been stored (see
+    stored()), which is the point a restarted backfill can safely resume
+    after: a parsed block only counts once the pipelines have committed its
+    rows, as they can sit in the write buffers for a while. `lease` is the
+    range start of the block lease the window works on, if any.
+    """
+
+    def __init__(self, first, last, size, lease=None):
+        self.next_block = first
+        self.last = last
+        self.size = size
+        self.lease = lease
+        self.in_flight = set()
+        self.done_ahead = set()  # stored blocks above the checkpoint
+        self.checkpoint = first - 1
+        self.saved_checkpoint = self.checkpoint  # last checkpoint written to the database
+
+    def take(self):
+        """Block numbers to request now, keeping at most `size` in flight."""
+        blocks = []
+        while len(self.in_flight) < self.size and self.next_block <= self.last:
+            self.in_flight.add(self.next_block)
+            blocks.append(self.next_block)
+            self.next_block += 1
+        return blocks
+
+    def complete(self, block_number):
+        """Free the slot of a block that was parsed or given up on."""
+        self.in_flight.discard(block_number)
+
+    def stored(self, block_number):
+        """Count a block as stored (or given up on) and return the new checkpoint."""
+        if self.checkpoint < block_number <= self.last:
+            self.done_ahead.add(block_number)
+        while self.checkpoint + 1 in self.done_ahead:
+            self.done_ahead.remove(self.checkpoint + 1)
+            self.checkpoint += 1
+        return self.checkpoint
+
+    @property
+    def finished(self):
+        """Every block of the range has been requested and parsed (its rows may still be buffered)."""
+        return self.next_block > self.last and not self.in_flight
+
+    @property
+    def done(self):
+        """Every block of the range has been stored."""
+        return self.checkpoint >= self.last
+
+
+# Endpoint of a request URL, for both the explorer API and the gRPC engine
+URL_KINDS = (
+    ("block", re.compile(r"/api/block/|/GetBlockByNumber/")),
+    ("transaction", re.compile(r"/api/tx/|/GetObject/")),
+    ("wallet", re.compile(r"/api/a/|/GetOptimizedAddressState/")),
+    ("node_state", re.compile(r"/GetNodeState$")),
+)
+
+
+def url_kind(url):
+    """"block", "transaction", "wallet", "node_state" or None for any other URL."""
+    for kind, pattern in URL_KINDS:
+        if url and pattern.search(url):
+            return kind
+    return None
+
+
+def load_checkpoint(cur, name):
+    """Return the stored checkpoint block for `name`, or None if there is none."""
+    cur.execute(f'SELECT "block_number" FROM {CHECKPOINT_TABLE} WHERE "name" = %s', (name,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def save_checkpoint(cur, name, block_number):
+    cur.execute(
+        f"""
+        INSERT INTO {CHECKPOINT_TABLE} ("name", "block_number", "updated_at")
+        VALUES (%s, %s, NOW())
+        ON CONFLICT ("name") DO UPDATE
+        SET "block_number" = EXCLUDED."block_number", "updated_at" = EXCLUDED."updated_at"
+        """,
+        (name, block_number),
+    )
+
+
+def clear_checkpoint(cur, name):
+    cur.execute(f'DELETE FROM {CHECKPOINT_TABLE} WHERE "name" = %s', (name,))
+
+
+def shard_range(first, last, shard, shard_count):
+    """Contiguous slice of [first, last] owned by shard `shard` (0-based) of `shard_count`."""
+    total = last - first + 1
+    start = first + total * shard // shard_count
+    end = first + total * (shard + 1) // shard_count - 1
+    return start, end
+
+
+def chain_repair_ranges(broken_blocks, depth=1):
+    """
+    Merge broken prev-hash links into the block ranges to re-ingest.
+
+    A link is broken at block N when N's prev hash differs from the stored
+    hash of N - 1, so either side may have been orphaned by a reorg: each
+    break covers [N - depth, N]. `broken_blocks` must be ascending.
+    """
+    start = end = None
+    for block_number in broken_blocks:
+        first = max(0, block_number - depth)
+        if end is not None and first <= end + 1:
+            end = block_number
+            continue
+        if end is not None:
+            yield start, end
+        start, end = first, block_number
+    if end is not None:
+        yield start, end
+
+
+class BlockLeases:
+    """
+    Block ranges handed out to cooperating backfill processes through the
+    qrl_scraper_block_lease table.
+
+    Each worker claims a range, heartbeats it while working and marks it
+    completed when its window finishes. A lease whose heartbeat is older than
+    `timeout` seconds belongs to a dead worker and is claimed again, resuming
+    from the checkpoint the dead worker last saved.
+    """
+
+    table = 'public."qrl_scraper_block_lease"'
+
+    def __init__(self, name, owner, range_size=1000, timeout=120):
+        self.name = name
+        self.owner = owner
+        self.range_size = range_size
+        self.timeout = timeout
+
+    def claim(self, cur, last_block):
+        """Lease the next range as (range_start, range_end, checkpoint), or None when nothing is left."""
+        cur.execute(
+            f"""
+            UPDATE {self.table} SET "owner" = %s, "heartbeat_at" = NOW()
+            WHERE "id" = (
+                SELECT "id" FROM {self.table}
+                WHERE "name" = %s AND "completed_at" IS NULL
+                  AND ("heartbeat_at" IS NULL OR "heartbeat_at" < NOW() - %s * INTERVAL '1 second')
+                ORDER BY "range_start"
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "range_start", "range_end", "checkpoint"
+            """,
+            (self.owner, self.name, self.timeout),
+        )
+        row = cur.fetchone()
+        if row:
+            return row
+
+        # No abandoned range: carve a new one after the highest leased block (serialized per lease name)
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (self.table + self.name,))
+        cur.execute(
+            f"""
+            INSERT INTO {self.table} ("name", "range_start", "range_end", "checkpoint", "owner", "heartbeat_at")
+            SELECT %s, next_start, LEAST(next_start + %s - 1, %s), next_start - 1, %s, NOW()
+            FROM (SELECT COALESCE(MAX("range_end") + 1, 0) AS next_start FROM {self.table} WHERE "name" = %s) AS leased
+            WHERE next_start <= %s
+            RETURNING "range_start", "range_end", "checkpoint"
+            """,
+            (self.name, self.range_size, last_block, self.owner, self.name, last_block),
+        )
+        return cur.fetchone()
+
+    def heartbeat(self, cur, range_start):
+        """Refresh the lease; returns False if another worker has taken it over."""
+        cur.execute(
+            f"""
+            UPDATE {self.table} SET "heartbeat_at" = NOW()
+            WHERE "name" = %s AND "range_start" = %s AND "owner" = %s
+            """,
+            (self.name, range_start, self.owner),
+        )
+        return cur.rowcount == 1
+
+    def save(self, cur, range_start, checkpoint, completed=False):
+        cur.execute(
+            f"""
+            UPDATE {self.table}
+            SET "checkpoint" = GREATEST("checkpoint", %s), "heartbeat_at" = NOW(),
+                "completed_at" = CASE WHEN %s THEN NOW() ELSE "completed_at" END
+            WHERE "name" = %s AND "range_start" = %s AND "owner" = %s
+            """,
+            (checkpoint, completed, self.name, range_start, self.owner),
+        )
+
+    def release(self, cur, range_start, checkpoint):
+        """Hand an unfinished range back so the next claim picks it up immediately."""
+        cur.execute(
+            f"""
+            UPDATE {self.table}
+            SET "checkpoint" = GREATEST("checkpoint", %s), "owner" = NULL, "heartbeat_at" = NULL
+            WHERE "name" = %s AND "range_start" = %s AND "owner" = %s AND "completed_at" IS NULL
+            """,
+            (checkpoint, self.name, range_start, self.owner),
+        )
+
+
+class RetryQueue:
+    """
+    Durable retry queue for failed block, transaction and wallet URLs
+    (qrl_scraper_retry_queue).
+
+    A failure enqueues the URL, or pushes an existing entry back with
+    exponential backoff: `base_delay * 2 ** (attempts - 1)` seconds, capped at
+    `max_delay`. Entries are drained when due, blocks first, and deleted once
+    their response is processed successfully. While the database is
+    unreachable, spool() writes the entries to the write-ahead spool, and
+    they are enqueued when it is replayed.
+    """
+
+    table = 'public."qrl_scraper_retry_queue"'
+    columns = ("url", "kind", "priority", "attempts", "next_attempt_at", "last_error", "created_at")
+    priorities = {"block": 0, "transaction": 1, "wallet": 2}  # lower drains first
+
+    def __init__(self, base_delay=60, max_delay=86400, max_attempts=10):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            base_delay=settings.getint("RETRY_QUEUE_BASE_DELAY", 60),
+            max_delay=settings.getint("RETRY_QUEUE_MAX_DELAY", 86400),
+            max_attempts=settings.getint("RETRY_QUEUE_MAX_ATTEMPTS", 10),
+        )
+
+    def enqueue(self, cur, url, error):
+        """Queue a failed URL or back off an existing entry; returns False if the URL is not retryable."""
+        kind = url_kind(url)
+        if kind not in self.priorities:
+            return False
+        cur.execute(
+            f"""
+            INSERT INTO {self.table} AS queue
+                ("url", "kind", "priority", "attempts", "next_attempt_at", "last_error", "created_at")
+            VALUES (%s, %s, %s, 1, NOW() + %s * INTERVAL '1 second', %s, NOW())
+            {self.conflict}
+            """,
+            (url, kind, self.priorities[kind], self.base_delay, error),
+        )
+        return True
+
+    @property
+    def conflict(self):
+        """ON CONFLICT clause backing off an existing entry (the queue table is aliased `queue`)."""
+        return (
+            'ON CONFLICT ("url") DO UPDATE SET "attempts" = queue."attempts" + 1, '
+            f'"next_attempt_at" = NOW() + LEAST({int(self.base_delay)} * POWER(2, queue."attempts"), '
+            f'{int(self.max_delay)}) * INTERVAL \'1 second\', '
+            '"last_error" = EXCLUDED."last_error"'
+        )
+
+    def spool(self, spool, failures):
+        """
+        Append entries for [(url, error)] to a spool.WriteAheadSpool as one
+        batch; replaying it enqueues them like enqueue(). Returns the number
+        of retryable URLs.
+        """
+        now = datetime.now(timezone.utc)
+        rows = {}  # one row per URL: a replayed batch may not update an entry twice
+        for url, error in failures:
+            kind = url_kind(url)
+            if kind in self.priorities:
+                rows[url] = (url, kind, self.priorities[kind], 1, now + timedelta(seconds=self.base_delay), error, now)
+        if rows:
+            spool.append(self.table, f"{self.table} AS queue", self.columns, self.conflict, list(rows.values()))
+        return len(rows)
+
+    def complete(self, cur, url):
+        cur.execute(f'DELETE FROM {self.table} WHERE "url" = %s', (url,))
+
+    def due_query(self, kinds):
+        """Query and parameters selecting due (url, kind, attempts) rows of the given kinds, in drain order."""
+        return (
+            f"""
+            SELECT "url", "kind", "attempts"
+            FROM {self.table}
+            WHERE "next_attempt_at" <= NOW() AND "kind" = ANY(%s) AND "attempts" < %s
+            ORDER BY "priority", "next_attempt_at"
+            """,
+            (list(kinds), self.max_attempts),
+        )
+
+
+class WalletRefreshIndex:
+    """
+    Decides which wallets need a fresh /api/a request.
+
+    qrl_wallet_refresh stores, per wallet, the block height it was last
+    refreshed for; a wallet is fetched again only when it shows up in a newer
+    block. Heights looked up or requested during the run are kept in a
+    bounded LRU (`cache_size` wallets), so memory stays flat during backfills.
+    The spider consults the LRU on the reactor thread and looks up only the
+    wallets it misses, in the DB thread pool. The address pipeline writes the
+    refreshes with record(), in the DB transaction that stores the fetched
+    wallet states.
+    """
+
+    table = 'public."qrl_wallet_refresh"'
+
+    def __init__(self, cache_size=100000):
+        self.cache_size = cache_size
+        self.heights = OrderedDict()  # wallet -> highest block height known to be refreshed or requested
+
+    def _remember(self, wallet, block_height):
+        if block_height is None:
+            return
+        if wallet in self.heights:
+            block_height = max(block_height, self.heights[wallet])
+            self.heights.move_to_end(wallet)
+        self.heights[wallet] = block_height
+        if len(self.heights) > self.cache_size:
+            self.heights.popitem(last=False)
+
+    def unknown(self, wallets):
+        """The wallets whose refreshed height is not in the LRU; look them up with lookup() before due()."""
+        return [wallet for wallet in dict.fromkeys(wallets) if wallet not in self.heights]
+
+    @classmethod
+    def lookup(cls, cur, wallets):
+        """{wallet: last refreshed block height} of the wallets stored in qrl_wallet_refresh (no LRU access: thread-safe)."""
+        cur.execute(
+            f'SELECT "wallet_address", "last_refreshed_block_height" FROM {cls.table} '
+            f'WHERE "wallet_address" = ANY(%s)',
+            (list(wallets),),
+        )
+        return dict(cur.fetchall())
+
+    def due(self, wallets, block_height, refreshed=None):
+        """
+        Return the wallets that must be fetched for a block at `block_height`
+        and mark them as requested. `refreshed` holds the lookup() result for
+        the wallets that were unknown(); wallets missing from both are due.
+        """
+        for wallet, refreshed_height in (refreshed or {}).items():
+            self._remember(wallet, refreshed_height)
+
+        due = []
+        for wallet in dict.fromkeys(wallets):
+            known_height = self.heights.get(wallet)
+            if known_height is None or block_height > known_height:
+                due.append(wallet)
+                self._remember(wallet, block_height)
+        return due
+
+    def record(self, cur, heights):
+        """Write refreshed block heights ({wallet: block_height}); returns how many wallets were written."""
+        if not heights:
+            return 0
+        psycopg2.extras.execute_values(
+            cur,
+            f"""
+            INSERT INTO {self.table} AS refresh ("wallet_address", "last_refreshed_block_height", "refreshed_at")
+            VALUES %s
+            ON CONFLICT ("wallet_address") DO UPDATE SET
+                "last_refreshed_block_height" = GREATEST(refresh."last_refreshed_block_height", EXCLUDED."last_refreshed_block_height"),
+                "refreshed_at" = EXCLUDED."refreshed_at"
+            """,
+            list(heights.items()),
+            template="(%s, %s, NOW())",
+            page_size=1000,
+        )
+        return len(heights)
+
+
+class BlockIngestionState:
+    """
+    Per-block ingestion progress in qrl_block_ingestion_state.
+
+    A block moves header_stored -> txs_stored -> wallets_refreshed -> complete:
+      - header_stored: the block row is written; its transaction hashes are
+        recorded as the transactions still expected;
+      - txs_stored: every expected transaction is in qrl_blockchain_transactions
+        (written together with the wallets the transactions touch);
+      - wallets_refreshed: each of those wallets has a qrl_wallet_refresh
+        height at or above the block;
+      - complete: got_all_transactions is set on the block row.
+    advance() moves any number of blocks forward with set-based UPDATEs, so
+    the pipelines can call it once per batch. A restarted spider asks for
+    exactly what is missing: the transactions not stored yet and the wallets
+    not refreshed yet.
+    """
+
+    table = 'public."qrl_block_ingestion_state"'
+    wallet_address = re.compile(r"^Q(?!0+$)[0-9a-f]{78}$")  # well-formed, non-null address
+
+    def header_stored(self, cur, block_number, tx_hashes):
+        """Record a stored block and the transactions it still waits for (fills in an old placeholder row)."""
+        cur.execute(
+            f"""
+            INSERT INTO {self.table} AS state
+                ("block_number", "state", "txs_expected", "txs_stored", "tx_hashes", "wallets", "updated_at")
+            VALUES (%s, %s, %s, 0, %s, '{{}}', NOW())
+            ON CONFLICT ("block_number") DO UPDATE SET
+                "state" = EXCLUDED."state",
+                "txs_expected" = EXCLUDED."txs_expected",
+                "tx_hashes" = EXCLUDED."tx_hashes",
+                "updated_at" = NOW()
+            WHERE state."state" = 'header_stored' AND state."tx_hashes" IS NULL
+            """,
+            (block_number, "header_stored" if tx_hashes else "txs_stored", len(tx_hashes), list(tx_hashes)),
+        )
+
+    def transactions_stored(self, cur, wallets_by_block):
+        """
+        Record the wallets touched by a batch of stored transactions
+        ({block_number: wallets}) on blocks whose header is already stored.
+        Transactions of a block without a state row open none: the block's
+        own row (header_stored) is what carries the expected hashes, and
+        advance() counts the stored transactions against them.
+        """
+        rows = [
+            (block_number, sorted({wallet for wallet in wallets if self.wallet_address.match(wallet)}))
+            for block_number, wallets in wallets_by_block.items()
+        ]
+        if not rows:
+            return
+        psycopg2.extras.execute_values(
+            cur,
+            f"""
+            UPDATE {self.table} AS state
+            SET "wallets" = ARRAY(SELECT DISTINCT unnest(state."wallets" || touched."wallets")),
+                "updated_at" = NOW()
+            FROM (VALUES %s) AS touched ("block_number", "wallets")
+            WHERE state."block_number" = touched."block_number"
+              AND state."state" IN ('header_stored', 'txs_stored')
+            """,
+            rows,
+            template="(%s::bigint, %s::text[])",
+            page_size=1000,
+        )
+
+    def advance(self, cur, block_numbers=None):
+        """
+        Move blocks (all unfinished ones when block_numbers is None) as far as
+        their stored data allows. Returns the number of blocks completed.
+        """
+        scope = 'AND (%(blocks)s::bigint[] IS NULL OR state."block_number" = ANY(%(blocks)s::bigint[]))'
+        params = {"blocks": list(block_numbers) if block_numbers is not None else None}
+        cur.execute(
+            f"""
+            UPDATE {self.table} AS state
+            SET "txs_stored" = stored.tx_count,
+                "state" = CASE WHEN stored.tx_count >= state."txs_expected" THEN 'txs_stored' ELSE state."state" END,
+                "updated_at" = CASE WHEN stored.tx_count >= state."txs_expected" THEN NOW() ELSE state."updated_at" END
+            FROM (
+                SELECT state."block_number", COUNT(DISTINCT transactions."transaction_hash") AS tx_count
+                FROM {self.table} AS state
+                JOIN public."qrl_blockchain_transactions" AS transactions
+                  ON transactions."transaction_block_number" = state."block_number"
+                 AND transactions."transaction_hash" = ANY(state."tx_hashes")
+                WHERE state."state" = 'header_stored' {scope}
+                GROUP BY state."block_number"
+            ) AS stored
+            WHERE state."block_number" = stored."block_number" AND stored.tx_count <> state."txs_stored"
+            """,
+            params,
+        )
+        cur.execute(
+            f"""
+            UPDATE {self.table} AS state
+            SET "state" = 'wallets_refreshed', "updated_at" = NOW()
+            WHERE state."state" = 'txs_stored' {scope}
+              AND NOT EXISTS (
+                  SELECT 1 FROM unnest(state."wallets") AS wallet
+                  LEFT JOIN public."qrl_wallet_refresh" AS refresh ON refresh."wallet_address" = wallet
+                  WHERE refresh."last_refreshed_block_height" IS NULL
+                     OR refresh."last_refreshed_block_height" < state."block_number"
+              )
+            """,
+            params,
+        )
+        cur.execute(
+            f"""
+            WITH completed AS (
+                UPDATE {self.table} AS state
+                SET "state" = 'complete', "tx_hashes" = NULL, "wallets" = NULL, "updated_at" = NOW()
+                WHERE state."state" = 'wallets_refreshed' {scope}
+                RETURNING state."block_number"
+            )
+            UPDATE public."qrl_blockchain_blocks" AS blocks
+            SET "got_all_transactions" = true
+            FROM completed
+            WHERE blocks."block_number" = completed."block_number"
+            """,
+            params,
+        )
+        return cur.rowcount
+
+    def missing_transactions_query(self, grace_seconds):
+        """(block_number, transaction_hash) of expected transactions not stored, for blocks idle for grace_seconds."""
+        return (
+            f"""
+            SELECT state."block_number", expected.tx_hash
+            FROM {self.table} AS state
+            CROSS JOIN LATERAL unnest(state."tx_hashes") AS expected (tx_hash)
+            WHERE state."state" = 'header_stored'
+              AND state."updated_at" < NOW() - %s * INTERVAL '1 second'
+              AND NOT EXISTS (
+                  SELECT 1 FROM public."qrl_blockchain_transactions" AS transactions
+                  WHERE transactions."transaction_hash" = expected.tx_hash
+                    AND transactions."transaction_block_number" = state."block_number"
+              )
+            ORDER BY state."block_number"
+            """,
+            (grace_seconds,),
+        )
+
+    def stale_wallets_query(self, grace_seconds):
+        """(block_number, wallet) of wallets not refreshed up to their block, for blocks idle for grace_seconds."""
+        return (
+            f"""
+            SELECT state."block_number", touched.wallet
+            FROM {self.table} AS state
+            CROSS JOIN LATERAL unnest(state."wallets") AS touched (wallet)
+            LEFT JOIN public."qrl_wallet_refresh" AS refresh ON refresh."wallet_address" = touched.wallet
+            WHERE state."state" = 'txs_stored'
+              AND state."updated_at" < NOW() - %s * INTERVAL '1 second'
+              AND (refresh."last_refreshed_block_height" IS NULL
+                   OR refresh."last_refreshed_block_height" < state."block_number")
+            ORDER BY state."block_number"
+            """,
+            (grace_seconds,),
+        )
@@ -22,6 +22,7 @@ BOT_NAME = 'qrlNetwork'
 
 SPIDER_MODULES = ['qrlNetwork.spiders']
 NEWSPIDER_MODULE = 'qrlNetwork.spiders'
+COMMANDS_MODULE = 'qrlNetwork.commands'
 
 # Determine environment
 DJANGO_ENV = env("DJANGO_ENV", default="development")
@@ -49,12 +50,28 @@ USER_AGENT = 'QuantaScan.io (https://quantascan.io)'
 ROBOTSTXT_OBEY = False
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-CONCURRENT_REQUESTS = 8
+# Upper bound only: the adaptive throttle below picks the concurrency per host
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
-DOWNLOAD_DELAY = 0.5  # Add 0.5 second delay between requests
+DOWNLOAD_DELAY = 0.5  # Add 0.5 second delay between requests (starting point for the adaptive throttle)
 CONCURRENT_REQUESTS_PER_DOMAIN = 8
 REACTOR_THREADPOOL_MAXSIZE = 10
+DB_THREADPOOL_SIZE = 4  # threads running pipeline DB work; keep below DB_POOL_MAX_CONNECTIONS
+
+# Connections are checked on checkout and replaced when broken or too old. DATABASE_URL is read from the
+# environment, so rotated credentials take effect when the dyno restarts (Heroku does so on config changes)
+DB_POOL_MAX_CONNECTIONS = 10
+DB_CONNECT_TIMEOUT = 3  # seconds a single connection attempt may take (libpq connect_timeout, at least 2)
+DB_POOL_MAX_LIFETIME = 1800  # seconds before a connection is closed and replaced
+DB_POOL_VALIDATE_IDLE_AFTER = 5  # seconds idle before a checkout is validated with SELECT 1
+DB_POOL_ACQUIRE_TIMEOUT = 10  # seconds of (backed off) connection attempts before a checkout fails
+DB_POOL_BACKOFF_MAX = 5  # seconds, cap of the exponential backoff between connection attempts
+DB_POOL_STATS_INTERVAL = 30  # seconds between db_pool/* crawl stats updates (0 disables them)
+
+EXTENSIONS = {
+    'qrlNetwork.extensions.DBPoolStats': 500,
+}
 
 # Add random delay to avoid being blocked
 RANDOMIZE_DOWNLOAD_DELAY = True
@@ -76,16 +93,115 @@ ITEM_PIPELINES = {
     'qrlNetwork.pipelines.QrlnetworkPipeline_missed_items': 300,
 }
 
+# Blocks and transactions are buffered together and written in one DB transaction every N items or T seconds
+TRANSACTION_BATCH_SIZE = 500
+TRANSACTION_FLUSH_INTERVAL = 5  # seconds
+# Rescrape mode: overwrite stored block rows instead of skipping them (-s BLOCK_UPDATE_EXISTING=True)
+BLOCK_UPDATE_EXISTING = False
+
+# Errors are aggregated per (url, error) and upserted into the missed items table every N errors or T seconds
+MISSED_ITEMS_BATCH_SIZE = 500
+MISSED_ITEMS_FLUSH_INTERVAL = 5  # seconds
+
+# Wallet states are buffered (latest state per wallet) and upserted every N wallets or T seconds
+ADDRESS_BATCH_SIZE = 500
+ADDRESS_FLUSH_INTERVAL = 5  # seconds
+
+# Batches that cannot reach Postgres are appended to a local spool (.scrapy/spool) and replayed by the crawl once the
+# database is back; `scrapy replay-spool` loads segments left by earlier crawls. The spool only survives a restart on
+# persistent storage: on Heroku's ephemeral dyno disk, batches still spooled at a dyno restart are lost.
+SPOOL_ENABLED = True
+SPOOL_DIR = 'spool'  # relative to the project data dir (.scrapy), or an absolute path
+SPOOL_SEGMENT_MB = 64  # a segment is sealed (ready for replay) at this size, before a replay or when the crawl ends
+SPOOL_DB_RETRY_AFTER = 30  # seconds of spooling after a connection failure before the database is tried again
+SPOOL_FSYNC = True  # fsync every spooled batch
+SPOOL_REPLAY_INTERVAL = 60  # seconds between attempts to replay sealed segments during a crawl (0 disables)
+
+# block=all backfills keep at most this many blocks in flight and resume from a checkpoint
+BACKFILL_WINDOW_SIZE = 100
+BACKFILL_CHECKPOINT_EVERY = 100  # blocks between checkpoint writes
+# -a shard=lease: workers claim ranges of BACKFILL_LEASE_SIZE blocks, a lease without heartbeat expires
+BACKFILL_LEASE_NAME = 'block-all'  # use a new name to start a new leased pass
+BACKFILL_LEASE_SIZE = 1000
+BACKFILL_LEASE_HEARTBEAT = 30  # seconds
+BACKFILL_LEASE_TIMEOUT = 120  # seconds
+
 # Enable logging for debugging (optional)
 SPIDER_MIDDLEWARES = {
     'scrapy.spidermiddlewares.httperror.HttpErrorMiddleware': 50,
     'scrapy.spidermiddlewares.referer.RefererMiddleware': 100,
+    'qrlNetwork.middlewares.BlockBackpressureMiddleware': 950,
 }
 
+# Block requests wait while this many items + DB jobs are pending, until the queue drains to the low watermark
+BACKPRESSURE_ENABLED = True
+BACKPRESSURE_HIGH_WATERMARK = 1000
+BACKPRESSURE_LOW_WATERMARK = 250
+BACKPRESSURE_CHECK_INTERVAL = 0.5  # seconds
+
 DOWNLOADER_MIDDLEWARES = {
     'scrapy.downloadermiddlewares.downloadtimeout.DownloadTimeoutMiddleware': 50,
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': 100,
+    # First of ours: cache hits skip hedging and throttling altogether; below HttpCompressionMiddleware (590)
+    # so that decompressed bodies are cached
+    'qrlNetwork.middlewares.FinalizedCacheMiddleware': 580,
+    # Before the throttle: hedged duplicates are downloaded through the whole chain, throttled per source
+    'qrlNetwork.middlewares.HedgedFetchMiddleware': 600,
+    # After RetryMiddleware (550) in the response chain, so it sees every 429/5xx before it is retried
+    'qrlNetwork.middlewares.QrlnetworkDownloaderMiddleware': 650,
+}
+
+# AIMD rate control per explorer/node host (QrlnetworkDownloaderMiddleware)
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MIN_CONCURRENCY = 1
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 32
+ADAPTIVE_THROTTLE_MIN_DELAY = 0  # seconds
+ADAPTIVE_THROTTLE_MAX_DELAY = 30  # seconds
+ADAPTIVE_THROTTLE_DELAY_STEP = 0.05  # seconds taken off the delay per healthy response
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0  # seconds; above this no speed-up, above twice this back off
+ADAPTIVE_THROTTLE_MAX_RETRY_AFTER = 600  # seconds
+
+# Explorer mirrors equivalent to scrap_url (comma separated SCRAP_SOURCES); with two or more sources,
+# block/tx/wallet requests rotate over the healthy ones and are hedged (HedgedFetchMiddleware)
+FETCH_SOURCES = env.list('SCRAP_SOURCES', default=[])
+HEDGE_ENABLED = True
+HEDGE_PERCENTILE = 95  # send the duplicate once the primary is slower than this latency percentile
+HEDGE_MIN_DELAY = 0.2  # seconds
+HEDGE_DEFAULT_DELAY = 1.0  # seconds, until a source has HEDGE_MIN_SAMPLES latencies
+HEDGE_MIN_SAMPLES = 20
+HEDGE_SAMPLE_SIZE = 200  # latencies kept per source
+SOURCE_FAILURE_THRESHOLD = 3  # consecutive failures or lost races before a source leaves the rotation
+SOURCE_DEGRADED_COOLDOWN = 60  # seconds before a degraded source is tried again
+
+# Finalized block/tx responses are kept compressed on disk (.scrapy/finalized_cache) and replayed on rescrapes
+FINALIZED_CACHE_ENABLED = True
+FINALIZED_CACHE_DIR = 'finalized_cache'  # relative to the project data dir (.scrapy)
+FINALIZED_CACHE_MAX_MB = 1024  # least recently used entries are evicted above this size
+FINALIZED_CACHE_CONFIRMATIONS = 100  # blocks below the tip before a block or its transactions are cached
+
+# grpc:// requests are served by the gRPC ingestion engine (-a engine=grpc)
+DOWNLOAD_HANDLERS = {
+    'grpc': 'qrlNetwork.grpc_ingest.GrpcDownloadHandler',
 }
+QRL_GRPC_TIMEOUT = 10  # seconds per unary call
+
+# -a follow=true polls the node for a new chain tip this often
+FOLLOW_POLL_INTERVAL = 5  # seconds
+
+# Wallets are refetched only when seen in a block newer than their last refresh (qrl_wallet_refresh)
+WALLET_REFRESH_CACHE_SIZE = 100000  # wallets kept in the in-run LRU
+
+# qrl_block_ingestion_state tracks each block through header_stored -> txs_stored -> wallets_refreshed -> complete;
+# a normal-mode run re-requests the missing transactions/wallets of blocks idle for this many seconds
+INGESTION_RESUME_GRACE = 600
+
+# -a retry=verify-chain re-ingests this many blocks below each broken prev-hash link, plus the block itself
+CHAIN_REPAIR_DEPTH = 1
+
+# Failed block/transaction/wallet URLs go to qrl_scraper_retry_queue with exponential backoff
+RETRY_QUEUE_BASE_DELAY = 60  # seconds before the first retry, doubled per attempt
+RETRY_QUEUE_MAX_DELAY = 86400  # seconds
+RETRY_QUEUE_MAX_ATTEMPTS = 10  # entries at this many attempts stay queued but are no longer drained
 
 # Add timeout settings
 DOWNLOAD_TIMEOUT = 30
@@ -7,10 +7,29 @@ import json
 import traceback
 import sys
 import requests
+import socket
+from datetime import datetime, timezone
 from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import task
 from twisted.internet.error import DNSLookupError, TimeoutError, TCPTimedOutError
 
-from ..utils import get_db_connection, scrap_url, list_integer_to_hex
+from ..utils import db_cursor, run_in_db_thread, scrap_url, grpc_target, list_integer_to_hex, load_explorer_json
+from ..scheduling import (
+    BlockWindow,
+    BlockLeases,
+    blocks_stored,
+    RetryQueue,
+    WalletRefreshIndex,
+    BlockIngestionState,
+    shard_range,
+    chain_repair_ranges,
+    load_checkpoint,
+    save_checkpoint,
+    clear_checkpoint,
+)
+from ..decoders import decode_transaction, embedded_transaction_response, is_complete_embedded_transaction
 from ..items import (
     QRLNetworkBlockItem,
     QRLNetworkTransactionItem,
@@ -22,9 +41,17 @@ from ..items import (
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DOCUMENT_DIR = os.path.join(PROJECT_ROOT, "Documenten")
 
+NULL_WALLET_ADDRESS = "Q0000000000000000000000000000000000000000000000000000000000000000"
+BACKFILL_CHECKPOINT = "block-all"
+# retry=<mode> drains these kinds from the retry queue; RETRY_CALLBACKS parses each kind
+RETRY_QUEUE_MODES = {
+    "queue": ("block", "transaction", "wallet"),
+    "blocks": ("block",),
+    "transactions": ("transaction",),
+    "wallets": ("wallet",),
+}
+RETRY_CALLBACKS = {"block": "parse_block", "transaction": "parse_transaction", "wallet": "parse_address"}
 
-def list_integer_to_string(data_list):
-    return bytearray(data_list).decode()
 logging.getLogger('scrapy.core.scraper').setLevel(logging.ERROR)
 
 class QRLNetworkSpider(scrapy.Spider):
@@ -32,12 +59,46 @@ class QRLNetworkSpider(scrapy.Spider):
     version = "0.25"
     start_urls = ["https://zeus-proxy.automated.theqrl.org/grpc/mainnet/GetNodeState"]
 
-    def __init__(self, retry=None, *args, **kwargs):
+    def __init__(
+        self, retry=None, tx_source="block", engine="http", resume="true", shard=None, follow="false", *args, **kwargs
+    ):
         super(QRLNetworkSpider, self).__init__(*args, **kwargs)
         self.retry = retry  # Activate retry mode if specified
-        self.logger.info(f"Initialized spider with retry mode: {self.retry}") 
-        self.connection, self.cur = get_db_connection()
-        self.requested_wallets = set()  # Track wallet URLs already requested
+        # "block": decode transactions embedded in /api/block, "api": one /api/tx request per transaction
+        self.tx_source = tx_source
+        # "http": explorer JSON API, "grpc": QRL node PublicAPI (see qrlNetwork/grpc_ingest.py)
+        self.engine = engine
+        # block=all: continue from the stored checkpoint unless resume=false
+        self.resume = str(resume).lower() not in ("false", "0", "no")
+        # block=all: "k/n" rescrapes only slice k (0-based) of n, "lease" claims ranges from qrl_scraper_block_lease
+        self.shard = shard
+        if shard and shard != "lease":
+            try:
+                self.shard = tuple(int(part) for part in shard.split("/"))
+                valid = len(self.shard) == 2 and 0 <= self.shard[0] < self.shard[1]
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ValueError(f"shard must be k/n with 0 <= k < n, or 'lease' (got {shard!r})")
+        self.backfill = None  # BlockWindow being requested
+        self.backfill_windows = []  # windows (the one being requested included) with blocks not stored yet
+        self.backfill_checkpoint_name = None
+        self.backfill_last_block = None
+        self.backfill_leases = None
+        self.backfill_heartbeat = None
+        # follow=true: keep running after catch-up and poll the node for new blocks every FOLLOW_POLL_INTERVAL seconds
+        self.follow = str(follow).lower() in ("true", "1", "yes")
+        self.follow_loop = None
+        self.follow_poll_pending = False
+        self.follow_height = None  # highest block scheduled
+        self.follow_ingested = None  # (block_number, timestamp_seconds) of the highest block parsed
+        self.logger.info(
+            f"Initialized spider with retry mode: {self.retry}, tx source: {self.tx_source}, engine: {self.engine}"
+        )
+        # DB work goes through short-lived db_cursor(blocking=False) checkouts: a dropped connection is replaced by
+        # the pool, and an unreachable database fails the call at once instead of stalling the reactor
+        self.wallet_refresh = None  # WalletRefreshIndex, created once settings are available
+        self.wallet_lookups_pending = 0  # WalletRefreshIndex lookups running in the DB thread pool
         # Fetch & store the emission before starting scraping
         self.update_emission()
  
@@ -70,11 +131,21 @@ class QRLNetworkSpider(scrapy.Spider):
     def start_requests(self):
         """
         Start requests based on mode:
-            - scrapy crawl qrl_network_spider -a retry=transactions (retry failed transactions)
+            - scrapy crawl qrl_network_spider -a retry=queue (retry every due failed block, transaction and wallet)
+            - scrapy crawl qrl_network_spider -a retry=blocks|transactions|wallets (retry due failures of one kind)
             - scrapy crawl qrl_network_spider -a retry=check-blocks-missing-transactions (rescrape incomplete blocks)
+            - scrapy crawl qrl_network_spider -a retry=verify-chain (check prev-hash links, rescrape only broken ranges)
+            - scrapy crawl qrl_network_spider -a retry=verify-chain -a repair=false (only report broken links)
             - scrapy crawl qrl_network_spider -a block=12345 (rescrape a specific block)
-            - scrapy crawl qrl_network_spider -a block=all (rescrape all blocks)
+            - scrapy crawl qrl_network_spider -a block=all (rescrape all blocks, resuming an interrupted run)
+            - scrapy crawl qrl_network_spider -a block=all -a resume=false (rescrape all blocks from block 0)
+            - scrapy crawl qrl_network_spider -a block=all -a shard=3/8 (rescrape slice 3 of 8, one process per slice)
+            - scrapy crawl qrl_network_spider -a block=all -a shard=lease (run N of these; workers lease block ranges from the DB)
+            - scrapy crawl qrl_network_spider -a block=all -s BLOCK_UPDATE_EXISTING=True (rescrape and overwrite stored blocks)
             - scrapy crawl qrl_network_spider -a wallet=Q01234…
+            - scrapy crawl qrl_network_spider -a tx_source=api (fetch every transaction from /api/tx instead of the block payload)
+            - scrapy crawl qrl_network_spider -a follow=true (catch up, then keep ingesting new blocks as they appear)
+            - scrapy crawl qrl_network_spider -a engine=grpc (read from the QRL node at QRL_GRPC_TARGET instead of the explorer)
             - Normal mode if no arguments are provided
         """
 
@@ -85,7 +156,7 @@ class QRLNetworkSpider(scrapy.Spider):
         if hasattr(self, "wallet") and self.wallet:
             self.logger.info(f"Searching for wallet: {self.wallet}")
             yield scrapy.Request(
-                url=f"{scrap_url}/api/a/{self.wallet}",
+                url=self.wallet_url(self.wallet),
                 callback=self.parse_address,
                 errback=self.errback_conn,
                 meta={"wallet_search": True},
@@ -96,175 +167,547 @@ class QRLNetworkSpider(scrapy.Spider):
         if emission_item:
             yield emission_item 
 
-        if self.retry == "transactions":
-            self.logger.info("Retry mode: Fetching failed transactions.")
-            failed_urls = self.get_failed_urls()
-            if not failed_urls:
-                self.logger.info("No failed transactions found. Exiting retry mode.")
-                return
-
-            for url in failed_urls:
+        if self.retry in RETRY_QUEUE_MODES:
+            self.logger.info(f"Retry mode: Draining due {self.retry} from the retry queue.")
+            retry_count = 0
+            for url, kind, attempts in self.get_due_retries(RETRY_QUEUE_MODES[self.retry]):
+                retry_count += 1
+                self.logger.info(f"Retrying {kind} URL (attempt {attempts + 1}): {url}")
                 yield scrapy.Request(
                     url=url,
-                    callback=self.parse_transaction,
+                    callback=getattr(self, RETRY_CALLBACKS[kind]),
                     errback=self.errback_conn,
-                    meta={"retry_mode": self.retry},
+                    meta={"retry_mode": self.retry, "retry_queue": True},
+                    dont_filter=True,
                 )
+            if not retry_count:
+                self.logger.info("No due retries found. Exiting retry mode.")
 
         elif self.retry == "check-blocks-missing-transactions":
             self.logger.info("Retry mode: Checking older blocks missing transactions.")
-            # 1. Fetch blocks that are older than 2 days AND got_all_transactions = false
-            blocks_to_check = self.get_blocks_older_than_two_days_not_completed()
-            self.logger.info(f"Found {len(blocks_to_check)} blocks to verify.")
-
-            for block_number, block_found_datetime, block_tx_count in blocks_to_check:
-                # 2. Compare the actual transaction count from qrl_blockchain_transactions
-                actual_tx_count = self.get_transaction_count_for_block(block_number)
-
-                if actual_tx_count == block_tx_count:
-                    self.logger.info(
-                        f"Block {block_number} has correct number of transactions ({actual_tx_count}). "
-                        "Marking as completed."
-                    )
-                    # 3a. Mark block as completed
-                    self.mark_block_as_completed(block_number)
-                else:
-                    # 3b. We need to re-scrape the block
-                    self.logger.info(
-                        f"Block {block_number} expected {block_tx_count} but got {actual_tx_count}. Re-scraping."
-                    )
-                    yield scrapy.Request(
-                        url=f"{scrap_url}/api/block/{block_number}",
-                        callback=self.parse_block,
-                        errback=self.errback_conn,
-                        meta={"block_number": block_number, "retry_mode": self.retry},
-                    )
+            # 1. Mark every old incomplete block whose stored transactions match its count, in one statement
+            completed = self.mark_complete_blocks_older_than_two_days()
+            self.logger.info(f"Marked {completed} blocks with the correct number of transactions as completed.")
+
+            # 2. Every old block still incomplete is missing transactions: re-scrape it
+            for block_number, block_tx_count in self.get_blocks_older_than_two_days_not_completed():
+                self.logger.info(f"Block {block_number} expected {block_tx_count} transactions. Re-scraping.")
+                yield self.block_request(block_number, retry_mode=self.retry)
+
+        elif self.retry == "verify-chain":
+            self.logger.info("Retry mode: Verifying the prev-hash links of the stored blocks.")
+            yield from self.repair_chain()
+
         elif hasattr(self, "block"):
             if self.block.lower() == "all":
                 self.logger.info("Rescraping all blocks")
 
                 # Fetch the latest block number from the API
-                self.cur.execute('SELECT MAX("block_number") FROM public."qrl_blockchain_blocks"')
-                latest_block_number = self.cur.fetchall()[0][0] or 0
+                latest_block_number = self.get_highest_block_number()
                 if latest_block_number is None:
                     self.logger.error("Failed to get latest block number, cannot proceed with full rescrape.")
                     return
 
-                for block_number in range(0, latest_block_number + 1):  # reversed()  # Rescrape all blocks
-                    yield scrapy.Request(
-                        url=f"{scrap_url}/api/block/{block_number}",
-                        callback=self.parse_block,
-                        errback=self.errback_conn,
-                        meta={"block_number": block_number},
-                    )
+                # Only BACKFILL_WINDOW_SIZE blocks are scheduled up front; parse_block/errback_conn refill the window
+                yield from self.start_backfill(latest_block_number)
 
             elif self.block.isdigit():
                 block_number = int(self.block)
                 self.logger.info(f"Rescraping block {block_number}")
 
-                yield scrapy.Request(
-                    url=f"{scrap_url}/api/block/{block_number}",
-                    callback=self.parse_block,
-                    errback=self.errback_conn,
-                    meta={"block_number": block_number},
-                )
+                yield self.block_request(block_number)
 
         else:
             # Normal spider behavior
-            self.logger.info("Normal mode: Starting with default start_urls.")
-            for url in self.start_urls:
+            self.logger.info("Normal mode: Starting with the node state.")
+            for url in self.node_state_urls():
                 yield scrapy.Request(url=url, callback=self.parse, errback=self.errback_conn)
 
+            if self.follow:
+                self.logger.info("Follow mode: polling the node for new blocks after catch-up.")
+                self.follow_loop = task.LoopingCall(self.poll_chain_tip)
+                self.follow_loop.start(self.settings.getfloat("FOLLOW_POLL_INTERVAL", 5), now=False)
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def spider_idle(self, spider):
+        if self.follow:
+            raise DontCloseSpider  # keep following the chain tip
+        if self.wallet_lookups_pending:
+            raise DontCloseSpider  # their wallet requests are not scheduled yet
+
     # -------------------------------------------------------------------------
     #                           HELPER METHODS
     # -------------------------------------------------------------------------
 
-    def get_failed_urls(self):
-        """Fetch failed transactions from the database (for retry=transactions mode)."""
-        try:
-            self.cur.execute(
-                'SELECT item_url FROM public."qrl_blockchain_missed_items" WHERE item_url LIKE %s',
-                ["%/tx/%"],
+    def node_state_urls(self):
+        if self.engine == "grpc":
+            return [f"grpc://{grpc_target}/GetNodeState"]
+        return self.start_urls
+
+    def block_url(self, block_number):
+        if self.engine == "grpc":
+            return f"grpc://{grpc_target}/GetBlockByNumber/{block_number}"
+        return f"{scrap_url}/api/block/{block_number}"
+
+    def block_request(self, block_number, **meta):
+        return scrapy.Request(
+            url=self.block_url(block_number),
+            callback=self.parse_block,
+            errback=self.errback_conn,
+            meta={"block_number": block_number, **meta},
+        )
+
+    def transaction_url(self, tx_hash):
+        if self.engine == "grpc":
+            return f"grpc://{grpc_target}/GetObject/{tx_hash}"
+        return f"{scrap_url}/api/tx/{tx_hash}"
+
+    def wallet_url(self, wallet):
+        if self.engine == "grpc":
+            return f"grpc://{grpc_target}/GetOptimizedAddressState/{wallet}"
+        return f"{scrap_url}/api/a/{wallet}"
+
+    def get_highest_block_number(self):
+        with db_cursor(blocking=False) as (conn, cur):
+            cur.execute('SELECT MAX("block_number") FROM public."qrl_blockchain_blocks"')
+            return cur.fetchall()[0][0] or 0
+
+    def start_backfill(self, latest_block_number):
+        """
+        Schedule the first window of a block=all backfill over 0..latest_block_number.
+        Without shard (or with shard=k/n) the window resumes after the stored checkpoint;
+        with shard=lease block ranges are claimed from qrl_scraper_block_lease instead.
+        """
+        self.backfill_last_block = latest_block_number
+        self.crawler.stats.set_value("backfill/last_block", latest_block_number)
+        self.crawler.signals.connect(self.backfill_blocks_stored, signal=blocks_stored)
+
+        if self.shard == "lease":
+            self.backfill_leases = BlockLeases(
+                self.settings.get("BACKFILL_LEASE_NAME", BACKFILL_CHECKPOINT),
+                f"{os.environ.get('DYNO', socket.gethostname())}:{os.getpid()}",
+                range_size=self.settings.getint("BACKFILL_LEASE_SIZE", 1000),
+                timeout=self.settings.getint("BACKFILL_LEASE_TIMEOUT", 120),
             )
-            failed_urls = [row[0] for row in self.cur.fetchall()]
-            self.logger.info(f"Found {len(failed_urls)} failed transactions.")
-            # ✅ Log every failed transaction URL to verify structure
-            for url in failed_urls:
-                self.logger.info(f"Retrying failed transaction URL: {url} | Type: {type(url)}")
-            return failed_urls
+            self.backfill_heartbeat = task.LoopingCall(self.heartbeat_backfill_lease)
+            self.backfill_heartbeat.start(self.settings.getint("BACKFILL_LEASE_HEARTBEAT", 30), now=False)
+            if not self.claim_backfill_lease():
+                return
+        else:
+            first_block, last_block = 0, latest_block_number
+            self.backfill_checkpoint_name = BACKFILL_CHECKPOINT
+            if self.shard:
+                shard, shard_count = self.shard
+                first_block, last_block = shard_range(0, latest_block_number, shard, shard_count)
+                self.backfill_checkpoint_name = f"{BACKFILL_CHECKPOINT}:{shard}/{shard_count}"
+                self.logger.info(f"Shard {shard}/{shard_count}: blocks {first_block}-{last_block}")
+            if self.resume:
+                try:
+                    with db_cursor(blocking=False) as (conn, cur):
+                        checkpoint = load_checkpoint(cur, self.backfill_checkpoint_name)
+                except psycopg2.Error as e:
+                    self.logger.error(f"Database error while loading the backfill checkpoint: {e}")
+                    checkpoint = None
+                if checkpoint is not None:
+                    first_block = max(first_block, checkpoint + 1)
+                    self.logger.info(f"Resuming full rescrape after checkpoint block {checkpoint}")
+            self.open_backfill_window(
+                BlockWindow(first_block, last_block, self.settings.getint("BACKFILL_WINDOW_SIZE", 100))
+            )
+
+        self.crawler.stats.set_value("backfill/checkpoint", self.backfill.checkpoint)
+        yield from self.backfill_requests()
+
+    def open_backfill_window(self, window):
+        self.backfill = window
+        self.backfill_windows.append(window)
+
+    def claim_backfill_lease(self):
+        """Lease the next block range and open a window over it; False when every range is taken."""
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                lease = self.backfill_leases.claim(cur, self.backfill_last_block)
+                conn.commit()
         except psycopg2.Error as e:
-            self.logger.error(f"Database error in get_failed_urls: {e}")
-            return []
+            self.logger.error(f"Database error while leasing blocks: {e}")
+            lease = None
+
+        if lease is None:
+            self.logger.info("No block ranges left to lease.")
+            self.backfill = None
+            return False
+
+        range_start, range_end, checkpoint = lease
+        self.logger.info(f"Leased blocks {range_start}-{range_end} (done up to {checkpoint})")
+        self.crawler.stats.inc_value("backfill/leases_claimed")
+        self.open_backfill_window(BlockWindow(
+            checkpoint + 1, range_end, self.settings.getint("BACKFILL_WINDOW_SIZE", 100), lease=range_start
+        ))
+        return True
+
+    def backfill_requests(self):
+        """Fill the backfill window; once every block of a window is parsed, lease mode moves on to the next lease."""
+        while self.backfill is not None:
+            for block_number in self.backfill.take():
+                yield self.block_request(block_number, backfill=True)
+            self.crawler.stats.set_value("backfill/in_flight", len(self.backfill.in_flight))
+            if not self.backfill.finished:
+                return
+            if self.backfill.done and self.backfill in self.backfill_windows:
+                self.store_backfill_checkpoint(self.backfill)  # nothing left to wait for (e.g. an empty range)
+            if self.backfill_leases is None or not self.claim_backfill_lease():
+                return
 
-    def get_blocks_older_than_two_days_not_completed(self):
+    def backfill_refill(self, request_meta, given_up=False):
         """
-        Returns a list of (block_number, block_found_datetime, block_number_of_transactions)
-        for blocks older than 2 days with got_all_transactions = false.
+        Free a backfill block's slot in the window and yield the next block
+        requests. A block given up on (no block item reaches the pipelines)
+        counts towards the checkpoint right away, a parsed one once the
+        pipelines report its rows stored (backfill_blocks_stored).
         """
+        if not request_meta.get("backfill") or self.backfill is None:
+            return
+        self.backfill.complete(request_meta["block_number"])
+        if given_up:
+            self.backfill_blocks_stored([request_meta["block_number"]])
+        yield from self.backfill_requests()
+
+    def backfill_blocks_stored(self, block_numbers):
+        """blocks_stored handler: advance the window checkpoints and persist them now and then."""
+        every = self.settings.getint("BACKFILL_CHECKPOINT_EVERY", 100)
+        for window in list(self.backfill_windows):
+            for block_number in block_numbers:
+                window.stored(block_number)
+            if window.done or window.checkpoint - window.saved_checkpoint >= every:
+                self.store_backfill_checkpoint(window)
+        if self.backfill is not None:
+            self.crawler.stats.set_value("backfill/checkpoint", self.backfill.checkpoint)
+
+    def store_backfill_checkpoint(self, window):
+        """Save a window's checkpoint; a finished run clears it so the next block=all starts over."""
         try:
-            query = """
-            SELECT DISTINCT ON ("block_number") "block_number", "block_found_datetime", "block_number_of_transactions"
-            FROM public."qrl_blockchain_blocks"
-            WHERE 
-                (got_all_transactions = false OR got_all_transactions IS NULL)
-                AND EXTRACT(EPOCH FROM "block_found_datetime") < (EXTRACT(EPOCH FROM NOW()) - 2*24*3600)
-            ORDER BY "block_number" ASC
-            """
-            self.cur.execute(query)
-            return self.cur.fetchall()  # list of tuples
+            with db_cursor(blocking=False) as (conn, cur):
+                if window.lease is not None:
+                    self.backfill_leases.save(cur, window.lease, window.checkpoint, completed=window.done)
+                elif window.done:
+                    clear_checkpoint(cur, self.backfill_checkpoint_name)
+                else:
+                    save_checkpoint(cur, self.backfill_checkpoint_name, window.checkpoint)
+                conn.commit()
         except psycopg2.Error as e:
-            self.logger.error(f"Database error in get_blocks_older_than_two_days_not_completed: {e}")
-            return []
+            self.logger.error(f"Database error while saving the backfill checkpoint: {e}")
+            return
+        window.saved_checkpoint = window.checkpoint
+        if window.done and window in self.backfill_windows:
+            self.backfill_windows.remove(window)
+            if window.lease is not None:
+                self.logger.info(f"Finished leased blocks {window.lease}-{window.last}")
+            else:
+                self.logger.info(f"Full rescrape finished at block {window.last}")
 
-    def get_transaction_count_for_block(self, block_number):
+    def heartbeat_backfill_lease(self):
+        """Renew the leases of every window whose blocks are not all stored yet."""
+        leases = [window.lease for window in self.backfill_windows if window.lease is not None]
+        if not leases:
+            return
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                lost = [lease for lease in leases if not self.backfill_leases.heartbeat(cur, lease)]
+                conn.commit()
+        except psycopg2.Error as e:
+            self.logger.error(f"Database error while renewing the block lease: {e}")
+            return
+        for lease in lost:
+            self.logger.warning(f"Lease on blocks from {lease} was taken over by another worker.")
+
+    def closed(self, reason):
+        for loop in (self.backfill_heartbeat, self.follow_loop):
+            if loop is not None and loop.running:
+                loop.stop()
+        # Runs after the pipelines' final flush, so every committed block has been counted
+        for window in list(self.backfill_windows):
+            if window.lease is not None and not window.done:
+                # Hand the unfinished range back right away instead of waiting for the lease to expire
+                try:
+                    with db_cursor(blocking=False) as (conn, cur):
+                        self.backfill_leases.release(cur, window.lease, window.checkpoint)
+                        conn.commit()
+                except psycopg2.Error as e:
+                    self.logger.error(f"Database error while releasing the block lease: {e}")
+            elif window.done or window.checkpoint != window.saved_checkpoint:
+                self.store_backfill_checkpoint(window)
+
+    def poll_chain_tip(self):
         """
-        Returns the count of *unique* transactions found in qrl_blockchain_transactions
-        for the given block_number (deduplicated by transaction_hash).
+        LoopingCall: ask the node for its height (one poll in flight at a time)
+        and keep DB connections warm. Never raises: an exception would stop the
+        loop and leave the follower running without ingesting anything.
         """
         try:
-            query = """
-            SELECT COUNT(DISTINCT "transaction_hash")
-            FROM public."qrl_blockchain_transactions"
-            WHERE "transaction_block_number" = %s;
-            """
-            self.cur.execute(query, (block_number,))
-            result = self.cur.fetchone()
-            return result[0] if result else 0
+            self.keep_db_connections_warm()
+            if self.follow_poll_pending:
+                return
+            self.follow_poll_pending = True
+            for url in self.node_state_urls():
+                self.crawler.engine.crawl(scrapy.Request(
+                    url=url,
+                    callback=self.follow_tip,
+                    errback=self.follow_tip_failed,
+                    dont_filter=True,
+                    priority=10,
+                ))
+        except Exception as error:
+            self.follow_poll_pending = False
+            self.logger.error(f"Polling the chain tip failed: {error!r}")
+
+    def follow_tip(self, response):
+        """Schedule every block above the highest one scheduled so far and report the lag."""
+        self.follow_poll_pending = False
+        current_block_height = int(json.loads(response.body)["info"]["block_height"])
+        if self.follow_height is None:
+            try:
+                self.follow_height = self.get_highest_block_number()
+            except psycopg2.Error as e:
+                self.logger.error(f"Database error while reading the highest stored block: {e}")
+                return
+
+        if current_block_height > self.follow_height:
+            for block_number in range(self.follow_height + 1, current_block_height + 1):
+                self.logger.info(f"Following new block number: {block_number}")
+                yield self.block_request(block_number)
+            self.follow_height = current_block_height
+
+        self.report_follow_lag(current_block_height)
+
+    def follow_tip_failed(self, failure):
+        self.follow_poll_pending = False
+        self.logger.warning(f"Polling the chain tip failed: {failure.value!r}")
+
+    def report_follow_lag(self, current_block_height):
+        """Publish how far the parsed blocks trail the chain tip, in blocks and in seconds."""
+        stats = self.crawler.stats
+        stats.set_value("follow/tip_height", current_block_height)
+        if self.follow_ingested is None:
+            return
+        ingested_block, ingested_timestamp = self.follow_ingested
+        lag_blocks = current_block_height - ingested_block
+        lag_seconds = max(0, int(datetime.now(timezone.utc).timestamp()) - ingested_timestamp)
+        stats.set_value("follow/ingested_height", ingested_block)
+        stats.set_value("follow/lag_blocks", lag_blocks)
+        stats.set_value("follow/lag_seconds", lag_seconds)
+        self.logger.info(f"⛓️ Tip {current_block_height}, ingested {ingested_block}: {lag_blocks} blocks / {lag_seconds}s behind")
+
+    def track_follow_progress(self, item_block):
+        if not self.follow:
+            return
+        block_number = int(item_block["block_number"])
+        if self.follow_ingested is None or block_number > self.follow_ingested[0]:
+            self.follow_ingested = (block_number, int(item_block["block_found_timestamp_seconds"]))
+
+    def keep_db_connections_warm(self):
+        """Touch a pooled connection so it does not go cold between blocks (a broken one is replaced on checkout)."""
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                cur.execute("SELECT 1")
         except psycopg2.Error as e:
-            self.logger.error(f"Database error in get_transaction_count_for_block: {e}")
-            return 0
+            self.logger.error(f"Database error while keeping connections warm: {e}")
 
+    def get_due_retries(self, kinds):
+        """Stream (url, kind, attempts) of retry queue entries that are due, blocks first."""
+        query, params = RetryQueue.from_settings(self.settings).due_query(kinds)
+        yield from self.stream_query("due_retries", query, params)
 
+    def get_missing_block_ranges(self, fetch_size=1000):
+        """
+        Yields (gap_start, gap_end) for every run of block numbers missing from
+        qrl_blockchain_blocks below the highest stored block, including a gap
+        before the lowest one. Computed in Postgres with LEAD() and streamed
+        through a server-side cursor, so only the ranges reach Python.
+        """
+        query = """
+        SELECT gap_start, gap_end
+        FROM (
+            SELECT 0 AS gap_start, MIN("block_number") - 1 AS gap_end
+            FROM public."qrl_blockchain_blocks"
+            UNION ALL
+            SELECT "block_number" + 1, next_block_number - 1
+            FROM (
+                SELECT "block_number", LEAD("block_number") OVER (ORDER BY "block_number") AS next_block_number
+                FROM public."qrl_blockchain_blocks"
+            ) AS ordered_blocks
+            WHERE next_block_number > "block_number" + 1
+        ) AS gaps
+        WHERE gap_start <= gap_end
+        ORDER BY gap_start
+        """
+        yield from self.stream_query("missing_block_ranges", query, fetch_size=fetch_size)
 
-    def mark_block_as_completed(self, block_number):
+    def mark_complete_blocks_older_than_two_days(self):
         """
-        Sets got_all_transactions = true for the given block_number.
+        Sets got_all_transactions = true for every block older than 2 days whose
+        number of unique transactions in qrl_blockchain_transactions equals
+        block_number_of_transactions. Returns the number of blocks marked.
         """
         try:
             query = """
-            UPDATE public."qrl_blockchain_blocks"
+            WITH incomplete AS (
+                SELECT "block_number", "block_number_of_transactions"
+                FROM public."qrl_blockchain_blocks"
+                WHERE
+                    (got_all_transactions = false OR got_all_transactions IS NULL)
+                    AND "block_found_datetime" < NOW() - INTERVAL '2 days'
+            ),
+            actual AS (
+                SELECT transactions."transaction_block_number", COUNT(DISTINCT transactions."transaction_hash") AS tx_count
+                FROM public."qrl_blockchain_transactions" AS transactions
+                JOIN incomplete ON incomplete."block_number" = transactions."transaction_block_number"
+                GROUP BY transactions."transaction_block_number"
+            )
+            UPDATE public."qrl_blockchain_blocks" AS blocks
             SET got_all_transactions = true
-            WHERE "block_number" = %s
+            FROM incomplete
+            LEFT JOIN actual ON actual."transaction_block_number" = incomplete."block_number"
+            WHERE blocks."block_number" = incomplete."block_number"
+              AND COALESCE(actual.tx_count, 0) = incomplete."block_number_of_transactions"
             """
-            self.cur.execute(query, (block_number,))
-            self.connection.commit()
-            self.logger.info(f"Block {block_number} marked got_all_transactions = true.")
+            with db_cursor(blocking=False) as (conn, cur):
+                cur.execute(query)
+                completed = cur.rowcount
+                conn.commit()
+            return completed
         except psycopg2.Error as e:
-            self.connection.rollback()
-            self.logger.error(f"Database error while marking block {block_number} as complete: {e}")
+            self.logger.error(f"Database error in mark_complete_blocks_older_than_two_days: {e}")
+            return 0
 
-    def remove_error(self, url):
-        """Remove a processed error from the database (applicable for retry=transactions)."""
-        try:
-            self.cur.execute(
-                'DELETE FROM public."qrl_blockchain_missed_items" WHERE item_url = %s',
-                [url],
+    def get_blocks_older_than_two_days_not_completed(self):
+        """
+        Yields (block_number, block_number_of_transactions) for blocks older than
+        2 days with got_all_transactions = false, streamed in block order.
+        """
+        query = """
+        SELECT "block_number", "block_number_of_transactions"
+        FROM public."qrl_blockchain_blocks"
+        WHERE
+            (got_all_transactions = false OR got_all_transactions IS NULL)
+            AND "block_found_datetime" < NOW() - INTERVAL '2 days'
+        ORDER BY "block_number" ASC
+        """
+        yield from self.stream_query("blocks_not_completed", query)
+
+    def get_chain_breaks(self):
+        """
+        Yields (block_number, block_hash_header_data_prev, stored hash of
+        block_number - 1) for every block whose prev hash does not match the
+        block stored below it. One ordered pass with LAG(); links across
+        gaps are left to the gap detection of normal mode.
+        """
+        query = """
+        SELECT "block_number", expected_prev_hash, stored_prev_hash
+        FROM (
+            SELECT
+                "block_number",
+                "block_hash_header_data_prev" AS expected_prev_hash,
+                LAG("block_number") OVER chain AS previous_block_number,
+                LAG("block_hash_header_data") OVER chain AS stored_prev_hash
+            FROM public."qrl_blockchain_blocks"
+            WINDOW chain AS (ORDER BY "block_number")
+        ) AS links
+        WHERE previous_block_number = "block_number" - 1
+          AND expected_prev_hash IS DISTINCT FROM stored_prev_hash
+        ORDER BY "block_number"
+        """
+        yield from self.stream_query("chain_breaks", query)
+
+    def repair_chain(self):
+        """
+        Report broken prev-hash links and re-ingest only the block ranges
+        around them (CHAIN_REPAIR_DEPTH blocks below each break). Blocks
+        whose hash changed are replaced by the block pipeline, together with
+        the transactions of the orphaned block.
+        """
+        broken_blocks = []
+        for block_number, expected_prev_hash, stored_prev_hash in self.get_chain_breaks():
+            self.logger.warning(
+                f"🔗 Broken link at block {block_number}: prev hash {(expected_prev_hash or '')[:16]}… "
+                f"but block {block_number - 1} is stored as {(stored_prev_hash or '')[:16]}… (orphaned or reorged)"
             )
-            self.connection.commit()
-            self.logger.info(f"Removed error for URL: {url}")
+            broken_blocks.append(block_number)
+        ranges = list(chain_repair_ranges(broken_blocks, self.settings.getint("CHAIN_REPAIR_DEPTH", 1)))
+        block_count = sum(end - start + 1 for start, end in ranges)
+
+        stats = self.crawler.stats
+        stats.set_value("chain_verify/broken_links", len(broken_blocks))
+        stats.set_value("chain_verify/ranges", len(ranges))
+        stats.set_value("chain_verify/blocks", block_count)
+        self.logger.info(
+            f"Chain verification: {len(broken_blocks)} broken links in {len(ranges)} ranges, "
+            f"{block_count} blocks to re-ingest"
+        )
+        for start, end in ranges:
+            self.logger.info(f"Broken range: blocks {start}-{end}")
+        if str(getattr(self, "repair", "true")).lower() in ("false", "0", "no"):
+            return
+
+        for start, end in ranges:
+            self.reset_wallet_refreshes(start, end)
+            for block_number in range(start, end + 1):
+                # cache_refresh: a cached response may be the orphaned block
+                yield self.block_request(block_number, retry_mode=self.retry, cache_refresh=True)
+
+    def reset_wallet_refreshes(self, start, end):
+        """Lower the refresh height of wallets touched in [start, end], so the re-ingested blocks fetch them again."""
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                cur.execute(
+                    f"""
+                    UPDATE {WalletRefreshIndex.table} AS refresh
+                    SET "last_refreshed_block_height" = %(start)s - 1
+                    WHERE refresh."last_refreshed_block_height" >= %(start)s
+                      AND refresh."wallet_address" IN (
+                          SELECT "transaction_sending_wallet_address" FROM public."qrl_blockchain_transactions"
+                          WHERE "transaction_block_number" BETWEEN %(start)s AND %(end)s
+                          UNION
+                          SELECT "transaction_receiving_wallet_address" FROM public."qrl_blockchain_transactions"
+                          WHERE "transaction_block_number" BETWEEN %(start)s AND %(end)s
+                      )
+                    """,
+                    {"start": start, "end": end},
+                )
+                conn.commit()
+        except psycopg2.Error as e:
+            self.logger.error(f"Database error while resetting wallet refreshes: {e}")
+
+    def stream_query(self, name, query, params=None, fetch_size=1000):
+        """
+        Yield the rows of a query through a server-side cursor, fetch_size rows
+        per round-trip. The pooled connection is held until the rows are
+        consumed (or the generator is discarded).
+        """
+        try:
+            with db_cursor(blocking=False) as (conn, _):
+                with conn.cursor(name=name) as cursor:
+                    cursor.itersize = fetch_size
+                    cursor.execute(query, params)
+                    yield from cursor
         except psycopg2.Error as e:
-            self.logger.error(f"Database error in remove_error: {e}")
-            self.connection.rollback()
+            self.logger.error(f"Database error in {name}: {e}")
+
+    def complete_retry(self, response):
+        """Remove a retried URL from the retry queue once its response was processed."""
+        if not response.meta.get("retry_queue"):
+            return
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                RetryQueue.from_settings(self.settings).complete(cur, response.url)
+                conn.commit()
+            self.logger.info(f"Retry succeeded, removed from queue: {response.url}")
+        except psycopg2.Error as e:
+            self.logger.error(f"Database error in complete_retry: {e}")
 
     # -------------------------------------------------------------------------
     #                           SPIDER PARSE METHODS
@@ -275,17 +718,19 @@ class QRLNetworkSpider(scrapy.Spider):
         Normal mode entry point: get the current block height and
         see which blocks need to be scraped (including finding gaps).
         """
+        yield from self.resume_unfinished_blocks()
         try:
             json_response = json.loads(response.body)
             current_block_height = int(json_response["info"]["block_height"])
 
-            # Fetch the highest block number from the DB
-            self.cur.execute('SELECT MAX("block_number") FROM public."qrl_blockchain_blocks"')
-            highest_block_in_db = self.cur.fetchall()[0][0] or 0
+            with db_cursor(blocking=False) as (conn, cur):
+                # Fetch the highest block number from the DB
+                cur.execute('SELECT MAX("block_number") FROM public."qrl_blockchain_blocks"')
+                highest_block_in_db = cur.fetchall()[0][0] or 0
 
-            # Count how many rows are in the DB
-            self.cur.execute('SELECT COUNT(*) FROM public."qrl_blockchain_blocks"')
-            total_rows_in_db = self.cur.fetchall()[0][0] or 0 
+                # Count how many rows are in the DB
+                cur.execute('SELECT COUNT(*) FROM public."qrl_blockchain_blocks"')
+                total_rows_in_db = cur.fetchall()[0][0] or 0
 
             self.logger.info(
                 f"Current block height: {current_block_height}, "
@@ -295,44 +740,73 @@ class QRLNetworkSpider(scrapy.Spider):
             # Check for large gap or any gap
             if highest_block_in_db - total_rows_in_db > 10:
                 self.logger.info("Significant discrepancy found, checking for gaps...")
-                self.cur.execute('SELECT "block_number" FROM public."qrl_blockchain_blocks" ORDER BY "block_number" ASC')
-                existing_blocks = set(row[0] for row in self.cur.fetchall())
-
-                # Generate the expected range and identify missing blocks
-                expected_blocks = set(range(0, highest_block_in_db + 1))
-                missing_blocks = sorted(expected_blocks - existing_blocks)
-                self.logger.info(f"Gaps identified: {missing_blocks}")
-
-                # Scrape missing blocks
-                for block_number in missing_blocks:
-                    self.logger.info(f"Fetching missing block number: {block_number}")
-                    yield scrapy.Request(
-                        url=f"{scrap_url}/api/block/{block_number}",
-                        callback=self.parse_block,
-                        errback=self.errback_conn,
-                        meta={"block_number": block_number},
-                    )
+                # Gaps are found in Postgres and streamed back as ranges; requests are expanded lazily
+                for gap_start, gap_end in self.get_missing_block_ranges():
+                    self.logger.info(f"Gap identified: blocks {gap_start}-{gap_end}")
+                    for block_number in range(gap_start, gap_end + 1):
+                        self.logger.info(f"Fetching missing block number: {block_number}")
+                        yield self.block_request(block_number)
 
             # Scrape from highest_block_in_db+1 up to current_block_height
             for block_number in range(highest_block_in_db + 1, current_block_height + 1):
                 self.logger.info(f"Fetching block number: {block_number}")
-                yield scrapy.Request(
-                    url=f"{scrap_url}/api/block/{block_number}",
-                    callback=self.parse_block,
-                    errback=self.errback_conn,
-                    meta={"block_number": block_number},
-                )
+                yield self.block_request(block_number)
+            self.follow_height = max(current_block_height, highest_block_in_db)
 
         except Exception as error:
             self.logger.error(f"Error in parse: {error}")
             yield self.handle_error(response, error)
 
+    def resume_unfinished_blocks(self):
+        """
+        Continue blocks a previous run left half-ingested: request only the
+        transactions that were never stored and the wallets that were never
+        refreshed, according to qrl_block_ingestion_state. Blocks touched in
+        the last INGESTION_RESUME_GRACE seconds are left to whoever is
+        ingesting them.
+        """
+        ingestion_state = BlockIngestionState()
+        grace = self.settings.getint("INGESTION_RESUME_GRACE", 600)
+        try:
+            with db_cursor(blocking=False) as (conn, cur):
+                completed = ingestion_state.advance(cur)
+                conn.commit()
+        except psycopg2.Error as e:
+            self.logger.error(f"Database error while advancing the ingestion state: {e}")
+            return
+        if completed:
+            self.logger.info(f"Completed {completed} blocks from their stored ingestion state")
+
+        for block_number, tx_hash in self.stream_query(
+            "resume_transactions", *ingestion_state.missing_transactions_query(grace)
+        ):
+            self.logger.info(f"Resuming block {block_number}: fetching missing transaction {tx_hash}")
+            yield scrapy.Request(
+                url=self.transaction_url(tx_hash),
+                callback=self.parse_transaction,
+                errback=self.errback_conn,
+            )
+
+        # A wallet only needs one refresh, at the highest block still waiting for it
+        wallet_heights = {}
+        for block_number, wallet in self.stream_query(
+            "resume_wallets", *ingestion_state.stale_wallets_query(grace)
+        ):
+            wallet_heights[wallet] = max(block_number, wallet_heights.get(wallet, block_number))
+        wallets_by_height = {}
+        for wallet, block_height in wallet_heights.items():
+            wallets_by_height.setdefault(block_height, []).append(wallet)
+        for block_height, wallets in sorted(wallets_by_height.items()):
+            self.logger.info(f"Resuming blocks up to {block_height}: refreshing {len(wallets)} wallets")
+            self.refresh_wallets(wallets, block_height)
+
     def parse_block(self, response):
         item_block = QRLNetworkBlockItem()
-        json_response = json.loads(response.body)
         item_block["item_url"] = response.url
+        block_yielded = False
 
         try:
+            json_response = load_explorer_json(response.body)
             item_block["spider_name"] = self.name
             item_block["spider_version"] = self.version
 
@@ -382,24 +856,50 @@ class QRLNetworkSpider(scrapy.Spider):
             item_block["block_extra_nonce"] = block_extended_header["extra_nonce"]
 
             item_block["block_number_of_transactions"] = len(block_extended["extended_transactions"])
+            item_block["block_transaction_hashes"] = [
+                list_integer_to_hex(transaction["tx"]["transaction_hash"]["data"])
+                for transaction in block_extended["extended_transactions"]
+            ]
 
             if item_block["block_found"] == True:
                 yield QRLNetworkBlockItem(item_block)
+                block_yielded = True
+                self.track_follow_progress(item_block)
 
+                block_wallets = []
                 for transaction in block_extended["extended_transactions"]:
                     transaction_tx = transaction["tx"]
                     transaction_tx_transaction_hash = transaction_tx["transaction_hash"]
                     tx_hash = list_integer_to_hex(transaction_tx_transaction_hash["data"])
 
                     # create api url
-                    transaction_api_url = f"{scrap_url}/api/tx/{tx_hash}"
-
+                    transaction_api_url = self.transaction_url(tx_hash)
+
+                    if self.tx_source == "block" and is_complete_embedded_transaction(transaction):
+                        try:
+                            outputs = list(self.transaction_outputs(
+                                embedded_transaction_response(json_response, block_extended_header, transaction),
+                                transaction_api_url,
+                                fee_in_shor=True,
+                            ))
+                        except Exception as error:
+                            self.logger.warning(f"Could not decode embedded transaction {tx_hash}, using /api/tx: {error}")
+                        else:
+                            for item_transaction in outputs:
+                                block_wallets += item_transaction["transaction_wallets"]
+                            yield from outputs
+                            continue
+
+                    # Embedded data incomplete (or tx_source=api): fall back to the per-transaction endpoint
                     yield scrapy.Request(
                         url=transaction_api_url,
                         callback=self.parse_transaction,
                         errback=self.errback_conn,
                         meta={"item_block": item_block},
                     )
+
+                self.refresh_wallets(block_wallets, int(item_block["block_number"]))
+                self.complete_retry(response)
             else:
                 self.logger.info("Block Not Found Yet By The BlockChain.")
                 pass
@@ -408,14 +908,14 @@ class QRLNetworkSpider(scrapy.Spider):
             self.logger.error(f"Error in parse_block: {error}")
             yield self.handle_error(response, error)
 
-    def parse_transaction(self, response):
-        item_transaction = QRLNetworkTransactionItem()
+        yield from self.backfill_refill(response.meta, given_up=not block_yielded)
 
+    def parse_transaction(self, response):
         try:
             # Ensure response.body is a valid JSON object
             json_response = response.body
             if isinstance(response.body, (str, bytes)):
-                json_response = json.loads(response.body)
+                json_response = load_explorer_json(response.body)
 
             if not isinstance(json_response, dict):
                 self.logger.error(f"Invalid JSON format: {type(json_response)} - {json_response}")
@@ -424,298 +924,86 @@ class QRLNetworkSpider(scrapy.Spider):
             self.logger.error(f"JSON parsing error in parse_transaction: {e}")
             return None
 
-        item_transaction["item_url"] = response.url
-
         try:
-            # Validate transaction field
-            transaction = json_response.get("transaction", {})
-            if not isinstance(transaction, dict):
-                self.logger.error(f"Unexpected format for transaction: {type(transaction)} - {transaction}")
-                return None
-
-            item_transaction["spider_name"] = self.name
-            item_transaction["spider_version"] = self.version
-
-            item_transaction["transaction_result"] = json_response.get("result", "Unknown")
-            item_transaction["transaction_found"] = json_response.get("found", False)
-
-            # Validate transaction_header
-            transaction_header = transaction.get("header", {})
-            if not isinstance(transaction_header, dict):
-                self.logger.error(f"Unexpected format for transaction_header: {type(transaction_header)} - {transaction_header}")
-                return None
-
-            try:
-                block_number = int(transaction_header.get("block_number", 0))
-                block_found_datetime = int(transaction_header.get("timestamp_seconds", 0))
-            except (TypeError, ValueError) as e:
-                self.logger.error(f"Invalid data in transaction_header: {e}")
-                return None
-
-            item_transaction["transaction_block_number"] = block_number
-            item_transaction["block_found_datetime"] = block_found_datetime
-            item_transaction["block_found_timestamp_seconds"] = block_found_datetime
-
-            # Validate transaction_tx
-            transaction_tx = transaction.get("tx", {})
-            if not isinstance(transaction_tx, dict):
-                self.logger.error(f"Unexpected format for transaction_tx: {type(transaction_tx)} - {transaction_tx}")
-                return None
-
-            item_transaction["transaction_type"] = transaction_tx.get("transactionType", "Unknown")
-            item_transaction["transaction_nonce"] = int(transaction_tx.get("nonce", 0))
-
-            # Validate master_addr
-            master_addr = transaction_tx.get("master_addr", {})
-            if not isinstance(master_addr, dict):
-                self.logger.error(f"Unexpected format for master_addr: {type(master_addr)} - {master_addr}")
-                master_addr = {}
-
-            item_transaction["master_addr_type"] = master_addr.get("type", "Unknown")
-            master_addr_data = master_addr.get("data", [])
-            if isinstance(master_addr_data, list):
-                item_transaction["master_addr_data"] = list_integer_to_hex(master_addr_data)
-            else:
-                self.logger.error(f"Invalid data format for master_addr['data']: {type(master_addr_data)}")
-                item_transaction["master_addr_data"] = None
-
-            # Extract master_addr_fee from the transaction
-            # For coinbase transactions, fee is typically 0
-            # For other transactions, fee might be in the transaction data
-            if item_transaction["transaction_type"] == "coinbase":
-                item_transaction["master_addr_fee"] = 0
-            else:
-                # Try to get fee from transaction data, default to 0 if not found
-                fee_value = transaction_tx.get("fee", 0)
-                
-                # Convert fee to numeric value if it's a string
-                if isinstance(fee_value, str):
-                    try:
-                        # Convert string fee to float, then to integer (assuming fee is in QRL units)
-                        # Example: "0.0005" -> 0.0005 -> 500 (if fee is in QRL units)
-                        fee_float = float(fee_value)
-                        # Convert to smallest unit (assuming 1 QRL = 1,000,000,000 units)
-                        item_transaction["master_addr_fee"] = int(fee_float * 1000000000)
-                    except (ValueError, TypeError):
-                        self.logger.warning(f"Could not convert fee '{fee_value}' to numeric value, using 0")
-                        item_transaction["master_addr_fee"] = 0
-                else:
-                    # If fee is already numeric, use it directly
-                    item_transaction["master_addr_fee"] = fee_value
-            
-            # Log the master_addr_fee for debugging
-            #self.logger.info(f"✅ Extracted master_addr_fee: {item_transaction['master_addr_fee']} for transaction type: {item_transaction['transaction_type']} (original fee: {transaction_tx.get('fee', 'N/A')})")
-
-            # Validate transaction hash
-            transaction_hash = transaction_tx.get("transaction_hash", {})
-            if isinstance(transaction_hash, str):
-                item_transaction["transaction_hash"] = transaction_hash
-            elif isinstance(transaction_hash, dict) and "data" in transaction_hash:
-                item_transaction["transaction_hash"] = list_integer_to_hex(transaction_hash["data"])
-            else:
-                self.logger.error(f"Unexpected format for transaction_hash: {type(transaction_hash)} - {transaction_hash}")
-                item_transaction["transaction_hash"] = None
-
-            # Validate public_key
-            public_key = transaction_tx.get("public_key", {})
-            if isinstance(public_key, str):
-                item_transaction["public_key_data"] = public_key
-                item_transaction["public_key_type"] = "String"
-            elif isinstance(public_key, dict):
-                item_transaction["public_key_type"] = public_key.get("type", "Unknown")
-                if isinstance(public_key.get("data"), list):
-                    item_transaction["public_key_data"] = list_integer_to_hex(public_key["data"])
-                else:
-                    self.logger.error(f"Invalid public_key['data']: {type(public_key.get('data'))}")
-                    item_transaction["public_key_data"] = None
-            else:
-                self.logger.error(f"Unexpected format for public_key: {type(public_key)} - {public_key}")
-                item_transaction["public_key_data"] = None
-
-            # Validate signature
-            signature = transaction_tx.get("signature", {})
-            if isinstance(signature, str):
-                item_transaction["signature_type"] = "String"
-                item_transaction["signature_data"] = signature
-            elif isinstance(signature, dict):
-                item_transaction["signature_type"] = signature.get("type", "Unknown")
-            else:
-                self.logger.error(f"Unexpected format for signature: {type(signature)} - {signature}")
-                item_transaction["signature_type"] = None
-
-            # ---------------------------
-            # Handle Different Transaction Types
-            # ---------------------------
-            if item_transaction["transaction_type"] == "transfer":
-                transaction_tx_transfer = transaction_tx.get("transfer", {})
-                amounts_list = transaction_tx_transfer.get("amounts", [])
-                transfer_list = []
-                transfer_type_list = []
-
-                for single_transfer in transaction_tx_transfer.get("addrs_to", []):
-                    if isinstance(single_transfer, dict) and "data" in single_transfer:
-                        transfer_list.append(list_integer_to_hex(single_transfer["data"]))
-                        transfer_type_list.append(single_transfer.get("type", "Unknown"))
-
-                transfer_address_amount_combined = list(zip(transfer_list, amounts_list, transfer_type_list))
-
-                # For each recipient, create a new transaction item and yield wallet requests immediately.
-                for address_with_amount in transfer_address_amount_combined:
-                    local_item = item_transaction.copy()
-                    sending_data = transaction.get("addr_from", {}).get("data", [])
-                    local_item["transaction_sending_wallet_address"] = "Q" + list_integer_to_hex(sending_data)
-                    local_item["transaction_receiving_wallet_address"] = "Q" + address_with_amount[0]
-                    local_item["transaction_amount_send"] = address_with_amount[1]
-                    local_item["transaction_addrs_to_type"] = address_with_amount[2]
-
-                    yield QRLNetworkTransactionItem(local_item)
-                    self.logger.info(f"🔄 Yielding transaction item: {local_item['transaction_hash'][:20]}... | Type: {local_item['transaction_type']} | Amount: {local_item['transaction_amount_send']}")
-
-                    # Schedule wallet requests for both sending and receiving addresses,
-                    # but skip the null wallet address.
-                    for wallet in [local_item["transaction_receiving_wallet_address"],
-                                local_item["transaction_sending_wallet_address"]]:
-                        if wallet and wallet not in self.requested_wallets and wallet != "Q0000000000000000000000000000000000000000000000000000000000000000":
-                            self.requested_wallets.add(wallet)
-                            self.logger.info(f"Fetching wallet address details: {wallet}")
-                            yield scrapy.Request(
-                                url=f"{scrap_url}/api/a/{wallet}",
-                                callback=self.parse_address, 
-                                errback=self.errback_conn,
-                                meta={"item_transaction": local_item},
-                            )
-
-            elif item_transaction["transaction_type"] == "coinbase":
-                transaction_tx_coinbase = transaction_tx.get("coinbase", {})
-                coinbase_transfer = transaction_tx_coinbase.get("addr_to", {})
-
-                local_item = item_transaction.copy()
-                sending_data = transaction.get("addr_from", {}).get("data", [])
-                local_item["transaction_sending_wallet_address"] = "Q" + list_integer_to_hex(sending_data)
-                local_item["transaction_receiving_wallet_address"] = "Q" + list_integer_to_hex(coinbase_transfer.get("data", []))
-                local_item["transaction_amount_send"] = transaction_tx_coinbase.get("amount", "0")
-                local_item["transaction_addrs_to_type"] = coinbase_transfer.get("type", "Unknown")
-
-                yield QRLNetworkTransactionItem(local_item)
-
-                for wallet in [local_item["transaction_receiving_wallet_address"],
-                            local_item["transaction_sending_wallet_address"]]:
-                    if wallet and wallet not in self.requested_wallets and wallet != "Q0000000000000000000000000000000000000000000000000000000000000000":
-                        self.requested_wallets.add(wallet)
-                        self.logger.info(f"Fetching wallet address details: {wallet}")
-                        yield scrapy.Request(
-                            url=f"{scrap_url}/api/a/{wallet}",
-                            callback=self.parse_address,
-                            errback=self.errback_conn,
-                            meta={"item_transaction": local_item},
-                        )
-
-            elif item_transaction["transaction_type"] == "slave":
-                transaction_tx_slave = transaction_tx.get("slave", {})
-                master_data = transaction.get("addr_from", {}).get("data", [])
-                if isinstance(master_data, list) and len(master_data) == 32:
-                    master_address = "Q" + list_integer_to_hex(master_data)
-                else:
-                    master_address = ""
-                for slave_pk in transaction_tx_slave.get("slave_pks", []):
-                    local_item = item_transaction.copy()
-                    if isinstance(slave_pk, dict):
-                        slave_data = slave_pk.get("data", [])
-                    elif isinstance(slave_pk, list):
-                        slave_data = slave_pk
-                    elif isinstance(slave_pk, str):
-                        slave_address = slave_pk
-                        local_item["transaction_sending_wallet_address"] = master_address
-                        local_item["transaction_receiving_wallet_address"] = slave_address
-                        local_item["transaction_amount_send"] = 0
-                        local_item["transaction_addrs_to_type"] = ""
-                        yield QRLNetworkTransactionItem(local_item.copy())
-                        continue
-                    else:
-                        slave_data = []
-                    if isinstance(slave_data, list) and len(slave_data) == 32:
-                        slave_address = "Q" + list_integer_to_hex(slave_data)
-                    else:
-                        slave_address = ""
-                    local_item["transaction_sending_wallet_address"] = master_address
-                    local_item["transaction_receiving_wallet_address"] = slave_address
-                    local_item["transaction_amount_send"] = 0
-                    local_item["transaction_addrs_to_type"] = ""
-                    yield QRLNetworkTransactionItem(local_item.copy())
-
-                    for wallet in [master_address, slave_address]:
-                        if wallet and wallet not in self.requested_wallets and wallet != "Q0000000000000000000000000000000000000000000000000000000000000000":
-                            self.requested_wallets.add(wallet)
-                            self.logger.info(f"Fetching wallet address details: {wallet}")
-                            yield scrapy.Request(
-                                url=f"{scrap_url}/api/a/{wallet}",
-                                callback=self.parse_address,
-                                errback=self.errback_conn,
-                                meta={"item_transaction": local_item},
-                            )
-
-            elif item_transaction["transaction_type"] == "token":
-                token_data = transaction_tx.get("token", {})
-                initial_balances = token_data.get("initialBalances") or token_data.get("initial_balances", [])
-                receiving_addresses = []
-                for balance_entry in initial_balances:
-                    if isinstance(balance_entry, dict):
-                        address_field = balance_entry.get("address")
-                        if isinstance(address_field, dict):
-                            data = address_field.get("data", [])
-                            if data:
-                                receiving_addresses.append("Q" + list_integer_to_hex(data))
-                        elif isinstance(address_field, str):
-                            receiving_addresses.append(address_field)
-                local_item = item_transaction.copy()
-                local_item["transaction_receiving_wallet_address"] = (
-                    ", ".join(receiving_addresses) if receiving_addresses else "UNKNOWN"
-                )
-                local_item["initial_balance_address"] = (receiving_addresses[0] if receiving_addresses else "UNKNOWN")
-                local_item["initial_balance"] = (initial_balances[0].get("amount", "0")
-                                                if initial_balances and isinstance(initial_balances[0], dict)
-                                                else "0")
-                token_symbol = token_data.get("symbol")
-                if isinstance(token_symbol, dict):
-                    token_symbol = list_integer_to_string(token_symbol.get("data", []))
-                local_item["token_symbol"] = token_symbol or "UNKNOWN"
-                token_name = token_data.get("name")
-                if isinstance(token_name, dict):
-                    token_name = list_integer_to_string(token_name.get("data", []))
-                local_item["token_name"] = token_name or "UNKNOWN"
-                token_owner = token_data.get("owner", {})
-                if isinstance(token_owner, dict):
-                    owner_data = token_owner.get("data", [])
-                    local_item["token_owner"] = "Q" + list_integer_to_hex(owner_data) if owner_data else "UNKNOWN"
-                elif isinstance(token_owner, str):
-                    local_item["token_owner"] = token_owner
-                else:
-                    local_item["token_owner"] = "UNKNOWN"
-                try:
-                    local_item["token_decimals"] = int(token_data.get("decimals", 0))
-                except (TypeError, ValueError):
-                    local_item["token_decimals"] = 0
-
-                yield QRLNetworkTransactionItem(local_item)
-
-                for wallet in [local_item.get("transaction_receiving_wallet_address"),
-                            local_item.get("transaction_sending_wallet_address")]:
-                    if wallet and wallet not in self.requested_wallets and wallet != "Q0000000000000000000000000000000000000000000000000000000000000000":
-                        self.requested_wallets.add(wallet)
-                        self.logger.info(f"Fetching wallet address details: {wallet}")
-                        yield scrapy.Request(
-                            url=f"{scrap_url}/api/a/{wallet}",
-                            callback=self.parse_address,
-                            errback=self.errback_conn,
-                            meta={"item_transaction": local_item},
-                        )
-
-            # Note: We have scheduled wallet requests immediately in each branch,
-            # so the final loop (which fetched both addresses) is now removed.
+            transaction_wallets = []
+            for item_transaction in self.transaction_outputs(json_response, response.url):
+                transaction_wallets += item_transaction["transaction_wallets"]
+                yield item_transaction
+            if transaction_wallets:
+                self.refresh_wallets(transaction_wallets, int(item_transaction["transaction_block_number"]))
+            self.complete_retry(response)
         except Exception as error:
             self.logger.error(f"Error in parse_transaction: {error}")
             yield self.handle_error(response, error)
 
+    def transaction_outputs(self, json_response, item_url, fee_in_shor=False):
+        """Yield the transaction items of one transaction payload, with the wallets they touch in transaction_wallets."""
+        for item_transaction, wallets in decode_transaction(
+            json_response, item_url, self.name, self.version, self.logger, fee_in_shor=fee_in_shor
+        ):
+            item_transaction["transaction_wallets"] = [
+                wallet for wallet in wallets if wallet and wallet != NULL_WALLET_ADDRESS
+            ]
+            yield item_transaction
+
+    def refresh_wallets(self, wallets, block_height):
+        """
+        Request the touched wallets that are not refreshed for this block
+        height or a newer one yet. Wallets in the WalletRefreshIndex LRU are
+        decided right away; the others are looked up in one query in the DB
+        thread pool, and their requests are scheduled when it returns, so the
+        reactor never waits for the database.
+        """
+        wallet_refresh = self.get_wallet_refresh()
+        unknown = wallet_refresh.unknown(wallets)
+        if not unknown:
+            self.crawl_wallets(wallet_refresh.due(wallets, block_height), block_height)
+            return
+
+        def looked_up(refreshed):
+            self.crawl_wallets(wallet_refresh.due(wallets, block_height, refreshed), block_height)
+
+        def lookup_failed(failure):
+            self.logger.error(f"Database error while checking wallet refreshes: {failure.value}")
+            return {}  # fetch the wallets the LRU does not know
+
+        def finished(result):
+            self.wallet_lookups_pending -= 1
+            return result
+
+        self.wallet_lookups_pending += 1
+        lookup = run_in_db_thread(self.lookup_wallet_refreshes, unknown)
+        lookup.addErrback(lookup_failed).addCallback(looked_up).addBoth(finished).addErrback(
+            lambda failure: self.logger.error(f"Scheduling wallet requests failed: {failure.value!r}")
+        )
+
+    def lookup_wallet_refreshes(self, wallets):
+        """DB thread: {wallet: last refreshed block height} (WalletRefreshIndex.lookup)."""
+        with db_cursor() as (conn, cur):
+            refreshed = WalletRefreshIndex.lookup(cur, wallets)
+            conn.commit()
+        return refreshed
+
+    def crawl_wallets(self, wallets, block_height):
+        for request in self.wallet_requests(wallets, block_height):
+            self.crawler.engine.crawl(request)
+
+    def wallet_requests(self, wallets, block_height):
+        """Wallet requests for wallets WalletRefreshIndex.due() found due at `block_height`."""
+        for wallet in wallets:
+            self.logger.info(f"Fetching wallet address details: {wallet}")
+            yield scrapy.Request(
+                url=self.wallet_url(wallet),
+                callback=self.parse_address,
+                errback=self.errback_conn,
+                meta={"refresh_block_height": block_height},
+                dont_filter=True,  # a wallet is fetched again for every newer block that touches it
+            )
+
+    def get_wallet_refresh(self):
+        if self.wallet_refresh is None:
+            self.wallet_refresh = WalletRefreshIndex(self.settings.getint("WALLET_REFRESH_CACHE_SIZE", 100000))
+        return self.wallet_refresh
 
     def parse_address(self, response):
         try:    
@@ -725,6 +1013,9 @@ class QRLNetworkSpider(scrapy.Spider):
                 self.logger.error(f"Error decoding JSON for {response.url}: {e}")
                 return
 
+            # Every branch below stores an item for the wallet, so the fetch itself succeeded
+            self.complete_retry(response)
+
             # Initialize the address item using the wallet address extracted from the URL.
             wallet_address = response.url.split("/")[-1]
             item_address = QRLNetworkAddressItem()
@@ -732,6 +1023,8 @@ class QRLNetworkSpider(scrapy.Spider):
             item_address["spider_name"] = self.name
             item_address["spider_version"] = self.version
             item_address["wallet_address"] = wallet_address
+            # Recorded in qrl_wallet_refresh by the address pipeline once the wallet row is stored
+            item_address["refresh_block_height"] = response.meta.get("refresh_block_height")
 
             # Always set these keys even if API doesn't include them:
             item_address["address_foundation_multi_sig_spend_txn_hash"] = json_response.get("state", {}).get("foundation_multi_sig_spend_txn_hash", "")
@@ -746,7 +1039,7 @@ class QRLNetworkSpider(scrapy.Spider):
                 return
 
                         # Suppress error logging for the null wallet address.
-            if wallet_address == "Q0000000000000000000000000000000000000000000000000000000000000000":
+            if wallet_address == NULL_WALLET_ADDRESS:
                 self.logger.info(f"Skipping invalid wallet (null): {wallet_address}")
                 yield item_address
                 return
@@ -825,4 +1118,8 @@ class QRLNetworkSpider(scrapy.Spider):
             item_missed["error_name"] = str(failure.__class__)
             item_missed["error_type"] = "Timeout Error"
 
+        if failure.request.meta.get("backfill"):
+            # A failed block is recorded as missed and still frees its slot in the backfill window
+            return [item_missed, *self.backfill_refill(failure.request.meta, given_up=True)]
+
         return item_missed 
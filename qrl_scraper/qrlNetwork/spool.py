@@ -0,0 +1,310 @@
+import os
+import io
+import csv
+import json
+import time
+import zlib
+import struct
+import logging
+import threading
+from datetime import datetime, timezone
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+FRAME_MAGIC = b"QS"
+FRAME_HEADER = struct.Struct(">2sII")  # magic, payload length, crc32 of the payload
+SEGMENT_SUFFIX = ".spool"
+OPEN_SUFFIX = ".open"
+FAILED_SUFFIX = ".failed"
+
+
+class SpoolCorrupt(Exception):
+    """A segment frame failed its length or checksum check."""
+
+
+def is_connection_error(error):
+    """True for failures to reach the server, as opposed to errors the server reported."""
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)) and getattr(error, "pgcode", None) is None
+
+
+class WriteAheadSpool:
+    """
+    Append-only local spool for batches the database could not take.
+
+    When a batch write fails because Postgres is unreachable, the writer
+    hands the rows to append() instead of dropping them. Each append is one
+    frame: a header (magic, length, CRC32) followed by the zlib-compressed
+    batch, serialized as a JSON line (table, insert target, columns,
+    ON CONFLICT clause) and the rows in the CSV layout COPY reads. Frames go to numbered segment
+    files under `directory`; a segment is written as {n}.open and renamed to
+    {n}.spool once it reaches `segment_bytes` or the spool is closed, so a
+    crash leaves at most one open segment, whose complete frames are still
+    replayed. replay() loads the sealed segments back through COPY once the
+    database is reachable again (the crawl calls it periodically, see
+    pipelines.spool_for_crawler); `scrapy replay-spool` does the same from
+    the command line. Rows the database rejects go to the missed items
+    table (see replay_segment); a segment that cannot be loaded at all is
+    renamed to {n}.failed so the later ones still replay.
+
+    After a failure the database is considered down for `retry_after`
+    seconds; writers check db_available() and spool straight away instead
+    of waiting on connection attempts. Thread-safe.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, retry_after=30, fsync=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retry_after = retry_after
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.segment = None  # open file of the current segment
+        self.segment_path = None
+        self.db_down_until = 0.0
+        self.spooled_batches = 0
+        self.spooled_rows = 0
+        self.replaying = False
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings):
+        from scrapy.utils.project import data_path
+
+        return cls(
+            data_path(settings.get("SPOOL_DIR", "spool"), createdir=True),
+            segment_bytes=settings.getint("SPOOL_SEGMENT_MB", 64) * 1024 * 1024,
+            retry_after=settings.getfloat("SPOOL_DB_RETRY_AFTER", 30),
+            fsync=settings.getbool("SPOOL_FSYNC", True),
+        )
+
+    def db_available(self):
+        return time.monotonic() >= self.db_down_until
+
+    def db_failed(self, error):
+        if self.db_available():
+            logger.warning(f"🛟 Database unreachable, spooling writes for {self.retry_after:g}s: {error}")
+        self.db_down_until = time.monotonic() + self.retry_after
+
+    def append(self, table, target, columns, conflict, rows):
+        """Write one batch of rows as a frame; durable once this returns (with fsync)."""
+        from .writers import rows_to_csv  # writers imports the DB pool
+
+        header = json.dumps({"table": table, "target": target, "columns": list(columns), "conflict": conflict, "rows": len(rows)})
+        payload = zlib.compress((header + "\n" + rows_to_csv(rows).getvalue()).encode(), 6)
+        frame = FRAME_HEADER.pack(FRAME_MAGIC, len(payload), zlib.crc32(payload)) + payload
+        with self.lock:
+            if self.segment is None:
+                self._open_segment()
+            self.segment.write(frame)
+            self.segment.flush()
+            if self.fsync:
+                os.fsync(self.segment.fileno())
+            self.spooled_batches += 1
+            self.spooled_rows += len(rows)
+            if self.segment.tell() >= self.segment_bytes:
+                self._seal_segment()
+
+    def replay_due(self):
+        """True when there is something to replay and the database is not known to be down."""
+        if not self.db_available():
+            return False
+        return self.segment is not None or any(path.endswith(SEGMENT_SUFFIX) for path in spool_segments(self.directory))
+
+    def replay(self):
+        """
+        Load the sealed segments, of this crawl and of earlier ones, oldest
+        first; the current segment is sealed first. A connection error stops
+        the replay and keeps the segment for the next attempt; any other
+        failure quarantines the segment (quarantine_segment) and the replay
+        goes on. Returns the number of rows loaded. Blocking; the crawl runs
+        it in the DB thread pool.
+        """
+        with self.lock:
+            if self.replaying or not self.db_available():
+                return 0
+            self.replaying = True
+            if self.segment is not None:
+                self._seal_segment()
+        rows = 0
+        try:
+            for path in spool_segments(self.directory):
+                if path.endswith(OPEN_SUFFIX):
+                    continue  # left by a crashed crawl, or being written by another one
+                try:
+                    segment_frames, segment_rows = replay_segment(path)
+                except Exception as error:
+                    if is_connection_error(error):
+                        self.db_failed(error)
+                        break
+                    quarantine_segment(path, error)
+                    continue
+                rows += segment_rows
+                logger.info(f"✅ REPLAYED {os.path.basename(path)}: {segment_rows} rows in {segment_frames} batches")
+        finally:
+            with self.lock:
+                self.replaying = False
+        return rows
+
+    def close(self):
+        with self.lock:
+            if self.segment is not None:
+                self._seal_segment()
+        if self.spooled_rows:
+            logger.info(f"🛟 Spooled {self.spooled_rows} rows in {self.spooled_batches} batches to {self.directory}")
+
+    def warn_unreplayed(self):
+        """Warn about segments still waiting for a replay, e.g. when a crawl ends with the database down."""
+        segments = spool_segments(self.directory)
+        if segments:
+            logger.warning(
+                f"🛟 {len(segments)} spool segments in {self.directory} are not loaded yet; "
+                "load them with: scrapy replay-spool"
+            )
+        failed = [name for name in os.listdir(self.directory) if name.endswith(FAILED_SUFFIX)]
+        if failed:
+            logger.error(f"❌ {len(failed)} spool segments in {self.directory} could not be loaded: {', '.join(sorted(failed))}")
+
+    def _open_segment(self):
+        numbers = [int(name.split(".")[0]) for name in os.listdir(self.directory) if name.split(".")[0].isdigit()]
+        self.segment_path = os.path.join(self.directory, f"{max(numbers, default=0) + 1:08d}{OPEN_SUFFIX}")
+        self.segment = open(self.segment_path, "ab")
+
+    def _seal_segment(self):
+        self.segment.close()
+        os.replace(self.segment_path, self.segment_path[:-len(OPEN_SUFFIX)] + SEGMENT_SUFFIX)
+        self.segment = self.segment_path = None
+
+
+def spool_segments(directory):
+    """Segment paths in write order, sealed and open (left by a crash) alike."""
+    if not os.path.isdir(directory):
+        return []
+    names = [
+        name for name in os.listdir(directory)
+        if name.endswith((SEGMENT_SUFFIX, OPEN_SUFFIX)) and name.split(".")[0].isdigit()
+    ]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def read_frames(path):
+    """
+    Yield (header, csv_buffer) for every frame of a segment. A truncated
+    last frame of an open segment (interrupted write) ends the segment;
+    anything else that fails its checks raises SpoolCorrupt.
+    """
+    with open(path, "rb") as segment:
+        data = segment.read()
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < FRAME_HEADER.size:
+            if path.endswith(OPEN_SUFFIX):
+                logger.warning(f"⚠️ Ignoring truncated frame header at the end of {path}")
+                return
+            raise SpoolCorrupt(f"{path}: truncated frame header at byte {offset}")
+        magic, length, checksum = FRAME_HEADER.unpack_from(data, offset)
+        payload = data[offset + FRAME_HEADER.size:offset + FRAME_HEADER.size + length]
+        if magic != FRAME_MAGIC:
+            raise SpoolCorrupt(f"{path}: bad frame marker at byte {offset}")
+        if len(payload) < length:
+            if path.endswith(OPEN_SUFFIX):
+                logger.warning(f"⚠️ Ignoring truncated frame at the end of {path}")
+                return
+            raise SpoolCorrupt(f"{path}: truncated frame at byte {offset}")
+        if zlib.crc32(payload) != checksum:
+            raise SpoolCorrupt(f"{path}: checksum mismatch in frame at byte {offset}")
+        header, _, body = zlib.decompress(payload).decode().partition("\n")
+        yield json.loads(header), io.StringIO(body)
+        offset += FRAME_HEADER.size + length
+
+
+def replay_segment(path):
+    """
+    Load the frames of a segment in one DB transaction and delete the segment
+    once that commits; returns (frames, rows loaded). Every frame is COPY'd
+    into a temporary staging table and moved into its table with the frame's
+    INSERT ... ON CONFLICT. A frame the database rejects is retried row by
+    row, like a batch the writers could not write, and the rows it still
+    rejects are recorded in the missed items table instead.
+    """
+    from .utils import db_cursor  # opens the DB pool
+    from .writers import COPY_NULL, quoted_columns
+
+    frames = rows = 0
+    with db_cursor() as (conn, cur):
+        for header, buffer in read_frames(path):
+            columns = quoted_columns(header["columns"])
+            cur.execute('SAVEPOINT "spool_frame"')
+            try:
+                cur.execute(f'CREATE TEMP TABLE "spool_staging" AS SELECT {columns} FROM {header["table"]} WITH NO DATA')
+                cur.copy_expert(
+                    f"COPY \"spool_staging\" ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+                )
+                cur.execute(
+                    f'INSERT INTO {header["target"]} ({columns}) SELECT {columns} FROM "spool_staging" {header["conflict"]}'
+                )
+                cur.execute('DROP TABLE "spool_staging"')
+                rows += header["rows"]
+            except psycopg2.Error as error:
+                if is_connection_error(error):
+                    raise
+                cur.execute('ROLLBACK TO SAVEPOINT "spool_frame"')
+                logger.warning(
+                    f"⚠️ Replay of a batch of {header['rows']} rows from {os.path.basename(path)} failed, "
+                    f"retrying row by row: {error}"
+                )
+                buffer.seek(0)
+                rows += _replay_rows(cur, header, buffer, path)
+            cur.execute('RELEASE SAVEPOINT "spool_frame"')
+            frames += 1
+        conn.commit()
+    os.remove(path)
+    return frames, rows
+
+
+def _replay_rows(cur, header, buffer, path):
+    """Insert a frame's rows one by one; rejected rows go to the missed items table. Returns the rows loaded."""
+    from .writers import COPY_NULL, MissedItemWriter, quoted_columns
+
+    insert = (
+        f'INSERT INTO {header["target"]} ({quoted_columns(header["columns"])}) '
+        f'VALUES ({", ".join(["%s"] * len(header["columns"]))}) {header["conflict"]}'
+    )
+    loaded = 0
+    for row in csv.reader(buffer):
+        row = [None if value == COPY_NULL else value for value in row]
+        cur.execute('SAVEPOINT "spool_row"')
+        try:
+            cur.execute(insert, row)
+            loaded += 1
+        except psycopg2.Error as error:
+            if is_connection_error(error):
+                raise
+            cur.execute('ROLLBACK TO SAVEPOINT "spool_row"')
+            logger.error(f"❌ Spooled row rejected by {header['table']}, recorded as a missed item: {error}")
+            now = datetime.now(timezone.utc)
+            MissedItemWriter.write(cur, [(
+                "replay-spool",
+                os.path.basename(path),
+                __name__,
+                "replay_segment",
+                None,
+                str(type(error))[:255],
+                str(error).strip()[:255],
+                f"spool:{header['table']}:{row[0]}"[:255],
+                now,
+                json.dumps(dict(zip(header["columns"], row)))[:1000],
+                1,
+                now,
+                now,
+            )])
+        cur.execute('RELEASE SAVEPOINT "spool_row"')
+    return loaded
+
+
+def quarantine_segment(path, error):
+    """Rename a segment that cannot be loaded to {n}.failed, out of the replay's way, for a manual look."""
+    failed_path = path.rsplit(".", 1)[0] + FAILED_SUFFIX
+    os.replace(path, failed_path)
+    logger.error(f"❌ Replay of {os.path.basename(path)} failed, moved it to {os.path.basename(failed_path)}: {error}")
+    return failed_path
@@ -1,9 +1,16 @@
 import os
+import re
+import json
 import psycopg2
 import environ
 import logging
-from psycopg2 import pool
-from .settings import DJANGO_ENV, USE_PROD_DB
+import numpy as np
+from twisted.python.threadpool import ThreadPool
+from .dbpool import HealingConnectionPool
+from .settings import (
+    DJANGO_ENV, USE_PROD_DB, DB_THREADPOOL_SIZE, DB_CONNECT_TIMEOUT, DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_MAX_LIFETIME, DB_POOL_VALIDATE_IDLE_AFTER, DB_POOL_ACQUIRE_TIMEOUT, DB_POOL_BACKOFF_MAX,
+)
 import datetime
 from contextlib import contextmanager
 
@@ -14,77 +21,127 @@ environ.Env.read_env()
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DOCUMENT_DIR = os.path.join(PROJECT_ROOT, 'Documenten')
 
-# ✅ Initialize Database Connection Pool
+# ✅ Database connection pool (thread-safe: pipelines use it from the DB thread pool)
 db_pool = None
+db_threadpool = None
+db_jobs_pending = 0
 
 @contextmanager
-def db_cursor():
-    connection, cursor = get_db_connection()
+def db_cursor(blocking=True):
+    """
+    (connection, cursor) from the pool, rolled back if the block raises and
+    released afterwards. Code on the reactor thread (spider callbacks,
+    signal handlers, LoopingCalls) passes blocking=False: a single checkout
+    attempt that fails fast instead of sleeping through connection retries
+    (see HealingConnectionPool.getconn).
+    """
+    connection, cursor = get_db_connection(blocking)
+    broken = False
     try:
         yield connection, cursor
     except Exception as e:
-        connection.rollback()
+        try:
+            connection.rollback()
+        except psycopg2.Error:
+            broken = True  # the connection died with the error; don't hand it out again
         raise
     finally:
-        release_connection(connection)
-
+        release_connection(connection, close=broken)
+
+
+def connect_db():
+    """
+    Open a new connection with the credentials from the environment. A
+    process never sees a changed DATABASE_URL: Heroku restarts the dynos
+    when a config var changes, and until then connections with rotated
+    credentials fail (see HealingConnectionPool). An unreachable server
+    fails the attempt after DB_CONNECT_TIMEOUT seconds instead of the OS
+    TCP timeout, which bounds a non-blocking checkout on the reactor thread.
+    """
+    if DJANGO_ENV == "production" or USE_PROD_DB:
+        return psycopg2.connect(dsn=env("DATABASE_URL"), connect_timeout=DB_CONNECT_TIMEOUT)
+    return psycopg2.connect(
+        host=env('DEV_DB_HOST', default='127.0.0.1'),
+        user=env('DEV_DB_USER', default='dev_user'),
+        password=env('DEV_DB_PASSWORD', default='dev_password'),
+        dbname=env('DEV_DB_NAME', default='qrl_dev'),
+        port=env('DEV_DB_PORT', default='5432'),
+        connect_timeout=DB_CONNECT_TIMEOUT,
+    )
 
 
 def init_db_pool():
-    """Initialize the database connection pool."""
+    """
+    Initialize the database connection pool. Connections are opened on
+    first use, so importing this module does not need a reachable database.
+    """
     global db_pool
-    try:
-        if DJANGO_ENV == "production" or USE_PROD_DB:
-            db_pool = pool.SimpleConnectionPool(
-                minconn=1, maxconn=10, dsn=env("DATABASE_URL")
-            )
-        else:
-            db_settings = {
-                "host": env('DEV_DB_HOST', default='127.0.0.1'),
-                "user": env('DEV_DB_USER', default='dev_user'),
-                "password": env('DEV_DB_PASSWORD', default='dev_password'),
-                "dbname": env('DEV_DB_NAME', default='qrl_dev'),
-                "port": env('DEV_DB_PORT', default='5432')
-            }
-            db_pool = pool.SimpleConnectionPool(1, 10, **db_settings)
-
-        if db_pool:
-            logging.info("✅ Database connection pool initialized successfully.")
-
-    except psycopg2.Error as e:
-        logging.error(f"❌ Failed to initialize database pool: {e}")
-        raise  # Stop execution if the pool fails
+    db_pool = HealingConnectionPool(
+        connect_db,
+        maxconn=DB_POOL_MAX_CONNECTIONS,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        validate_idle_after=DB_POOL_VALIDATE_IDLE_AFTER,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        backoff_max=DB_POOL_BACKOFF_MAX,
+    )
+    logging.info("✅ Database connection pool initialized successfully.")
 
 # ✅ Call this function once at startup
 init_db_pool()
 
-def get_connection():
-    """Get a connection from the pool."""
+def get_connection(blocking=True):
+    """Get a healthy connection from the pool (see HealingConnectionPool.getconn)."""
     try:
-        if db_pool:
-            return db_pool.getconn()
-        else:
-            logging.error("❌ Database pool is not initialized.")
-            raise psycopg2.OperationalError("Database pool not available.")
+        return db_pool.getconn(blocking)
     except psycopg2.Error as e:
         logging.error(f"❌ Error getting DB connection: {e}")
         raise
 
-def release_connection(conn):
-    """Release a connection back to the pool."""
+def release_connection(conn, close=False):
+    """Release a connection back to the pool; close=True discards it."""
     try:
-        if db_pool and conn:
-            db_pool.putconn(conn)
+        if conn:
+            db_pool.putconn(conn, close=close)
         else:
-            logging.error("❌ Tried to release a None connection or uninitialized pool.")
+            logging.error("❌ Tried to release a None connection.")
     except psycopg2.Error as e:
         logging.error(f"❌ Error releasing DB connection: {e}")
 
+def db_pool_stats():
+    """Pool metrics: checkouts, wait time, in-use/idle connections, reconnects (see HealingConnectionPool.stats)."""
+    return db_pool.stats()
+
+def run_in_db_thread(function, *args, **kwargs):
+    """
+    Run blocking psycopg2 work in the DB thread pool (DB_THREADPOOL_SIZE threads)
+    so the reactor keeps downloading; returns a Deferred with the result.
+    """
+    from twisted.internet import reactor, threads  # not at import time: Scrapy installs the reactor first
+
+    global db_threadpool, db_jobs_pending
+    if db_threadpool is None:
+        db_threadpool = ThreadPool(minthreads=1, maxthreads=DB_THREADPOOL_SIZE, name="qrl-db")
+        reactor.callWhenRunning(db_threadpool.start)
+        reactor.addSystemEventTrigger("during", "shutdown", db_threadpool.stop)
+
+    def finished(result):
+        global db_jobs_pending
+        db_jobs_pending -= 1
+        return result
+
+    db_jobs_pending += 1
+    return threads.deferToThreadPool(reactor, db_threadpool, function, *args, **kwargs).addBoth(finished)
+
+
+def pending_db_jobs():
+    """DB jobs submitted through run_in_db_thread that have not finished yet."""
+    return db_jobs_pending
+
 # ✅ Modify existing function to use the pool
-def get_db_connection():
+def get_db_connection(blocking=True):
     """Returns a pooled database connection and cursor."""
     try:
-        connection = get_connection()
+        connection = get_connection(blocking)
         # Don't set autocommit - let the pipeline handle commits
         cursor = connection.cursor()
         return connection, cursor
@@ -95,6 +152,9 @@ def get_db_connection():
 # ✅ Set scrap_url based on environment
 scrap_url = "https://explorer.theqrl.org" if DJANGO_ENV == "production" or USE_PROD_DB else "http://127.0.0.1:3000"
 
+# QRL node (host:port) used by the gRPC ingestion engine (-a engine=grpc)
+grpc_target = env("QRL_GRPC_TARGET", default="127.0.0.1:19009")
+
 def bytes_to_hex(byte_list):
     return bytes(byte_list).hex()
 
@@ -106,5 +166,64 @@ def convert_timestamp(ts):
 
 
 def list_integer_to_hex(list_of_ints):
+    if isinstance(list_of_ints, bytes):
+        return list_of_ints.hex()
     array = bytearray(list_of_ints)
     return bytearray.hex(array)
+
+
+def list_integer_to_string(data_list):
+    return bytearray(data_list).decode()
+
+
+# Explorer payloads carry every hash, address, key and signature as a Node.js
+# Buffer: {"type": "Buffer", "data": [12, 255, ...]}.
+BUFFER_DATA = re.compile(rb'"type":\s*"Buffer",\s*("data":\s*\[)')
+BYTE_LIST_TYPES = (list, bytes)  # a Buffer's data as json.loads or load_explorer_json returns it
+
+
+def hex_encode_byte_lists(body):
+    """
+    Rewrite the int list of every Buffer in a raw JSON body as a hex string
+    under "hex", parsing the digits in bulk with NumPy instead of creating a
+    Python int per byte. Lists that are not valid bytes are left unchanged.
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    chunks = []
+    position = 0
+    for match in BUFFER_DATA.finditer(body):
+        start = match.end()
+        end = body.find(b"]", start)
+        if end < 0:
+            break
+        digits = body[start:end]
+        if not digits.strip():
+            continue  # empty Buffer, json.loads handles it
+        try:
+            values = np.fromstring(digits, dtype=np.int64, sep=",")
+        except ValueError:
+            continue  # not plain integers (floats, strings): json.loads handles it
+        if values.size != digits.count(b",") + 1 or b"-" in digits or values.max() > 255:
+            continue
+        chunks += (body[position:match.start(1)], b'"hex": "', values.astype(np.uint8).tobytes().hex().encode(), b'"')
+        position = end + 1
+    if not chunks:
+        return body
+    chunks.append(body[position:])
+    return b"".join(chunks)
+
+
+def _hex_buffer_to_bytes(obj):
+    if "hex" in obj and obj.get("type") == "Buffer":
+        obj["data"] = bytes.fromhex(obj.pop("hex"))
+    return obj
+
+
+def load_explorer_json(body):
+    """
+    json.loads for explorer (and rendered gRPC) payloads: every Buffer's
+    "data" comes back as bytes instead of a list of ints. list_integer_to_hex
+    and list_integer_to_string accept both.
+    """
+    return json.loads(hex_encode_byte_lists(body), object_hook=_hex_buffer_to_bytes)
@@ -0,0 +1,418 @@
+import io
+import csv
+import time
+import logging
+import threading
+
+import psycopg2.extras
+
+from .utils import db_cursor
+from .spool import is_connection_error
+
+
+TRANSACTION_COLUMNS = (
+    "transaction_hash", "transaction_sending_wallet_address", "transaction_receiving_wallet_address",
+    "transaction_amount_send", "transaction_type", "transaction_block_number",
+    "transaction_found", "transaction_result", "spider_name",
+    "spider_version", "master_addr_type", "master_addr_data",
+    "master_addr_fee", "public_key_type", "public_key_data",
+    "signature_type", "transaction_nonce", "transaction_addrs_to_type",
+    "block_found_datetime", "transaction_added_datetime",
+)
+
+BLOCK_COLUMNS = (
+    "block_number", "block_found", "block_result",
+    "block_found_datetime", "block_found_timestamp_seconds", "block_reward_block", "block_reward_fee",
+    "block_mining_nonce", "block_number_of_transactions", "spider_name",
+    "spider_version", "block_size", "block_hash_header_type", "block_hash_header_data",
+    "block_hash_header_type_prev", "block_hash_header_data_prev", "block_merkle_root_type",
+    "block_merkle_root_data", "block_added_timestamp",
+)
+
+ADDRESS_COLUMNS = (
+    "wallet_address", "address_balance", "address_nonce",
+    "address_ots_bitfield_used_page", "address_used_ots_key_count", "address_transaction_hash_count",
+    "address_tokens_count", "address_slaves_count", "address_lattice_pk_count",
+    "address_multi_sig_address_count", "address_multi_sig_spend_count", "address_inbox_message_count",
+    "address_foundation_multi_sig_spend_txn_hash", "address_foundation_multi_sig_vote_txn_hash", "address_unvotes",
+    "address_proposal_vote_stats", "spider_name", "spider_version", "address_added_datetime",
+)
+
+MISSED_ITEM_COLUMNS = (
+    "spider_name", "spider_version", "location_script_file",
+    "location_script_function", "trace_back", "error_type",
+    "error_name", "item_url", "error_timestamp", "failed_data",
+    "occurrence_count", "first_seen", "last_seen",
+)
+
+COPY_NULL = "\\N"
+
+
+def quoted_columns(columns):
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def rows_to_csv(rows):
+    """Serialize rows into an in-memory CSV buffer suitable for COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if value is None else value for value in row])
+    buffer.seek(0)
+    return buffer
+
+
+class BatchWriter:
+    """
+    Buffers (item, row) pairs and writes them in bulk, every batch_size rows or
+    flush_interval seconds. Subclasses implement write(), write_one() and
+    log_saved(), and set `conflict` to the ON CONFLICT clause of their INSERT.
+
+    With a `spool` (spool.WriteAheadSpool), batches that cannot be written
+    because the database is unreachable are appended to the spool instead,
+    to be loaded later with `scrapy replay-spool`; after_spool(spool, items)
+    then spools the bookkeeping after_write would have done.
+    """
+
+    spool = None
+    conflict = ""
+
+    @property
+    def insert_target(self):
+        """The INSERT target, including the alias `conflict` refers to."""
+        return self.table
+
+    @property
+    def replay_conflict(self):
+        """The ON CONFLICT clause a spooled batch is replayed with; the writer's own by default."""
+        return self.conflict
+
+    def __init__(self, batch_size=500, flush_interval=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []  # list of (item, row) tuples
+        self.last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, item, row):
+        """Buffer a row; returns True when the buffer should be flushed."""
+        self.pending.append((item, row))
+        return self.is_due()
+
+    def is_due(self):
+        if not self.pending:
+            return False
+        if len(self.pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def take(self):
+        """Hand over the buffered (item, row) pairs and reset the buffer."""
+        pending, self.pending = self.pending, []
+        self.last_flush = time.monotonic()
+        return pending
+
+    def flush(self, on_error, after_write=None, after_spool=None):
+        """Write everything that is buffered; see write_pending()."""
+        return self.write_pending(self.take(), on_error, after_write, after_spool)
+
+    def write_pending(self, pending, on_error, after_write=None, after_spool=None):
+        """
+        Write (item, row) pairs taken from the buffer in one DB transaction.
+
+        If the batch is rejected (e.g. one malformed row), the rows are retried
+        one by one so only the bad rows are reported through on_error(item, error).
+        after_write(cur, items), if given, runs inside the same DB transaction
+        for the items that were written, so bookkeeping commits with the rows;
+        after_spool(spool, items) runs instead when the batch is spooled.
+        Blocking; pipelines call it from the DB thread pool.
+        """
+        if not pending:
+            return 0
+        if self.spool is not None and not self.spool.db_available():
+            return self.spool_pending(pending, on_error, after_write, after_spool)
+
+        started = time.monotonic()
+        try:
+            with db_cursor() as (conn, cur):
+                written = self.write(cur, [row for _, row in pending])
+                if after_write is not None:
+                    after_write(cur, [item for item, _ in pending])
+                conn.commit()
+        except Exception as error:
+            if self.spool is not None and is_connection_error(error):
+                self.spool.db_failed(error)
+                return self.spool_pending(pending, on_error, after_write, after_spool)
+            logging.warning(f"⚠️ Batch write of {len(pending)} {self.noun} failed, retrying row by row: {error}")
+            return self._flush_row_by_row(pending, on_error, after_write)
+
+        self.log_saved(written, len(pending), time.monotonic() - started)
+        return written
+
+    def spool_pending(self, pending, on_error, after_write=None, after_spool=None):
+        """Append the batch to the spool; falls back to the row-by-row write if the spool cannot take it."""
+        try:
+            self.spool.append(self.table, self.insert_target, self.columns, self.replay_conflict, [row for _, row in pending])
+            if after_spool is not None:
+                after_spool(self.spool, [item for item, _ in pending])
+        except OSError as error:
+            logging.error(f"❌ Could not spool {len(pending)} {self.noun}: {error}")
+            return self._flush_row_by_row(pending, on_error, after_write)
+        logging.info(f"🛟 SPOOLED {len(pending)} {self.noun}")
+        return 0
+
+    def _flush_row_by_row(self, pending, on_error, after_write=None):
+        written = 0
+        for item, row in pending:
+            try:
+                with db_cursor() as (conn, cur):
+                    written += self.write_one(cur, row)
+                    if after_write is not None:
+                        after_write(cur, [item])
+                    conn.commit()
+            except Exception as error:
+                on_error(item, error)
+        return written
+
+
+class TransactionWriter(BatchWriter):
+    """
+    Buffers transaction rows and writes them in bulk.
+
+    Rows are COPY'd into a temporary staging table and moved into
+    qrl_blockchain_transactions with a single INSERT ... ON CONFLICT DO NOTHING,
+    so duplicates are skipped by the unique (hash, receiving wallet) constraint
+    instead of a SELECT per row.
+    """
+
+    table = 'public."qrl_blockchain_transactions"'
+    staging_table = "tmp_qrl_blockchain_transactions"
+    columns = TRANSACTION_COLUMNS
+    conflict = 'ON CONFLICT ("transaction_hash", "transaction_receiving_wallet_address") DO NOTHING'
+    noun = "transactions"
+
+    @classmethod
+    def write(cls, cur, rows):
+        """COPY rows into the staging table and upsert them. Returns the number of inserted rows."""
+        cur.execute(
+            f'CREATE TEMP TABLE "{cls.staging_table}" ON COMMIT DROP AS '
+            f'SELECT {quoted_columns(cls.columns)} FROM {cls.table} WITH NO DATA'
+        )
+        cur.copy_expert(
+            f'COPY "{cls.staging_table}" ({quoted_columns(cls.columns)}) '
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            rows_to_csv(rows),
+        )
+        cur.execute(
+            f'INSERT INTO {cls.table} ({quoted_columns(cls.columns)}) '
+            f'SELECT {quoted_columns(cls.columns)} FROM "{cls.staging_table}" {cls.conflict}'
+        )
+        return cur.rowcount
+
+    @classmethod
+    def write_one(cls, cur, row):
+        """Single-row fallback used to isolate rows that make a batch fail."""
+        cur.execute(
+            f'INSERT INTO {cls.table} ({quoted_columns(cls.columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(cls.columns))}) {cls.conflict}',
+            row,
+        )
+        return cur.rowcount
+
+    def log_saved(self, inserted, count, seconds):
+        logging.info(
+            f"✅ SAVED {inserted} of {count} transactions "
+            f"({count - inserted} duplicates) in {seconds:.3f}s"
+        )
+
+
+class BlockWriter(BatchWriter):
+    """
+    Buffers block rows (the latest row per block number) and inserts them
+    with one multi-row INSERT ... ON CONFLICT ("block_number") DO NOTHING.
+    With update_existing (rescrape mode) stored rows are overwritten instead;
+    block_added_timestamp and got_all_transactions are kept.
+    """
+
+    table = 'public."qrl_blockchain_blocks"'
+    columns = BLOCK_COLUMNS
+    updated_columns = tuple(column for column in columns if column not in ("block_number", "block_added_timestamp"))
+    noun = "blocks"
+
+    def __init__(self, batch_size=500, flush_interval=5.0, update_existing=False):
+        super().__init__(batch_size, flush_interval)
+        self.update_existing = update_existing
+        self.pending = {}  # block_number -> (item, row)
+
+    def add(self, item, row):
+        """Buffer a row, replacing a pending row of the same block; returns True when the buffer should be flushed."""
+        self.pending.pop(row[0], None)
+        self.pending[row[0]] = (item, row)
+        return self.is_due()
+
+    def take(self):
+        pending, self.pending = list(self.pending.values()), {}
+        self.last_flush = time.monotonic()
+        return pending
+
+    @property
+    def conflict(self):
+        if self.update_existing:
+            return 'ON CONFLICT ("block_number") DO UPDATE SET ' + ", ".join(
+                f'"{column}" = EXCLUDED."{column}"' for column in self.updated_columns
+            )
+        return 'ON CONFLICT ("block_number") DO NOTHING'
+
+    def insert_sql(self):
+        return f'INSERT INTO {self.table} ({quoted_columns(self.columns)}) VALUES %s {self.conflict} RETURNING (xmax = 0)'
+
+    def write(self, cur, rows):
+        """Insert (or upsert) rows, one per block. Returns the number of blocks that were new."""
+        inserted = psycopg2.extras.execute_values(cur, self.insert_sql(), rows, page_size=len(rows), fetch=True)
+        return sum(1 for (is_new,) in inserted if is_new)
+
+    def write_one(self, cur, row):
+        """Single-row fallback used to isolate rows that make a batch fail."""
+        return self.write(cur, [row])
+
+    def log_saved(self, inserted, count, seconds):
+        existing = "updated" if self.update_existing else "duplicates"
+        logging.info(f"✅ SAVED {inserted} new blocks of {count} ({count - inserted} {existing}) in {seconds:.3f}s")
+
+
+class AddressWriter(BatchWriter):
+    """
+    Buffers wallet address rows and upserts them in bulk.
+
+    The buffer keeps only the latest row per wallet, so a wallet refreshed many
+    times between flushes (exchanges, pools) is written once. A flush is a
+    single multi-row INSERT ... ON CONFLICT ("wallet_address") DO UPDATE;
+    address_added_datetime keeps the value of the first insert. A spooled
+    batch is replayed with DO NOTHING: by then the stored state may be newer.
+    """
+
+    table = 'public."qrl_wallet_address"'
+    columns = ADDRESS_COLUMNS
+    updated_columns = tuple(column for column in columns if column not in ("wallet_address", "address_added_datetime"))
+    conflict = 'ON CONFLICT ("wallet_address") DO UPDATE SET ' + ", ".join(
+        f'"{column}" = EXCLUDED."{column}"' for column in updated_columns
+    )
+    replay_conflict = 'ON CONFLICT ("wallet_address") DO NOTHING'
+    noun = "wallet addresses"
+
+    def __init__(self, batch_size=500, flush_interval=5.0):
+        super().__init__(batch_size, flush_interval)
+        self.pending = {}  # wallet_address -> (item, row)
+        self.coalesced = 0  # rows replaced by a newer row for the same wallet
+
+    def add(self, item, row):
+        """Buffer a row, replacing a pending row of the same wallet; returns True when the buffer should be flushed."""
+        if self.pending.pop(row[0], None) is not None:
+            self.coalesced += 1
+        self.pending[row[0]] = (item, row)
+        return self.is_due()
+
+    def take(self):
+        pending, self.pending = list(self.pending.values()), {}
+        self.last_flush = time.monotonic()
+        return pending
+
+    @classmethod
+    def upsert_sql(cls):
+        return f'INSERT INTO {cls.table} ({quoted_columns(cls.columns)}) VALUES %s {cls.conflict} RETURNING (xmax = 0)'
+
+    @classmethod
+    def write(cls, cur, rows):
+        """Upsert rows (one per wallet). Returns the number of wallets that were new."""
+        inserted = psycopg2.extras.execute_values(cur, cls.upsert_sql(), rows, page_size=len(rows), fetch=True)
+        return sum(1 for (is_new,) in inserted if is_new)
+
+    @classmethod
+    def write_one(cls, cur, row):
+        """Single-row fallback used to isolate rows that make a batch fail."""
+        return cls.write(cur, [row])
+
+    def log_saved(self, inserted, count, seconds):
+        logging.info(
+            f"✅ SAVED {count} wallet addresses "
+            f"({inserted} new, {count - inserted} updated) in {seconds:.3f}s"
+        )
+
+
+class MissedItemWriter(BatchWriter):
+    """
+    Aggregates error rows in memory by (item_url, error_name) and upserts them
+    in bulk into qrl_blockchain_missed_items.
+
+    Repeats of an error add to occurrence_count and move last_seen; the other
+    columns describe the latest occurrence. A flush is one multi-row
+    INSERT ... ON CONFLICT ("item_url", "error_name") DO UPDATE that adds the
+    buffered count to the stored one, so errors are never read before they
+    are written. add() and take() are thread-safe: errors are recorded from
+    the reactor and from the DB thread pool.
+    """
+
+    table = 'public."qrl_blockchain_missed_items"'
+    columns = MISSED_ITEM_COLUMNS
+    insert_target = f'{table} AS missed'
+    conflict = (
+        'ON CONFLICT ("item_url", "error_name") DO UPDATE SET '
+        + ", ".join(
+            f'"{column}" = EXCLUDED."{column}"'
+            for column in columns
+            if column not in ("item_url", "error_name", "occurrence_count", "first_seen")
+        )
+        + ', "occurrence_count" = missed."occurrence_count" + EXCLUDED."occurrence_count"'
+        ', "first_seen" = COALESCE(missed."first_seen", EXCLUDED."first_seen")'
+    )
+    noun = "errors"
+
+    def __init__(self, batch_size=500, flush_interval=5.0):
+        super().__init__(batch_size, flush_interval)
+        self.pending = {}  # (item_url, error_name) -> (item, row)
+        self.lock = threading.Lock()
+
+    def add(self, item, row):
+        """
+        Count one more occurrence of the row's error; returns True when the buffer should be flushed.
+        `row` holds the columns up to failed_data; the counter and first/last seen are filled in here.
+        """
+        key = (row[7], row[6])
+        seen = row[8]
+        with self.lock:
+            previous = self.pending.get(key)
+            if previous is None:
+                self.pending[key] = (item, tuple(row) + (1, seen, seen))
+            else:
+                _, previous_row = previous
+                self.pending[key] = (item, tuple(row) + (previous_row[10] + 1, previous_row[11], seen))
+        return self.is_due()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = list(self.pending.values()), {}
+        self.last_flush = time.monotonic()
+        return pending
+
+    @classmethod
+    def upsert_sql(cls):
+        return f'INSERT INTO {cls.insert_target} ({quoted_columns(cls.columns)}) VALUES %s {cls.conflict} RETURNING (xmax = 0)'
+
+    @classmethod
+    def write(cls, cur, rows):
+        """Upsert aggregated rows (one per URL and error). Returns the number of errors not seen before."""
+        inserted = psycopg2.extras.execute_values(cur, cls.upsert_sql(), rows, page_size=len(rows), fetch=True)
+        return sum(1 for (is_new,) in inserted if is_new)
+
+    @classmethod
+    def write_one(cls, cur, row):
+        """Single-row fallback used to isolate rows that make a batch fail."""
+        return cls.write(cur, [row])
+
+    def log_saved(self, inserted, count, seconds):
+        logging.info(
+            f"✅ SAVED {count} missed item errors "
+            f"({inserted} new, {count - inserted} repeated) in {seconds:.3f}s"
+        )
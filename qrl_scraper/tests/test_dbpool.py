@@ -0,0 +1,59 @@
+import time
+import socket
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from qrlNetwork.dbpool import HealingConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    closed = 0
+
+    class info:
+        transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+def refuse():
+    raise psycopg2.OperationalError("connection refused")
+
+
+def test_non_blocking_checkout_fails_at_once_when_the_database_is_down():
+    pool = HealingConnectionPool(refuse, acquire_timeout=5)
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(blocking=False)
+    assert time.monotonic() - started < 1
+    assert pool.stats()["failed_connects"] == 1
+    assert pool.size == 0
+
+
+def test_non_blocking_checkout_does_not_wait_for_a_full_pool():
+    pool = HealingConnectionPool(FakeConnection, maxconn=1, acquire_timeout=5)
+    connection = pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(blocking=False)
+    assert time.monotonic() - started < 1
+    pool.putconn(connection)
+    assert pool.getconn(blocking=False) is connection
+
+
+def test_non_blocking_checkout_is_bounded_by_the_connect_timeout(monkeypatch):
+    from qrlNetwork import utils
+    from qrlNetwork.settings import DB_CONNECT_TIMEOUT
+
+    # A server that accepts the TCP connection and never answers, like a dropped route to Postgres
+    with socket.socket() as silent_server:
+        silent_server.bind(("127.0.0.1", 0))
+        silent_server.listen()
+        port = silent_server.getsockname()[1]
+        monkeypatch.setenv("DATABASE_URL", f"postgresql://qrl@127.0.0.1:{port}/qrl")
+        monkeypatch.setenv("DEV_DB_HOST", "127.0.0.1")
+        monkeypatch.setenv("DEV_DB_PORT", str(port))
+        pool = HealingConnectionPool(utils.connect_db, acquire_timeout=60)
+        started = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            pool.getconn(blocking=False)
+        assert time.monotonic() - started < DB_CONNECT_TIMEOUT + 1
@@ -0,0 +1,214 @@
+import os
+import copy
+import logging
+
+import pytest
+
+from qrlNetwork.decoders import TRANSACTION_DECODERS, decode_transaction, embedded_transaction_response
+from qrlNetwork.utils import load_explorer_json
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ITEM_URL = "https://explorer.theqrl.org/api/block/7577"
+logger = logging.getLogger(__name__)
+
+
+def load(name):
+    with open(os.path.join(DATA_DIR, name), "rb") as data:
+        return load_explorer_json(data.read())
+
+
+# /api/block/7577 as the explorer serves it: a coinbase, a token and six transfers
+BLOCK = load("explorer_block_7577.json")
+BLOCK_HEADER = BLOCK["block_extended"]["header"]
+BLOCK_TRANSACTIONS = {}
+for entry in BLOCK["block_extended"]["extended_transactions"]:
+    BLOCK_TRANSACTIONS.setdefault(entry["tx"]["transactionType"], entry)
+# One transaction of every other type, in the envelope of the block's first transfer
+TRANSACTIONS = {**load("explorer_transactions.json"), **BLOCK_TRANSACTIONS}
+
+
+def transaction(transaction_type):
+    return copy.deepcopy(TRANSACTIONS[transaction_type])
+
+
+def decode(transaction):
+    """[(row as a dict, wallets)] for a transaction embedded in block 7577."""
+    response = embedded_transaction_response(BLOCK, BLOCK_HEADER, transaction)
+    return [
+        (dict(item), wallets)
+        for item, wallets in decode_transaction(
+            response, ITEM_URL, "qrl_network_spider", "1.0", logger, fee_in_shor=True
+        )
+    ]
+
+
+def q(field):
+    return "Q" + bytes(field["data"]).hex()
+
+
+def header(transaction, **fields):
+    """The fields every row of `transaction` shares, plus `fields`."""
+    tx = transaction["tx"]
+    return {
+        "item_url": ITEM_URL,
+        "spider_name": "qrl_network_spider",
+        "spider_version": "1.0",
+        "transaction_result": BLOCK["result"],
+        "transaction_found": True,
+        "transaction_block_number": 7577,
+        "block_found_datetime": 1530427321,
+        "block_found_timestamp_seconds": 1530427321,
+        "transaction_type": tx["transactionType"],
+        "transaction_nonce": int(tx["nonce"]),
+        "master_addr_type": "Buffer",
+        "master_addr_data": bytes(tx["master_addr"]["data"]).hex(),
+        "master_addr_fee": 0 if tx["transactionType"] == "coinbase" else int(tx["fee"]),
+        "transaction_hash": bytes(tx["transaction_hash"]["data"]).hex(),
+        "public_key_type": "Buffer",
+        "public_key_data": bytes(tx["public_key"]["data"]).hex(),
+        "signature_type": tx.get("signature", {}).get("type", "Unknown"),
+        **fields,
+    }
+
+
+def row(transaction, sender, receiver="", amount=0, addrs_to_type="", **fields):
+    return header(
+        transaction,
+        transaction_sending_wallet_address=sender,
+        transaction_receiving_wallet_address=receiver,
+        transaction_amount_send=amount,
+        transaction_addrs_to_type=addrs_to_type,
+        **fields,
+    )
+
+
+def test_every_registered_decoder_is_covered():
+    assert set(TRANSACTION_DECODERS) == {
+        "coinbase", "transfer", "transfer_token", "multi_sig_spend", "slave", "token",
+        "message", "latticePK", "multi_sig_create", "multi_sig_vote",
+    }
+    assert set(TRANSACTIONS) == set(TRANSACTION_DECODERS)
+
+
+@pytest.mark.parametrize("transaction_type", sorted(TRANSACTION_DECODERS))
+def test_every_transaction_yields_a_row(transaction_type):
+    assert decode(transaction(transaction_type))
+
+
+def test_every_transaction_of_the_block_yields_its_rows():
+    transactions = BLOCK["block_extended"]["extended_transactions"]
+    rows = [row for entry in transactions for row in decode(entry)]
+    transfers = sum(len(entry["tx"]["transfer"]["addrs_to"]) for entry in transactions if "transfer" in entry["tx"])
+    assert len(rows) == 2 + transfers  # coinbase and token: one row each
+    assert {item["transaction_hash"] for item, _ in rows} == {
+        bytes(entry["tx"]["transaction_hash"]["data"]).hex() for entry in transactions
+    }
+
+
+def test_coinbase():
+    tx = transaction("coinbase")
+    sender, receiver = q(tx["addr_from"]), q(tx["tx"]["coinbase"]["addr_to"])
+    assert sender == "Q" + "00" * 32
+    assert decode(tx) == [(row(tx, sender, receiver, "6652563005", "Buffer"), [receiver, sender])]
+
+
+@pytest.mark.parametrize("transaction_type", ["transfer", "transfer_token"])
+def test_transfers_yield_a_row_per_recipient(transaction_type):
+    tx = transaction(transaction_type)
+    body = tx["tx"][transaction_type]
+    sender = q(tx["addr_from"])
+    assert len(body["addrs_to"]) > 1
+    assert decode(tx) == [
+        (row(tx, sender, q(receiver), amount, "Buffer"), [q(receiver), sender])
+        for receiver, amount in zip(body["addrs_to"], body["amounts"])
+    ]
+
+
+def test_multi_sig_spend_is_sent_from_the_multi_sig_address_and_refreshes_the_signer():
+    tx = transaction("multi_sig_spend")
+    body = tx["tx"]["multi_sig_spend"]
+    multi_sig_address, signer = q(body["multi_sig_address"]), q(tx["addr_from"])
+    assert decode(tx) == [
+        (row(tx, multi_sig_address, q(receiver), amount, "Buffer"), [q(receiver), multi_sig_address, signer])
+        for receiver, amount in zip(body["addrs_to"], body["amounts"])
+    ]
+
+
+def test_slave_rows_without_addresses_for_the_67_byte_keys_of_the_explorer():
+    tx = transaction("slave")
+    assert decode(tx) == [(row(tx, "", ""), ["", ""]) for _ in tx["tx"]["slave"]["slave_pks"]]
+
+
+def test_slave_rows_with_32_byte_keys():
+    tx = transaction("slave")
+    master = bytes(range(32))
+    tx["addr_from"] = {"type": "Buffer", "data": master}
+    slaves = [bytes([index]) * 32 for index in (1, 2)]
+    tx["tx"]["slave"]["slave_pks"] = [{"type": "Buffer", "data": slave} for slave in slaves]
+    assert decode(tx) == [
+        (row(tx, "Q" + master.hex(), "Q" + slave.hex()), ["Q" + master.hex(), "Q" + slave.hex()])
+        for slave in slaves
+    ]
+
+
+def test_token():
+    tx = transaction("token")
+    body = tx["tx"]["token"]
+    receivers = [q(balance["address"]) for balance in body["initial_balances"]]
+    assert decode(tx) == [(
+        header(
+            tx,
+            transaction_receiving_wallet_address=", ".join(receivers),
+            initial_balance_address=receivers[0],
+            initial_balance="100000000000",
+            token_symbol="DBZ",
+            token_name="DragonBall Coin",
+            token_owner=q(body["owner"]),
+            token_decimals=int(body["decimals"]),
+        ),
+        [", ".join(receivers), None],
+    )]
+
+
+def test_message_to_an_address():
+    tx = transaction("message")
+    sender, receiver = q(tx["addr_from"]), q(tx["tx"]["message"]["addr_to"])
+    assert decode(tx) == [(row(tx, sender, receiver), [receiver, sender])]
+
+
+def test_message_without_recipient():
+    tx = transaction("message")
+    tx["tx"]["message"].pop("addr_to")
+    sender = q(tx["addr_from"])
+    assert decode(tx) == [(row(tx, sender), ["", sender])]
+
+
+@pytest.mark.parametrize("transaction_type", ["latticePK", "multi_sig_vote"])
+def test_sender_only_types(transaction_type):
+    tx = transaction(transaction_type)
+    sender = q(tx["addr_from"])
+    assert decode(tx) == [(row(tx, sender), ["", sender])]
+
+
+def test_multi_sig_create_yields_a_row_per_signatory():
+    tx = transaction("multi_sig_create")
+    signatories = tx["tx"]["multi_sig_create"]["signatories"]
+    sender = q(tx["addr_from"])
+    assert decode(tx) == [
+        (row(tx, sender, q(signatory), addrs_to_type="Buffer"), [q(signatory), sender]) for signatory in signatories
+    ]
+
+
+def test_multi_sig_create_without_signatories():
+    tx = transaction("multi_sig_create")
+    tx["tx"]["multi_sig_create"]["signatories"] = []
+    sender = q(tx["addr_from"])
+    assert decode(tx) == [(row(tx, sender), ["", sender])]
+
+
+def test_unknown_type_stores_the_sender_only():
+    tx = transaction("latticePK")
+    tx["tx"]["transactionType"] = "future_type"
+    tx["tx"]["future_type"] = tx["tx"].pop("latticePK")
+    sender = q(tx["addr_from"])
+    assert decode(tx) == [(row(tx, sender), ["", sender])]
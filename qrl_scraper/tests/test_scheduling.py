@@ -0,0 +1,22 @@
+from qrlNetwork.scheduling import WalletRefreshIndex
+
+
+def test_wallets_known_to_the_lru_need_no_lookup():
+    index = WalletRefreshIndex()
+    assert index.unknown(["Qa", "Qb", "Qa"]) == ["Qa", "Qb"]
+    assert index.due(["Qa", "Qb"], 10, {"Qa": 12}) == ["Qb"]
+    assert index.unknown(["Qa", "Qb"]) == []
+
+
+def test_a_wallet_is_due_again_only_for_a_newer_block():
+    index = WalletRefreshIndex()
+    assert index.due(["Qa"], 10) == ["Qa"]
+    assert index.due(["Qa"], 10) == []
+    assert index.due(["Qa"], 9, {"Qa": 5}) == []
+    assert index.due(["Qa"], 11) == ["Qa"]
+
+
+def test_the_lru_is_bounded():
+    index = WalletRefreshIndex(cache_size=2)
+    index.due(["Qa", "Qb", "Qc"], 10)
+    assert index.unknown(["Qa", "Qb", "Qc"]) == ["Qa"]
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from qrlNetwork.utils import hex_encode_byte_lists, load_explorer_json
+
+
+def buffer(data):
+    return json.dumps({"type": "Buffer", "data": data}).encode()
+
+
+def test_hex_encode_byte_lists_rewrites_byte_buffers():
+    body = b'{"hash": ' + buffer([0, 15, 255]) + b', "empty": ' + buffer([]) + b"}"
+    assert json.loads(hex_encode_byte_lists(body)) == {
+        "hash": {"type": "Buffer", "hex": "000fff"},
+        "empty": {"type": "Buffer", "data": []},
+    }
+
+
+@pytest.mark.parametrize("data", [
+    [1.5, 2],
+    [1, "x"],
+    [1, 256],
+    [-1, 2],
+    [1, None],
+])
+def test_hex_encode_byte_lists_leaves_non_byte_lists_unchanged(data):
+    body = b'{"a": ' + buffer(data) + b', "b": ' + buffer([171, 205]) + b"}"
+    assert json.loads(hex_encode_byte_lists(body)) == {
+        "a": {"type": "Buffer", "data": data},
+        "b": {"type": "Buffer", "hex": "abcd"},
+    }
+
+
+def test_load_explorer_json_returns_buffers_as_bytes():
+    body = b'{"a": ' + buffer([1.5, 2]) + b', "b": ' + buffer([171, 205]) + b"}"
+    assert load_explorer_json(body) == {
+        "a": {"type": "Buffer", "data": [1.5, 2]},
+        "b": {"type": "Buffer", "data": b"\xab\xcd"},
+    }